@@ -0,0 +1,223 @@
+"""
+Offline benchmark of the agent pipelines.
+
+Replays a corpus of conversations (user messages only) through Agent V2, the V1
+LangGraph agent and the UnifiedAgent the way the REST API runs them, and reports
+per-turn latency, LLM calls / tokens, embedding and Pinecone calls, and for V2 the
+per-node timings from the turn traces. Combined with a replayed cassette
+(agents.cassettes) runs are reproducible without network access, so pipeline
+changes can be compared before they ship.
+
+Used by the `benchmark_agents` management command.
+"""
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Dict, Any, List
+from django.utils import timezone
+from chats.models import ChatMessage, Session, Visitor
+from agents.cassettes import get_cassette, KIND_LLM, KIND_EMBEDDING, KIND_VECTOR_QUERY
+from agents.session_manager import session_manager
+
+logger = logging.getLogger(__name__)
+
+AGENT_V2 = "v2"
+AGENT_V1 = "v1"
+AGENT_UNIFIED = "unified"
+AGENTS = (AGENT_V2, AGENT_V1, AGENT_UNIFIED)
+
+# ---- corpus loading ----
+
+_LOG_SESSION_RE = re.compile(r"(?:CHAT MESSAGE|AGENT CALLED) - Session: (\S+)")
+_LOG_MESSAGE_RE = re.compile(r"\[MSG\] User Message: (.*)$")
+
+
+def load_corpus_file(path: str) -> List[List[str]]:
+    """
+    Conversations from a JSON file: a list whose items are either lists of user
+    messages or objects with a "messages" list.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        data = json.load(corpus_file)
+    conversations = []
+    for item in data:
+        messages = item.get("messages", []) if isinstance(item, dict) else item
+        messages = [m.get("content", "") if isinstance(m, dict) else str(m) for m in messages]
+        messages = [m for m in messages if m.strip()]
+        if messages:
+            conversations.append(messages)
+    return conversations
+
+
+def load_corpus_from_log(path: str) -> List[List[str]]:
+    """
+    Conversations from an application log: user messages logged by the REST API and
+    WebSocket consumer ("[MSG] User Message: ..."), grouped by the session logged
+    just before them.
+    """
+    sessions: "OrderedDict[str, List[str]]" = OrderedDict()
+    current_session = None
+    with open(path, encoding="utf-8", errors="replace") as log_file:
+        for line in log_file:
+            session_match = _LOG_SESSION_RE.search(line)
+            if session_match:
+                current_session = session_match.group(1)
+                continue
+            message_match = _LOG_MESSAGE_RE.search(line)
+            if message_match and current_session:
+                message = message_match.group(1).strip()
+                if message:
+                    sessions.setdefault(current_session, []).append(message)
+    return list(sessions.values())
+
+
+def load_corpus_from_db(days: int = 7, limit: int = 50) -> List[List[str]]:
+    """User messages of the most recent sessions (oldest message first)."""
+    session_ids = list(
+        Session.objects.filter(
+            created_at__gte=timezone.now() - timedelta(days=days)
+        ).order_by('-created_at').values_list('id', flat=True)[:limit]
+    )
+    conversations = []
+    for session_id in session_ids:
+        messages = list(
+            ChatMessage.objects.filter(
+                session_id=session_id,
+                role='user',
+                is_deleted=False
+            ).order_by('timestamp').values_list('message', flat=True)
+        )
+        if messages:
+            conversations.append(messages)
+    return conversations
+
+
+# ---- running ----
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)], 1)
+
+
+def _agent_runner(agent: str):
+    """Callable (session, message) -> result dict, as the REST API invokes each agent."""
+    if agent == AGENT_V2:
+        from agents.langgraph_agent_v2.integration import ChatAPIIntegration as V2Integration
+        return lambda session, message: V2Integration.process_message(str(session.id), message)
+    if agent == AGENT_V1:
+        from agents.langgraph_agent.integration import ChatAPIIntegration as V1Integration
+        return lambda session, message: V1Integration.process_message(str(session.id), message)
+    if agent == AGENT_UNIFIED:
+        from agents.unified_agent import UnifiedAgent
+        return lambda session, message: UnifiedAgent(session).handle_message(message)
+    raise ValueError(f"Unknown agent: {agent}")
+
+
+def _clear_agent_caches() -> None:
+    """Start every run cold so recorded and replayed runs make the same calls."""
+    from agents.langgraph_agent_v2.tools.answer_cache import answer_cache
+    from agents.langgraph_agent_v2.tools.llm import llm_memo
+    answer_cache.clear()
+    llm_memo.clear()
+
+
+def _cassette_counts() -> Dict[str, Any]:
+    cassette = get_cassette()
+    return cassette.get_stats() if cassette is not None else {}
+
+
+def _count_delta(before: Dict[str, Any], after: Dict[str, Any], kind: str, key: str) -> int:
+    return (after.get(kind, {}).get(key) or 0) - (before.get(kind, {}).get(key) or 0)
+
+
+def run_agent(agent: str, conversations: List[List[str]], keep_sessions: bool = False) -> Dict[str, Any]:
+    """
+    Run every conversation through one agent in a fresh session and aggregate the turns.
+
+    Returns:
+        {"agent", "turns", "errors", "latency_ms", "per_turn", "cassette", "nodes"} or
+        {"agent", "error"} when the agent cannot be loaded
+    """
+    try:
+        runner = _agent_runner(agent)
+    except Exception as e:
+        logger.error(f"[BENCHMARK] Agent {agent} unavailable: {str(e)}")
+        return {"agent": agent, "error": f"{type(e).__name__}: {str(e)}"}
+    _clear_agent_caches()
+
+    latencies, traces, errors = [], [], []
+    totals = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "embeddings": 0, "vector_queries": 0, "misses": 0, "loose": 0}
+
+    for conversation in conversations:
+        session = Session.objects.create(visitor=Visitor.objects.create(), metadata={"benchmark": agent})
+        try:
+            for message in conversation:
+                session_manager.save_user_message(str(session.id), message)
+                before = _cassette_counts()
+                started_at = time.perf_counter()
+                try:
+                    result = runner(session, message)
+                except Exception as e:
+                    logger.error(f"[BENCHMARK] {agent} turn failed: {str(e)}", exc_info=True)
+                    result = {"message": "", "metadata": {"error": str(e)}}
+                latencies.append((time.perf_counter() - started_at) * 1000)
+                after = _cassette_counts()
+
+                totals["llm_calls"] += _count_delta(before, after, KIND_LLM, "calls")
+                totals["prompt_tokens"] += _count_delta(before, after, KIND_LLM, "prompt_tokens")
+                totals["completion_tokens"] += _count_delta(before, after, KIND_LLM, "completion_tokens")
+                totals["embeddings"] += _count_delta(before, after, KIND_EMBEDDING, "calls")
+                totals["vector_queries"] += _count_delta(before, after, KIND_VECTOR_QUERY, "calls")
+                for kind in (KIND_LLM, KIND_EMBEDDING, KIND_VECTOR_QUERY):
+                    totals["misses"] += _count_delta(before, after, kind, "misses")
+                    totals["loose"] += _count_delta(before, after, kind, "loose")
+
+                metadata = result.get("metadata") or {}
+                if metadata.get("error"):
+                    errors.append(metadata["error"])
+                if metadata.get("trace"):
+                    traces.append(metadata["trace"])
+                session_manager.save_assistant_message(str(session.id), result.get("message") or "", metadata=metadata)
+                session.refresh_from_db()
+        finally:
+            if not keep_sessions:
+                session.visitor.delete()  # cascades to the session and its messages
+
+    turns = len(latencies)
+    report = {
+        "agent": agent,
+        "turns": turns,
+        "errors": len(errors),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "mean": round(sum(latencies) / turns, 1) if turns else None,
+        },
+        "per_turn": {
+            key: round(totals[key] / turns, 2) if turns else 0
+            for key in ("llm_calls", "prompt_tokens", "completion_tokens", "embeddings", "vector_queries")
+        },
+        "cassette": {"misses": totals["misses"], "loose_matches": totals["loose"]},
+    }
+    if errors:
+        report["error_samples"] = errors[:5]
+    if traces:
+        from agents.langgraph_agent_v2.tracing import summarize_traces
+        report["nodes"] = summarize_traces(traces)["nodes"]
+    return report
+
+
+def run_benchmark(conversations: List[List[str]], agents: List[str], keep_sessions: bool = False) -> Dict[str, Any]:
+    """Run the corpus through each agent in turn."""
+    return {
+        "conversations": len(conversations),
+        "messages": sum(len(c) for c in conversations),
+        "agents": [run_agent(agent, conversations, keep_sessions) for agent in agents],
+    }
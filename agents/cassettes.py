@@ -0,0 +1,355 @@
+"""
+Record / replay of external calls (LLM, embeddings, Pinecone) for offline benchmarking.
+
+In record mode every chat completion (through the shared client pool), embedding
+request and Pinecone query is executed for real and appended to a cassette file
+(JSON Lines) with its latency. In replay mode the same calls are answered from the
+cassette without any network access, after sleeping for the recorded latency (or a
+fixed latency), so the agent pipelines can be timed and profiled anywhere.
+
+Requests are matched by a hash of their content. When a request was not recorded
+(e.g. a prompt changed since the recording), the next recorded response of the same
+shape is served instead and counted as a loose match, so a benchmark of a changed
+pipeline still runs end to end.
+
+Enable with the AGENT_CASSETTE_MODE / AGENT_CASSETTE_PATH settings or, for one run,
+with `use_cassette(path, mode)` (see the `benchmark_agents` management command).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List, Callable, Union
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+KIND_LLM = "llm"
+KIND_EMBEDDING = "embedding"
+KIND_VECTOR_QUERY = "vector_query"
+
+
+class CassetteMiss(RuntimeError):
+    """Replay mode got a request with no recorded response of the same shape."""
+
+
+def _hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """One cassette file plus the counters of the current run."""
+
+    def __init__(self, path: str, mode: str, latency: Union[str, float, None] = "recorded"):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        # "recorded" = sleep for the recorded latency; a number = fixed latency in ms; None/0 = no sleep
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._loose: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self.reset_stats()
+
+        if mode == MODE_REPLAY:
+            self._load()
+        else:
+            open(self.path, "w").close()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as cassette_file:
+            for line in cassette_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+                self._loose.setdefault(f"{entry['kind']}:{entry['shape']}", []).append(entry)
+        logger.info(f"[CASSETTE] Loaded {sum(len(v) for v in self._entries.values())} recorded calls from {self.path}")
+
+    # ---- stats ----
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {
+                kind: {"calls": 0, "exact": 0, "loose": 0, "misses": 0}
+                for kind in (KIND_LLM, KIND_EMBEDDING, KIND_VECTOR_QUERY)
+            }
+            self.stats[KIND_LLM].update({"prompt_tokens": 0, "completion_tokens": 0})
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def count_tokens(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        with self._lock:
+            self.stats[KIND_LLM]["prompt_tokens"] += prompt_tokens or 0
+            self.stats[KIND_LLM]["completion_tokens"] += completion_tokens or 0
+
+    # ---- record / replay ----
+
+    def record(self, kind: str, key: str, shape: str, response: Any, latency_ms: float, duration_ms: Optional[float] = None) -> None:
+        entry = {
+            "kind": kind,
+            "key": key,
+            "shape": shape,
+            "latency_ms": round(latency_ms, 1),
+            "duration_ms": round(duration_ms if duration_ms is not None else latency_ms, 1),
+            "response": response,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stats[kind]["calls"] += 1
+            with open(self.path, "a", encoding="utf-8") as cassette_file:
+                cassette_file.write(line + "\n")
+
+    def lookup(self, kind: str, key: str, shape: str) -> Dict[str, Any]:
+        """Recorded entry for the request (repeated requests get the recorded responses in order)."""
+        with self._lock:
+            self.stats[kind]["calls"] += 1
+            if key in self._entries:
+                entries, match, counter = self._entries[key], "exact", key
+            elif f"{kind}:{shape}" in self._loose:
+                entries, match, counter = self._loose[f"{kind}:{shape}"], "loose", f"loose:{kind}:{shape}"
+            else:
+                self.stats[kind]["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} call of shape '{shape}' in {self.path}")
+            served = self._served.get(counter, 0)
+            self._served[counter] = served + 1
+            self.stats[kind][match] += 1
+            return entries[served % len(entries)]
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """Seconds to wait before serving a replayed response."""
+        if self.latency == "recorded":
+            return entry.get("latency_ms", 0.0) / 1000
+        return float(self.latency or 0.0) / 1000
+
+    def stream_delay(self, entry: Dict[str, Any], chunks: int) -> float:
+        """Seconds between replayed stream chunks (spreads the recorded stream duration)."""
+        if self.latency != "recorded" or chunks <= 1:
+            return 0.0
+        return max(0.0, entry.get("duration_ms", 0.0) - entry.get("latency_ms", 0.0)) / 1000 / chunks
+
+
+_active: Optional[Cassette] = None
+_configured = False
+_active_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The active cassette, or None (normal operation)."""
+    global _active, _configured
+    if not _configured:
+        with _active_lock:
+            if not _configured:
+                mode = getattr(settings, 'AGENT_CASSETTE_MODE', '')
+                path = getattr(settings, 'AGENT_CASSETTE_PATH', '')
+                if mode and path:
+                    _active = Cassette(path, mode, getattr(settings, 'AGENT_CASSETTE_LATENCY', 'recorded'))
+                    logger.warning(f"[CASSETTE] {mode} mode enabled from settings: {path}")
+                _configured = True
+    return _active
+
+
+@contextmanager
+def use_cassette(path: str, mode: str, latency: Union[str, float, None] = "recorded"):
+    """Activate a cassette process-wide for the duration of the block."""
+    global _active, _configured
+    cassette = Cassette(path, mode, latency)
+    with _active_lock:
+        previous, was_configured = _active, _configured
+        _active, _configured = cassette, True
+    try:
+        yield cassette
+    finally:
+        with _active_lock:
+            _active, _configured = previous, was_configured
+
+
+def cassette_call(kind: str, request: Dict[str, Any], shape: str, live: Callable[[], Any], encode: Callable, decode: Callable) -> Any:
+    """Run a blocking external call through the active cassette."""
+    cassette = get_cassette()
+    key = _hash({"kind": kind, **request})
+    if cassette.replaying:
+        entry = cassette.lookup(kind, key, shape)
+        time.sleep(cassette.delay(entry))
+        return decode(entry["response"])
+
+    started_at = time.perf_counter()
+    result = live()
+    cassette.record(kind, key, shape, encode(result), (time.perf_counter() - started_at) * 1000)
+    return result
+
+
+# ---- chat completions ----
+
+def _llm_request(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in kwargs.items() if k != "timeout"}
+
+
+def _llm_shape(kwargs: Dict[str, Any]) -> str:
+    if kwargs.get("stream"):
+        return "stream"
+    if kwargs.get("tools") or kwargs.get("functions"):
+        return "tools"
+    if kwargs.get("response_format"):
+        return "json"
+    return "text"
+
+
+def _count_usage(cassette: Cassette, usage: Any, fallback_completion: int = 0) -> None:
+    cassette.count_tokens(
+        getattr(usage, "prompt_tokens", None),
+        getattr(usage, "completion_tokens", None) or fallback_completion
+    )
+
+
+def _completion(data: Dict[str, Any]):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+def _chunk(data: Dict[str, Any]):
+    from openai.types.chat import ChatCompletionChunk
+    return ChatCompletionChunk.model_validate(data)
+
+
+def _content_chunks(chunks) -> int:
+    return sum(1 for chunk in chunks if chunk.choices and chunk.choices[0].delta.content)
+
+
+def llm_completion(kwargs: Dict[str, Any], live: Callable[[], Any]):
+    """A chat completion (blocking) through the active cassette."""
+    cassette = get_cassette()
+    key = _hash({"kind": KIND_LLM, **_llm_request(kwargs)})
+    shape = _llm_shape(kwargs)
+
+    if cassette.replaying:
+        entry = cassette.lookup(KIND_LLM, key, shape)
+        time.sleep(cassette.delay(entry))
+        if shape == "stream":
+            chunks = [_chunk(c) for c in entry["response"]]
+            _count_usage(cassette, next((c.usage for c in chunks if c.usage), None), _content_chunks(chunks))
+            return _replay_stream(chunks, cassette.stream_delay(entry, len(chunks)))
+        completion = _completion(entry["response"])
+        _count_usage(cassette, completion.usage)
+        return completion
+
+    started_at = time.perf_counter()
+    result = live()
+    if shape == "stream":
+        return _record_stream(cassette, key, result, started_at)
+    cassette.record(KIND_LLM, key, shape, result.model_dump(mode="json"), (time.perf_counter() - started_at) * 1000)
+    _count_usage(cassette, result.usage)
+    return result
+
+
+async def allm_completion(kwargs: Dict[str, Any], live: Callable[[], Any]):
+    """A chat completion (async) through the active cassette."""
+    import asyncio
+    cassette = get_cassette()
+    key = _hash({"kind": KIND_LLM, **_llm_request(kwargs)})
+    shape = _llm_shape(kwargs)
+
+    if cassette.replaying:
+        entry = cassette.lookup(KIND_LLM, key, shape)
+        await asyncio.sleep(cassette.delay(entry))
+        if shape == "stream":
+            chunks = [_chunk(c) for c in entry["response"]]
+            _count_usage(cassette, next((c.usage for c in chunks if c.usage), None), _content_chunks(chunks))
+            return _areplay_stream(chunks, cassette.stream_delay(entry, len(chunks)))
+        completion = _completion(entry["response"])
+        _count_usage(cassette, completion.usage)
+        return completion
+
+    started_at = time.perf_counter()
+    result = await live()
+    if shape == "stream":
+        return _arecord_stream(cassette, key, result, started_at)
+    cassette.record(KIND_LLM, key, shape, result.model_dump(mode="json"), (time.perf_counter() - started_at) * 1000)
+    _count_usage(cassette, result.usage)
+    return result
+
+
+def _replay_stream(chunks, gap: float):
+    for chunk in chunks:
+        if gap:
+            time.sleep(gap)
+        yield chunk
+
+
+async def _areplay_stream(chunks, gap: float):
+    import asyncio
+    for chunk in chunks:
+        if gap:
+            await asyncio.sleep(gap)
+        yield chunk
+
+
+def _finish_stream(cassette: Cassette, key: str, chunks: list, started_at: float, first_chunk_at: Optional[float]) -> None:
+    now = time.perf_counter()
+    cassette.record(
+        KIND_LLM, key, "stream", [c.model_dump(mode="json") for c in chunks],
+        latency_ms=((first_chunk_at or now) - started_at) * 1000,
+        duration_ms=(now - started_at) * 1000
+    )
+    _count_usage(cassette, next((c.usage for c in chunks if c.usage), None), _content_chunks(chunks))
+
+
+def _record_stream(cassette: Cassette, key: str, stream, started_at: float):
+    chunks, first_chunk_at = [], None
+    for chunk in stream:
+        first_chunk_at = first_chunk_at or time.perf_counter()
+        chunks.append(chunk)
+        yield chunk
+    _finish_stream(cassette, key, chunks, started_at, first_chunk_at)
+
+
+async def _arecord_stream(cassette: Cassette, key: str, stream, started_at: float):
+    chunks, first_chunk_at = [], None
+    async for chunk in stream:
+        first_chunk_at = first_chunk_at or time.perf_counter()
+        chunks.append(chunk)
+        yield chunk
+    _finish_stream(cassette, key, chunks, started_at, first_chunk_at)
+
+
+# ---- embeddings / vector queries ----
+
+def embeddings(texts: List[str], live: Callable[[], List[List[float]]]) -> List[List[float]]:
+    """Embedding vectors for `texts` through the active cassette."""
+    return cassette_call(
+        KIND_EMBEDDING, {"input": texts}, f"n={len(texts)}", live,
+        encode=lambda vectors: vectors,
+        decode=lambda vectors: vectors
+    )
+
+
+def vector_query(request: Dict[str, Any], live: Callable[[], Any]):
+    """A Pinecone query through the active cassette (results keep the `.matches` interface)."""
+    return cassette_call(
+        KIND_VECTOR_QUERY, request, f"top_k={request.get('top_k')}", live,
+        encode=lambda results: {
+            "matches": [
+                {"id": m.id, "score": m.score, "metadata": dict(m.metadata or {})}
+                for m in (getattr(results, "matches", None) or [])
+            ]
+        } if results else None,
+        decode=lambda data: SimpleNamespace(matches=[SimpleNamespace(**m) for m in data["matches"]]) if data else None
+    )
+
+
+# Stands in for the Pinecone index during replay (queries never reach it)
+REPLAY_INDEX = SimpleNamespace(name="cassette-replay")
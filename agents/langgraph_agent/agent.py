@@ -6,8 +6,9 @@ import json
 from typing import Dict, Any, Optional
 from datetime import datetime
 from django.conf import settings
-from openai import AzureOpenAI
+from agents.llm_pool import get_chat_client, PooledChatClient
 from chats.models import Session, ChatMessage, MessageSuggestion
+from agents.suggestions import classify_suggestion_type
 from agents.langgraph_agent.state import AgentState
 from agents.langgraph_agent.classifier import QuestionClassifier
 from agents.langgraph_agent.prompts import (
@@ -30,25 +31,10 @@ class LangGraphAgent:
         self.client = self._get_openai_client()
         self.model = self._get_model_name()
     
-    def _get_openai_client(self) -> Optional[AzureOpenAI]:
-        """Get Azure OpenAI client."""
-        try:
-            api_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-            endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-            api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-            
-            if not api_key or not endpoint:
-                logger.error("Azure OpenAI credentials not configured")
-                return None
-            
-            return AzureOpenAI(
-                api_key=api_key,
-                api_version=api_version,
-                azure_endpoint=endpoint
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Azure OpenAI: {str(e)}")
-            return None
+    def _get_openai_client(self) -> Optional[PooledChatClient]:
+        """Get the shared Azure OpenAI chat client (deployment pool)."""
+        client, _ = get_chat_client()
+        return client
     
     def _get_model_name(self) -> str:
         """Get model deployment name."""
@@ -450,7 +436,8 @@ class LangGraphAgent:
                     formatted_results.append({
                         "text": r.get('text', '')[:500],
                         "score": r.get('score', 0.0),
-                        "source": r.get('reference_url') or r.get('url') or ''
+                        "source": r.get('reference_url') or r.get('url') or '',
+                        "chunk_id": r.get('chunk_id')  # suggestion bank lookup
                     })
             
             return formatted_results
@@ -901,23 +888,7 @@ class LangGraphAgent:
     
     def _classify_suggestion_type(self, suggestion_text: str) -> str:
         """Classify the type of suggestion based on its content."""
-        suggestion_lower = suggestion_text.lower()
-        
-        # Conversion actions
-        if any(phrase in suggestion_lower for phrase in [
-            'connect with', 'get a quote', 'apply for', 'contact', 'speak with', 'call'
-        ]):
-            return 'conversion'
-        
-        # RAG-related questions (domain-specific)
-        elif any(phrase in suggestion_lower for phrase in [
-            'tax', 'fbt', 'benefit', 'saving', 'novated', 'lease', 'vehicle', 'ev', 'eligib'
-        ]):
-            return 'rag_related'
-        
-        # Contextual suggestions
-        else:
-            return 'contextual'
+        return classify_suggestion_type(suggestion_text)
     
     def _error_response(self, message: str) -> Dict[str, Any]:
         """Generate error response."""
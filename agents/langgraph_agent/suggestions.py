@@ -23,44 +23,15 @@ Usage:
 import logging
 import json
 from typing import List, Dict, Any, Optional
-from openai import AzureOpenAI
-from django.conf import settings
+from agents.llm_pool import get_chat_client, TIER_CLASSIFY
+from agents.llm_executor import llm_slot_sync, PRIORITY_BACKGROUND
+from knowledgebase.services.suggestion_bank import get_bank_suggestions
 
 logger = logging.getLogger(__name__)
 
-# Initialize Azure OpenAI client
-_client = None
-_model = None
-
-
 def _get_openai_client():
-    """Initialize Azure OpenAI client (singleton)"""
-    global _client, _model
-    
-    if _client is not None:
-        return _client, _model
-    
-    api_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-    endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-    api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-    deployment_name = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
-    
-    if not api_key or not endpoint:
-        logger.error("Azure OpenAI credentials not configured in settings")
-        return None, None
-    
-    try:
-        _client = AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=endpoint
-        )
-        _model = deployment_name
-        logger.info(f"Initialized Azure OpenAI client with deployment: {deployment_name}")
-        return _client, _model
-    except Exception as e:
-        logger.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
-        return None, None
+    """Shared Azure OpenAI chat client (deployment pool, see agents.llm_pool) and the classify-tier model"""
+    return get_chat_client(TIER_CLASSIFY)
 
 
 RAG_RELATED_QUESTIONS_PROMPT = """You are generating related follow-up questions based on a user's question and the knowledge base documents that were used to answer it.
@@ -205,13 +176,14 @@ def generate_rag_related_questions(
         logger.info(f"Generating RAG-based related questions for: '{user_question[:50]}...'")
         
         # Generate related questions using LLM
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=300,
-            temperature=0.7
-        )
+        with llm_slot_sync(PRIORITY_BACKGROUND):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                max_tokens=300,
+                temperature=0.7
+            )
         
         result_text = response.choices[0].message.content.strip()
         result_data = json.loads(result_text)
@@ -309,13 +281,14 @@ def generate_contextual_suggestions(
         logger.info(f"Generating contextual suggestions for question type: {question_type}")
         
         # Generate suggestions using LLM
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=256,
-            temperature=0.7
-        )
+        with llm_slot_sync(PRIORITY_BACKGROUND):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                max_tokens=256,
+                temperature=0.7
+            )
         
         result_text = response.choices[0].message.content.strip()
         result_data = json.loads(result_text)
@@ -382,6 +355,18 @@ def generate_suggestions_with_rag(
     """
     suggestions = []
     
+    # Questions precomputed for the retrieved chunks (suggestion bank) need no LLM call
+    if rag_documents:
+        try:
+            asked = [m.get('content', '') for m in conversation_messages if m.get('role') == 'user'] + [user_question]
+            bank_suggestions = get_bank_suggestions(rag_documents, asked, limit=3)
+        except Exception as e:
+            logger.warning(f"Suggestion bank lookup failed: {str(e)}")
+            bank_suggestions = []
+        if len(bank_suggestions) >= 2:
+            logger.info(f"Using {len(bank_suggestions)} suggestion bank suggestions")
+            return bank_suggestions + ["Connect with our team"]
+    
     # If we have RAG documents and this is a domain question, prioritize RAG-based suggestions
     if rag_documents and question_type == "domain":
         rag_suggestions = generate_rag_related_questions(
@@ -53,7 +53,8 @@ def search_knowledge_base(query: str) -> Dict[str, Any]:
                     formatted_results.append({
                         "text": text,
                         "score": score,
-                        "source": source
+                        "source": source,
+                        "chunk_id": r.get('chunk_id')  # suggestion bank lookup
                     })
             
             return {
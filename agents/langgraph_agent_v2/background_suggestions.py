@@ -0,0 +1,152 @@
+"""
+Background (off the critical path) suggestion generation for LangGraph Agent V2.
+
+The answer is sent to the user first; the quick-reply suggestions are generated
+afterwards, saved as MessageSuggestion rows of the answer and either pushed by the
+caller (WebSocket `suggestions` frame) or fetched by the client (REST follow-up fetch,
+GET /api/chats/messages/suggestions?response_id=...).
+The progress is recorded on ChatMessage.metadata["suggestions"] ("pending" -> "ready"/"error").
+"""
+import inspect
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+from asgiref.sync import sync_to_async, async_to_sync
+from django.db import close_old_connections
+from django.utils import timezone
+from chats.models import ChatMessage, MessageSuggestion
+from agents.suggestions import generate_suggestions, classify_suggestion_type
+from agents.llm_executor import get_shared_executor, closing_db_connections
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 3  # Same count postprocess_node generates inline
+
+
+@dataclass
+class SuggestionJob:
+    """Everything needed to generate the suggestions of one answer that was already sent."""
+    messages: List[Dict[str, Any]]
+    answer: str
+    suggestions: List[str] = field(default_factory=list)  # filled in place once generated
+    on_ready: Optional[Callable[[], Awaitable[None]]] = None  # e.g. store in the answer cache
+
+
+def build_pending_metadata() -> Dict[str, Any]:
+    """Metadata saved with the message until the suggestions are in."""
+    return {"status": "pending"}
+
+
+def _save_suggestions(message_id: str, suggestions: List[str], status: str, error: Optional[str] = None) -> None:
+    chat_message = ChatMessage.objects.filter(id=message_id).first()
+    if chat_message is None:
+        logger.warning(f"[SUGGESTIONS] Message not found for suggestions: {message_id}")
+        return
+
+    generated_at = timezone.now().isoformat()
+    MessageSuggestion.objects.bulk_create([
+        MessageSuggestion(
+            message=chat_message,
+            suggestion_text=suggestion_text[:200],
+            suggestion_type=classify_suggestion_type(suggestion_text),
+            order=i,
+            metadata={
+                'generated_at': generated_at,
+                'session_id': str(chat_message.session_id),
+                'message_id': str(chat_message.id),
+                'source': 'background'
+            }
+        )
+        for i, suggestion_text in enumerate(suggestions)
+    ])
+
+    metadata = dict(chat_message.metadata or {})
+    metadata["suggestions"] = {"status": status, "count": len(suggestions), "generated_at": generated_at}
+    if error:
+        metadata["suggestions"]["error"] = error
+    chat_message.metadata = metadata
+    chat_message.save(update_fields=["metadata"])
+
+
+def _generate_and_save(message_id: str, job: SuggestionJob) -> List[str]:
+    """Blocking: one LLM call (queued at background priority) and one bulk insert."""
+    try:
+        suggestions = generate_suggestions(job.messages, job.answer, MAX_SUGGESTIONS)
+    except Exception as e:
+        logger.error(f"[SUGGESTIONS] Background generation failed for message {message_id}: {str(e)}", exc_info=True)
+        suggestions, status, error = [], "error", str(e)
+    else:
+        status, error = "ready", None
+    job.suggestions[:] = suggestions
+
+    try:
+        _save_suggestions(message_id, suggestions, status, error)
+    except Exception as e:
+        logger.error(f"[SUGGESTIONS] Failed to save suggestions for message {message_id}: {str(e)}", exc_info=True)
+    logger.info(f"[SUGGESTIONS] Generated {len(suggestions)} suggestions in the background for message {message_id}")
+    return suggestions
+
+
+async def generate_in_background(
+    message_id: str,
+    job: SuggestionJob,
+    on_suggestions: Optional[Callable[[List[str]], Any]] = None
+) -> List[str]:
+    """
+    Generate and save the suggestions of an answer that was already sent.
+
+    Args:
+        message_id: ID of the saved assistant ChatMessage
+        job: SuggestionJob built by the integration layer
+        on_suggestions: Optional callback (sync or async) called with the suggestions
+
+    Returns:
+        The generated suggestions (empty on failure)
+    """
+    suggestions = await sync_to_async(
+        closing_db_connections(_generate_and_save), thread_sensitive=False, executor=get_shared_executor()
+    )(message_id, job)
+
+    if on_suggestions:
+        sent = on_suggestions(suggestions)
+        if inspect.isawaitable(sent):
+            await sent
+    if job.on_ready:
+        await job.on_ready()
+    return suggestions
+
+
+def _run_detached(message_id: str, job: SuggestionJob) -> List[str]:
+    try:
+        suggestions = _generate_and_save(message_id, job)
+        if job.on_ready:
+            async_to_sync(job.on_ready)()
+        return suggestions
+    finally:
+        close_old_connections()
+
+
+def submit_in_background(message_id: str, job: SuggestionJob) -> Future:
+    """
+    Synchronous callers (REST API): generate on the shared agent executor so the work
+    outlives the request; the client fetches the result from the saved rows.
+    """
+    return get_shared_executor().submit(_run_detached, message_id, job)
+
+
+def get_message_suggestions(chat_message: ChatMessage) -> Dict[str, Any]:
+    """
+    Suggestions saved for an assistant message.
+
+    Returns:
+        {"status": "pending" | "ready" | "error" | "none", "suggestions": [str, ...]}
+    """
+    suggestions = list(
+        MessageSuggestion.objects.filter(message=chat_message).order_by('order').values_list('suggestion_text', flat=True)
+    )
+    status = ((chat_message.metadata or {}).get("suggestions") or {}).get("status")
+    if not status:
+        # Saved inline (V1 agent) or never generated
+        status = "ready" if suggestions else "none"
+    return {"status": status, "suggestions": suggestions}
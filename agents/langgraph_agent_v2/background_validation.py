@@ -0,0 +1,213 @@
+"""
+Background (off the critical path) validation for LangGraph Agent V2.
+
+The answer is sent to the user first; the fact/completeness/tone checks run afterwards
+and their verdict is recorded on the saved ChatMessage.metadata["validation"].
+Only a failed fact check with low confidence regenerates the answer, which the caller
+can push to the client as a correction.
+
+The same checks can be run in batch over stored messages (offline audit).
+"""
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from chats.models import ChatMessage
+from agents.session_manager import session_manager
+from .state import AgentState
+from .nodes.validation import run_validation_checks, collect_validation_issues, needs_fact_correction
+from .nodes.generation import response_generation_node
+from .nodes.postprocess import format_response
+from .tools.rag import search_knowledge_base
+from .config import RAG_TOP_K
+from agents.llm_executor import llm_priority, get_shared_executor, closing_db_connections, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ValidationJob:
+    """Everything needed to validate (and if necessary correct) one generated answer."""
+    state: AgentState
+    on_passed: Optional[Callable[[], Awaitable[None]]] = None  # e.g. store in the answer cache
+
+
+def build_pending_metadata(state: AgentState) -> Dict[str, Any]:
+    """Metadata saved with the message until the verdict is in (also used by audits)."""
+    return {
+        "status": "pending",
+        "rag_query": state.rag_query,
+        "coverage": state.reasoning_output.get("coverage", {}) if state.reasoning_output else {},
+    }
+
+
+def _verdict(validation_result: Dict[str, Any], status: str) -> Dict[str, Any]:
+    return {
+        "status": status,
+        "overall_valid": validation_result["overall_valid"],
+        "confidence": validation_result["confidence"],
+        "issues": collect_validation_issues(validation_result),
+        "fact_check": validation_result["fact_check"],
+        "completeness": validation_result["completeness"],
+        "tone": validation_result["tone"],
+        "validated_at": timezone.now().isoformat(),
+    }
+
+
+async def _save_verdict(message_id: str, verdict: Dict[str, Any], corrected_message: Optional[str] = None) -> None:
+    chat_message = await ChatMessage.objects.filter(id=message_id).afirst()
+    if chat_message is None:
+        logger.warning(f"[VALIDATION] Message not found for verdict: {message_id}")
+        return
+
+    metadata = dict(chat_message.metadata or {})
+    previous = metadata.get("validation") or {}
+    # Keep the audit inputs (rag_query / coverage) next to the verdict
+    metadata["validation"] = {**previous, **verdict}
+    if "overall_valid" in verdict:
+        metadata["validation_passed"] = verdict["overall_valid"]
+    update_fields = ["metadata"]
+
+    if corrected_message:
+        metadata["validation"]["original_message"] = chat_message.message
+        chat_message.message = corrected_message
+        update_fields.append("message")
+
+    chat_message.metadata = metadata
+    await chat_message.asave(update_fields=update_fields)
+    if corrected_message:
+        # The checkpointed history may already hold the original answer
+        await session_manager.ainvalidate_checkpoint(chat_message.session_id)
+
+
+async def validate_in_background(
+    message_id: str,
+    job: ValidationJob,
+    on_correction: Optional[Callable[[str], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Validate an answer that was already sent and record the verdict on its ChatMessage.
+
+    Args:
+        message_id: ID of the saved assistant ChatMessage
+        job: ValidationJob built by the integration layer
+        on_correction: Optional callback (sync or async) called with the corrected answer
+
+    Returns:
+        The recorded verdict
+    """
+    # Off the critical path: queue behind user-facing LLM calls
+    with llm_priority(PRIORITY_BACKGROUND):
+        return await _validate(message_id, job, on_correction)
+
+
+async def _validate(
+    message_id: str,
+    job: ValidationJob,
+    on_correction: Optional[Callable[[str], Any]] = None
+) -> Dict[str, Any]:
+    state = job.state
+    draft_response = state.final_response or state.draft_response or ""
+    coverage_plan = state.reasoning_output.get("coverage", {}) if state.reasoning_output else {}
+    user_question = state.messages[-1]["content"] if state.messages else ""
+
+    try:
+        validation_result = await run_validation_checks(draft_response, state.rag_context, coverage_plan, user_question)
+    except Exception as e:
+        logger.error(f"[VALIDATION] Background validation failed: {str(e)}", exc_info=True)
+        verdict = {"status": "error", "error": str(e), "validated_at": timezone.now().isoformat()}
+        await _save_verdict_safe(message_id, verdict)
+        return verdict
+
+    corrected_message = None
+    if validation_result["overall_valid"]:
+        status = "passed"
+        logger.info(f"[VALIDATION] Background validation passed for message {message_id}")
+        if job.on_passed:
+            await job.on_passed()
+    elif needs_fact_correction(validation_result):
+        logger.warning(f"[VALIDATION] Fact check failed with low confidence - regenerating message {message_id}")
+        state.validation_result = validation_result
+        state.improvement_suggestions = collect_validation_issues(validation_result)
+        state.validation_retry_count += 1
+        # Not streamed: retries never stream (validation_retry_count > 0)
+        state = await response_generation_node(state)
+        corrected_message = format_response(state.draft_response or "", state.rag_context) or None
+        status = "corrected" if corrected_message else "failed"
+    else:
+        status = "failed"
+        logger.warning(f"[VALIDATION] Background validation failed for message {message_id}: {collect_validation_issues(validation_result)}")
+
+    verdict = _verdict(validation_result, status)
+    await _save_verdict_safe(message_id, verdict, corrected_message)
+
+    if corrected_message and on_correction:
+        sent = on_correction(corrected_message)
+        if inspect.isawaitable(sent):
+            await sent
+
+    return verdict
+
+
+async def _save_verdict_safe(message_id: str, verdict: Dict[str, Any], corrected_message: Optional[str] = None) -> None:
+    try:
+        await _save_verdict(message_id, verdict, corrected_message)
+    except Exception as e:
+        logger.error(f"[VALIDATION] Failed to save verdict for message {message_id}: {str(e)}", exc_info=True)
+
+
+async def audit_message(chat_message: ChatMessage) -> Dict[str, Any]:
+    """
+    Run the validation checks over a stored assistant message (offline audit).
+    Knowledge base context is re-retrieved with the saved rag_query (or the user question).
+    """
+    validation_meta = (chat_message.metadata or {}).get("validation") or {}
+
+    previous_user_message = await ChatMessage.objects.filter(
+        session_id=chat_message.session_id,
+        role='user',
+        is_deleted=False,
+        timestamp__lte=chat_message.timestamp
+    ).order_by('-timestamp').afirst()
+    user_question = previous_user_message.message if previous_user_message else ""
+
+    query = validation_meta.get("rag_query") or user_question
+    rag_context = await sync_to_async(
+        closing_db_connections(search_knowledge_base), thread_sensitive=False, executor=get_shared_executor()
+    )(query, top_k=RAG_TOP_K) if query else []
+
+    validation_result = await run_validation_checks(
+        chat_message.message,
+        rag_context,
+        validation_meta.get("coverage") or {},
+        user_question
+    )
+    return _verdict(validation_result, "passed" if validation_result["overall_valid"] else "failed")
+
+
+async def audit_messages(messages: List[ChatMessage], save: bool = False) -> List[Dict[str, Any]]:
+    """
+    Audit a batch of stored assistant messages.
+
+    Args:
+        messages: Assistant ChatMessage instances
+        save: Record each verdict on the message metadata (source "audit")
+
+    Returns:
+        List of {"message_id", "verdict"} dictionaries
+    """
+    report = []
+    for chat_message in messages:
+        try:
+            with llm_priority(PRIORITY_BACKGROUND):
+                verdict = await audit_message(chat_message)
+        except Exception as e:
+            logger.error(f"[VALIDATION] Audit failed for message {chat_message.id}: {str(e)}")
+            verdict = {"status": "error", "error": str(e)}
+        else:
+            if save:
+                await _save_verdict_safe(str(chat_message.id), dict(verdict, source="audit"))
+        report.append({"message_id": str(chat_message.id), "verdict": verdict})
+    return report
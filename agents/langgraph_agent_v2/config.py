@@ -12,8 +12,22 @@ LLM_MAX_TOKENS_REASONING = 1000
 LLM_MAX_TOKENS_VALIDATION = 500
 
 # Conversation History
-CONVERSATION_HISTORY_LIMIT = 4
-EXTENDED_HISTORY_LIMIT = 10
+# Nodes share one trimmed view (state.conversation_history / conversation_summary):
+# the last HISTORY_RECENT_TURNS turns verbatim within HISTORY_TOKEN_BUDGET tokens;
+# older turns are folded into a rolling summary, refreshed in the background once
+# HISTORY_SUMMARY_EVERY_TURNS turns have left the verbatim window.
+HISTORY_RECENT_TURNS = 3
+HISTORY_TOKEN_BUDGET = 800
+HISTORY_MESSAGE_MAX_TOKENS = 300  # Longer messages are truncated in prompts
+HISTORY_SUMMARY_EVERY_TURNS = 4
+HISTORY_SUMMARY_MAX_TOKENS = 250
+
+# Reasoning Complexity Gate
+# A cheap score (question length, type, RAG hits, keywords) picks the reasoning path:
+# "none" (no LLM call), "combined" (one call) or "full" (three concurrent calls).
+ENABLE_REASONING_GATE = True
+REASONING_GATE_COMBINED_MIN_SCORE = 2.0  # Below this: no reasoning call
+REASONING_GATE_FULL_MIN_SCORE = 5.0  # At/above this: full fan-out
 
 # Name Collection
 NAME_COLLECTION_THRESHOLD = 3  # Ask for name after 3 questions
@@ -21,27 +35,102 @@ NAME_COLLECTION_THRESHOLD = 3  # Ask for name after 3 questions
 # Team Connection
 TEAM_CONNECTION_THRESHOLD = 3  # Start offering team connection after 3 questions
 
-# Parallel Processing
-MAX_PARALLEL_WORKERS = 3  # Max workers for ThreadPoolExecutor
-
 # Validation
 MAX_VALIDATION_RETRIES = 2  # Max retries if validation fails
 VALIDATION_CONFIDENCE_THRESHOLD = 0.8  # Minimum confidence for validation
+# If enabled, callers that can push corrections (WebSocket) get the answer immediately and
+# validation runs in the background; the verdict is saved on ChatMessage.metadata["validation"].
+# REST callers always validate inline.
+ENABLE_BACKGROUND_VALIDATION = True
 
 # RAG Configuration
 RAG_TOP_K = 5  # Number of results to retrieve
 RAG_MIN_SCORE = 0.7  # Minimum relevance score
 
 # RAG Query Variations (cost vs recall tradeoff)
-# If enabled, the agent will issue multiple Pinecone searches per user question.
+# If enabled, the agent searches several variations per user question. They are embedded
+# in one request and searched as one batch (search_with_variations), deduplicated by chunk.
 ENABLE_RAG_QUERY_VARIATIONS_DOMAIN = False
 ENABLE_RAG_QUERY_VARIATIONS_SERVICE_DISCOVERY = False
 MAX_RAG_QUERY_VARIATIONS = 3  # cap extra queries (in addition to base query)
 
+# Speculative RAG
+# If enabled, retrieval for the raw user message starts at the beginning of the turn
+# (concurrently with preprocessing). Knowledge retrieval reuses it when the final
+# rag_query is close enough to the raw message; otherwise it is discarded.
+ENABLE_SPECULATIVE_RAG = True
+SPECULATIVE_RAG_MIN_OVERLAP = 0.5  # Min word overlap (Jaccard) between raw message and rag_query
+
+# Preprocessing
+# If enabled, intent, contact extraction, context analysis and the routing decision come
+# from ONE structured LLM call instead of four (3 in preprocess + 1 in routing).
+# Set to False to use the separate per-task calls.
+ENABLE_FUSED_PREPROCESS = True
+
+# Suggestions
+# If enabled, callers that can deliver them later (WebSocket `suggestions` frame, REST
+# follow-up fetch) get the answer without waiting for the suggestions LLM call; they are
+# generated in the background and saved as MessageSuggestion rows of the answer.
+ENABLE_BACKGROUND_SUGGESTIONS = True
+# Suggestion bank: suggestions are first assembled from the follow-up questions precomputed
+# for the retrieved knowledge chunks (knowledgebase/services/suggestion_bank.py), with no
+# LLM call. The LLM is only used when the bank yields fewer than SUGGESTION_BANK_MIN_SUGGESTIONS.
+ENABLE_SUGGESTION_BANK = True
+SUGGESTION_BANK_MIN_SUGGESTIONS = 2
+SUGGESTION_BANK_CONVERSION_SUGGESTION = "Connect with our team"  # Appended to bank suggestions
+
+# Contact extraction
+# Emails, AU phone numbers, names, confirmations and callback date/times are matched with
+# patterns first; each match carries a confidence and the LLM is only asked when the
+# confidence is below the threshold (ambiguous or free-form replies).
+ENABLE_PATTERN_CONTACT_EXTRACTION = True
+CONTACT_CONFIDENCE_THRESHOLD = 0.8
+
+# Token Streaming
+# If enabled, response generation streams tokens to the caller's `on_token` callback
+# (WebSocket layer) instead of returning only the finished text.
+ENABLE_TOKEN_STREAMING = True
+
 # Response Timeouts
+# Every turn has a deadline of RESPONSE_TIMEOUT seconds from message receipt (deadline.py).
+# LLM calls and knowledge base searches are bounded by TOOL_TIMEOUT and the time left, keeping
+# DEADLINE_GENERATION_RESERVE for the answer itself. Optional stages are skipped when less than
+# their minimum budget is left, and generation uses a compact prompt below "full_prompt".
+ENABLE_TURN_DEADLINE = True
 RESPONSE_TIMEOUT = 30  # Seconds
 TOOL_TIMEOUT = 10  # Seconds
+DEADLINE_GENERATION_RESERVE = 8  # Seconds kept for answer generation
+DEADLINE_FINALIZE_RESERVE = 1  # Seconds kept for saving the turn after generation
+DEADLINE_MIN_BUDGET = {  # Seconds left needed to run a stage
+    "reasoning_fanout": 18,  # Full (three-call) reasoning; falls back to one combined call
+    "reasoning": 14,  # Combined reasoning; falls back to the default plan
+    "full_prompt": 12,  # Full generation prompt; falls back to the compact prompt
+    "validation": 8,  # Inline validation (and validation retries)
+    "suggestions": 3,  # Inline LLM suggestions (the suggestion bank is always used)
+}
+DEADLINE_COMPACT_RAG_CHUNKS = 2  # Sources in the compact generation prompt
+DEADLINE_COMPACT_MAX_TOKENS = 500
+DEADLINE_FALLBACK_RESPONSE = (
+    "I'm sorry, this is taking longer than expected. Please try asking your question again in a moment."
+)
 
 # Caching
+# Semantic answer cache: repeated, self-contained questions are answered from cache
+# (invalidated when the knowledge base version changes).
 ENABLE_CACHING = True
 CACHE_TTL = 3600  # 1 hour
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95  # Cosine similarity between normalized questions
+ANSWER_CACHE_MAX_ENTRIES = 500
+
+# LLM call memoization (opt-in per call site via `cache=True`)
+# Keyed by (model, messages, temperature, max_tokens, response_format) + knowledge base version.
+LLM_MEMO_MAX_ENTRIES = 2000  # In-process LRU size
+LLM_MEMO_TTL = CACHE_TTL
+LLM_MEMO_USE_SHARED_CACHE = False  # Also store in the Django cache (shared when CACHES uses Redis)
+
+# Tracing
+# Wall time, LLM queue wait, tokens and cache hits per node and per LLM call,
+# saved on the assistant ChatMessage.metadata["trace"].
+# Set AGENT_V2_TRACE_DEBUG = True in Django settings to also send it in the
+# WebSocket `complete` frame metadata.
+ENABLE_TRACING = True
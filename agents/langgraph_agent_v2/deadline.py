@@ -0,0 +1,137 @@
+"""
+Per-turn deadline for LangGraph Agent V2.
+
+A turn starts its deadline when the user message is received (RESPONSE_TIMEOUT seconds).
+The active deadline is held in a context variable, so nodes, LLM calls and knowledge base
+searches of the turn read it without it being threaded through every signature:
+- `bounded` awaits a call with a timeout of min(TOOL_TIMEOUT, time left - reserve);
+  answer generation keeps only DEADLINE_FINALIZE_RESERVE, every other call also leaves
+  DEADLINE_GENERATION_RESERVE for the answer
+- `stage_allowed` tells an optional stage whether its minimum budget is left and records
+  the stage as skipped otherwise
+
+Skipped stages are reported in the response metadata ("deadline").
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Optional, Dict, Any, List, Awaitable, TypeVar
+from .config import (
+    TOOL_TIMEOUT,
+    DEADLINE_GENERATION_RESERVE,
+    DEADLINE_FINALIZE_RESERVE,
+    DEADLINE_MIN_BUDGET,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call did not finish within the time left in the turn."""
+
+
+class TurnDeadline:
+    """Time budget of one chat turn."""
+
+    def __init__(self, budget: float, started_at: Optional[float] = None):
+        self.budget = budget
+        # time.monotonic() of message receipt (defaults to now)
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.skipped: List[Dict[str, Any]] = []
+        self.expired = False  # The graph did not finish in time (fallback answer)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget - self.elapsed())
+
+    def timeout(self, reserve: float, cap: Optional[float] = None) -> float:
+        """Seconds a call may take while keeping `reserve` seconds of the turn."""
+        available = max(0.0, self.remaining() - reserve)
+        return available if cap is None else min(cap, available)
+
+    def skip(self, stage: str) -> None:
+        remaining_ms = round(self.remaining() * 1000)
+        self.skipped.append({"stage": stage, "remaining_ms": remaining_ms})
+        logger.warning(f"[DEADLINE] Skipping {stage} ({remaining_ms}ms left of {self.budget:.0f}s)")
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "budget_ms": round(self.budget * 1000),
+            "elapsed_ms": round(self.elapsed() * 1000, 1),
+            "skipped": list(self.skipped),
+        }
+        if self.expired:
+            data["expired"] = True
+        return data
+
+
+_current_deadline: contextvars.ContextVar[Optional[TurnDeadline]] = contextvars.ContextVar("agent_v2_deadline", default=None)
+
+
+def start_deadline(budget: float, started_at: Optional[float] = None) -> contextvars.Token:
+    """Start the deadline of the current turn. Pass the returned token to `end_deadline`."""
+    return _current_deadline.set(TurnDeadline(budget, started_at))
+
+
+def end_deadline(token: contextvars.Token) -> None:
+    _current_deadline.reset(token)
+
+
+def get_current_deadline() -> Optional[TurnDeadline]:
+    return _current_deadline.get()
+
+
+def stage_allowed(stage: str) -> bool:
+    """True when the stage's minimum budget is left (always outside a turn); records skips."""
+    deadline = _current_deadline.get()
+    if deadline is None or deadline.remaining() >= DEADLINE_MIN_BUDGET[stage]:
+        return True
+    deadline.skip(stage)
+    return False
+
+
+def mark_skipped(stage: str) -> None:
+    """Record a stage that ran out of time (no-op outside a turn)."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.skip(stage)
+
+
+async def bounded(awaitable: Awaitable[T], generation: bool = False) -> T:
+    """
+    Await `awaitable` within the turn deadline (no limit outside a turn).
+
+    Args:
+        awaitable: Coroutine or future to await
+        generation: The call produces the answer: not capped at TOOL_TIMEOUT and
+            only the finalize reserve is kept
+
+    Raises:
+        DeadlineExceeded: The call was cancelled when the time ran out
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return await awaitable
+
+    if generation:
+        timeout = deadline.timeout(DEADLINE_FINALIZE_RESERVE)
+    else:
+        timeout = deadline.timeout(DEADLINE_GENERATION_RESERVE, TOOL_TIMEOUT)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"No result within {timeout:.1f}s ({deadline.remaining():.1f}s left in turn)")
+
+
+async def without_deadline(awaitable: Awaitable[T]) -> T:
+    """Await work that is not part of the answer (e.g. the history summary) without the turn's deadline."""
+    token = _current_deadline.set(None)
+    try:
+        return await awaitable
+    finally:
+        _current_deadline.reset(token)
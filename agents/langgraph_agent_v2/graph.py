@@ -5,6 +5,8 @@ import logging
 from langgraph.graph import StateGraph, END
 from typing import Literal
 from .state import AgentState
+from .tracing import traced_node
+from .deadline import stage_allowed
 from .nodes import (
     preprocess_node,
     routing_node,
@@ -23,9 +25,14 @@ from .nodes import (
 
 logger = logging.getLogger(__name__)
 
-# Conditional edge: only validate if we used RAG (knowledge retrieval).
+# Conditional edge: only validate if we used RAG (knowledge retrieval) and there is time left.
+# Deferred validation runs after the answer is sent (background_validation.py).
 def should_run_validation(state: AgentState) -> Literal["validate", "skip"]:
-    return "validate" if getattr(state, "used_rag", False) else "skip"
+    if getattr(state, "defer_validation", False):
+        return "skip"
+    if not getattr(state, "used_rag", False):
+        return "skip"
+    return "validate" if stage_allowed("validation") else "skip"
 
 # Global graph instance
 _graph = None
@@ -41,17 +48,17 @@ def build_graph():
     # Create graph with AgentState
     graph = StateGraph(AgentState)
     
-    # Add nodes
-    graph.add_node("preprocess", preprocess_node)
-    graph.add_node("route", routing_node)
-    graph.add_node("knowledge", knowledge_retrieval_node)
-    graph.add_node("vehicle", vehicle_search_node)
-    graph.add_node("contact", contact_collection_node)
-    graph.add_node("reason", reasoning_node)
-    graph.add_node("generate", response_generation_node)
-    graph.add_node("validate", validation_node)
-    graph.add_node("postprocess", postprocess_node)
-    graph.add_node("final", final_node)
+    # Add nodes (wrapped for per-node timing, see tracing.py)
+    graph.add_node("preprocess", traced_node("preprocess", preprocess_node))
+    graph.add_node("route", traced_node("route", routing_node))
+    graph.add_node("knowledge", traced_node("knowledge", knowledge_retrieval_node))
+    graph.add_node("vehicle", traced_node("vehicle", vehicle_search_node))
+    graph.add_node("contact", traced_node("contact", contact_collection_node))
+    graph.add_node("reason", traced_node("reason", reasoning_node))
+    graph.add_node("generate", traced_node("generate", response_generation_node))
+    graph.add_node("validate", traced_node("validate", validation_node))
+    graph.add_node("postprocess", traced_node("postprocess", postprocess_node))
+    graph.add_node("final", traced_node("final", final_node))
     
     # Set entry point
     graph.set_entry_point("preprocess")
@@ -0,0 +1,177 @@
+"""
+Token-budgeted conversation history for LangGraph Agent V2.
+
+Every node builds its prompt from one shared view computed once per turn:
+the last HISTORY_RECENT_TURNS turns verbatim (within HISTORY_TOKEN_BUDGET) plus a
+rolling summary of everything older. The summary is stored on the session's
+conversation checkpoint and refreshed off the critical path every
+HISTORY_SUMMARY_EVERY_TURNS turns, so prompt size stays flat on long chats.
+"""
+import logging
+from typing import Optional, Dict, Any, List
+from chats.models import ConversationCheckpoint
+from agents.llm_executor import PRIORITY_BACKGROUND
+from agents.llm_pool import TIER_CLASSIFY
+from agents.session_manager import ConversationHistory
+from .state import AgentState
+from .tools.llm import llm_call
+from .config import (
+    HISTORY_RECENT_TURNS,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_MESSAGE_MAX_TOKENS,
+    HISTORY_SUMMARY_EVERY_TURNS,
+    HISTORY_SUMMARY_MAX_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when its encoding is available, else ~4 characters per token."""
+    global _encoding, _encoding_failed
+    if not text:
+        return 0
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken downloads its encoding on first use; fall back when offline
+            logger.warning(f"[HISTORY] tiktoken unavailable, estimating tokens: {str(e)}")
+            _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[:max_tokens]) + "..."
+    return text[:max_tokens * 4] + "..."
+
+
+def _previous_messages(messages: List[Dict[str, str]], current_message: str) -> List[Dict[str, str]]:
+    """Drop the current user message (it is saved before the turn starts)."""
+    previous = list(messages)
+    if previous and previous[-1].get("role") == "user" and previous[-1].get("content") == current_message:
+        previous.pop()
+    return previous
+
+
+def _recent_start(messages: List[Dict[str, str]]) -> int:
+    """Index of the first message of the last HISTORY_RECENT_TURNS turns (a turn starts with a user message)."""
+    turns = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get("role") == "user":
+            turns += 1
+            if turns == HISTORY_RECENT_TURNS:
+                return index
+    return 0
+
+
+def build_history_view(history: ConversationHistory, current_message: str) -> Dict[str, Any]:
+    """
+    Trim the loaded history to the prompt window.
+
+    Returns:
+        {"recent": messages kept verbatim, "summary": rolling summary or None,
+         "first_recent": session-wide position of the first verbatim message,
+         "pending": older messages not yet folded into the summary}
+    """
+    offset = history.message_count - len(history.messages)  # session-wide position of history.messages[0]
+    previous = _previous_messages(history.messages, current_message)
+    start = _recent_start(previous)
+
+    recent = []
+    used = 0
+    first_index = len(previous)
+    for index in range(len(previous) - 1, start - 1, -1):
+        message = previous[index]
+        if message.get("role") not in ("user", "assistant"):
+            continue
+        content = _truncate_to_tokens(message.get("content", ""), HISTORY_MESSAGE_MAX_TOKENS)
+        tokens = count_tokens(content)
+        if recent and used + tokens > HISTORY_TOKEN_BUDGET:
+            break
+        recent.insert(0, {"role": message["role"], "content": content})
+        used += tokens
+        first_index = index
+
+    first_recent = offset + first_index
+    return {
+        "recent": recent,
+        "summary": history.summary or None,
+        "first_recent": first_recent,
+        "pending": max(0, first_recent - history.summary_message_count),
+    }
+
+
+def format_history(state: AgentState, default: str = "No previous conversation") -> str:
+    """The shared history text used in node prompts."""
+    lines = []
+    if state.conversation_summary:
+        lines.append(f"(Summary of earlier conversation: {state.conversation_summary})")
+    for message in state.conversation_history:
+        lines.append(f"{message.get('role', 'user')}: {message.get('content', '')}")
+    return "\n".join(lines) if lines else default
+
+
+def needs_summary_refresh(view: Dict[str, Any]) -> bool:
+    """Refresh once HISTORY_SUMMARY_EVERY_TURNS turns (user + assistant) fell out of the verbatim window."""
+    return view["pending"] >= HISTORY_SUMMARY_EVERY_TURNS * 2
+
+
+SUMMARY_PROMPT = """Update the running summary of a customer conversation with WhipSmart's assistant.
+
+Current summary:
+{summary}
+
+Messages to fold in:
+{messages}
+
+Write the updated summary in at most {max_words} words. Keep facts the assistant needs later:
+the user's situation and goals, vehicles or products discussed, numbers they gave, questions
+already answered and anything they asked to follow up on. Do not include contact details.
+Return only the summary text."""
+
+
+async def refresh_summary(session_id: str, history: ConversationHistory, view: Dict[str, Any]) -> Optional[str]:
+    """
+    Fold the messages that left the verbatim window into the session's rolling summary.
+    Runs at background priority; the result is used from the next turn on.
+    """
+    first_recent = view["first_recent"]
+    offset = history.message_count - len(history.messages)  # absolute position of history.messages[0]
+    start = max(0, history.summary_message_count - offset)
+    end = max(0, first_recent - offset)
+    to_fold = [m for m in history.messages[start:end] if m.get("role") in ("user", "assistant")]
+    if not to_fold:
+        return None
+
+    prompt = SUMMARY_PROMPT.format(
+        summary=history.summary or "(none yet)",
+        messages="\n".join(f"{m['role']}: {_truncate_to_tokens(m.get('content', ''), HISTORY_MESSAGE_MAX_TOKENS)}" for m in to_fold),
+        max_words=int(HISTORY_SUMMARY_MAX_TOKENS * 0.75),
+    )
+    try:
+        summary = await llm_call(
+            prompt=prompt,
+            temperature=0.3,
+            max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+            priority=PRIORITY_BACKGROUND,
+            tier=TIER_CLASSIFY
+        )
+        await ConversationCheckpoint.objects.filter(session_id=session_id).aupdate(
+            summary=summary,
+            summary_message_count=first_recent
+        )
+        logger.info(f"[HISTORY] Summary refreshed for session {session_id} ({len(to_fold)} messages folded)")
+        return summary
+    except Exception as e:
+        logger.warning(f"[HISTORY] Summary refresh failed for session {session_id}: {str(e)}")
+        return None
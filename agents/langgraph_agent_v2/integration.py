@@ -2,15 +2,41 @@
 Integration layer for LangGraph Agent V2.
 Compatible with existing WebSocket and REST API.
 """
+import asyncio
+import functools
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
+from asgiref.sync import async_to_sync
 from chats.models import Session
 from agents.session_manager import session_manager
+from agents.llm_pool import aclose_async_clients
 from .state import AgentState
 from .graph import get_graph
+from .config import (
+    ENABLE_CACHING,
+    ENABLE_BACKGROUND_VALIDATION,
+    ENABLE_BACKGROUND_SUGGESTIONS,
+    ENABLE_TRACING,
+    ENABLE_TURN_DEADLINE,
+    RESPONSE_TIMEOUT,
+    DEADLINE_FINALIZE_RESERVE,
+    DEADLINE_FALLBACK_RESPONSE,
+)
+from .background_validation import ValidationJob, build_pending_metadata
+from .background_suggestions import SuggestionJob, build_pending_metadata as build_pending_suggestions_metadata
+from .nodes.postprocess import apply_team_connection_offer
+from .tools.answer_cache import is_cacheable_question, lookup_answer, store_answer
+from .tools.contact_extraction import has_contact_signal
+from .tools.rag import SpeculativeRetrieval
+from .tracing import start_trace, end_trace, get_current_trace
+from .deadline import start_deadline, end_deadline, get_current_deadline, bounded, without_deadline, DeadlineExceeded
+from .history import build_history_view, needs_summary_refresh, refresh_summary
 
 logger = logging.getLogger(__name__)
 
+# References to in-flight summary refreshes (the event loop only keeps weak references to tasks)
+_summary_tasks = set()
+
 def _increment_question_count(conversation_data: Dict[str, Any]) -> int:
     current = int(conversation_data.get("question_count") or 0)
     current += 1
@@ -24,20 +50,91 @@ class ChatAPIIntegration:
     """
     
     @staticmethod
-    def process_message(session_id: str, user_message: str) -> Dict[str, Any]:
+    def _is_personalised(state: AgentState) -> bool:
+        """Answers to a known user address them by name (prompts/system.py), so they are not shared."""
+        return bool(state.user_name or state.user_email or state.user_phone)
+    
+    @staticmethod
+    def _is_storable_answer(final_state: AgentState) -> bool:
+        """Only knowledge answers that passed validation are reused for other users."""
+        validation_passed = final_state.validation_result.get('overall_valid', True) if final_state.validation_result else True
+        return bool(
+            final_state.final_response
+            and not ChatAPIIntegration._is_personalised(final_state)
+            and final_state.question_type in {"domain_question", "service_discovery"}
+            and final_state.used_rag
+            and validation_passed
+            and not final_state.contact_info_detected
+            and not final_state.collecting_user_info
+            and not final_state.needs_info
+        )
+    
+    @staticmethod
+    def process_message(
+        session_id: str,
+        user_message: str,
+        on_token: Optional[Callable[[str], Any]] = None,
+        defer_suggestions: bool = False,
+        received_at: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Synchronous entry point (REST API). Runs `aprocess_message` to completion
+        (validation and the history summary refresh inline - the event loop ends with the call).
+        With `defer_suggestions` the caller submits the returned `suggestion_job` with
+        `background_suggestions.submit_in_background`.
+        """
+        async def run() -> Dict[str, Any]:
+            try:
+                return await ChatAPIIntegration.aprocess_message(
+                    session_id, user_message, on_token=on_token, defer_suggestions=defer_suggestions,
+                    background_summary=False, received_at=received_at
+                )
+            finally:
+                # Every call gets a new event loop: close the LLM clients bound to it
+                await aclose_async_clients()
+        
+        return async_to_sync(run)()
+    
+    @staticmethod
+    async def aprocess_message(
+        session_id: str,
+        user_message: str,
+        on_token: Optional[Callable[[str], Any]] = None,
+        defer_validation: bool = False,
+        defer_suggestions: bool = False,
+        background_summary: bool = True,
+        received_at: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Process a user message and return response.
         
+        The graph runs natively on the event loop: LLM calls are awaited and
+        independent calls inside a node run concurrently.
+        
         Args:
             session_id: Session ID
             user_message: User's message
+            on_token: Optional callback (sync or async) invoked with each generated
+                token as the model streams the answer (used by the WebSocket consumer)
+            defer_validation: Skip inline validation; the result then carries a
+                `validation_job` for `background_validation.validate_in_background`
+                (requires ENABLE_BACKGROUND_VALIDATION)
+            defer_suggestions: Skip inline suggestion generation; the result then carries
+                a `suggestion_job` for `background_suggestions.generate_in_background`
+                (requires ENABLE_BACKGROUND_SUGGESTIONS)
+            background_summary: Refresh the rolling history summary in a background
+                task (False awaits it before returning)
+            received_at: time.monotonic() when the message was received; the turn
+                deadline (RESPONSE_TIMEOUT) starts there (default: now)
         
         Returns:
             Response dictionary compatible with existing API
         """
+        trace_token = start_trace() if ENABLE_TRACING else None
+        deadline_token = start_deadline(RESPONSE_TIMEOUT, received_at) if ENABLE_TURN_DEADLINE else None
         try:
             # Get or create session
-            session = Session.objects.get(id=session_id)
+            session = await Session.objects.select_related('visitor', 'checkpoint').aget(id=session_id)
             conversation_data = session.conversation_data or {}
             visitor = session.visitor
             
@@ -53,11 +150,18 @@ class ChatAPIIntegration:
                     'metadata': {}
                 }
             
-            # Get or create agent state
-            agent_state_dict = session_manager.get_or_create_agent_state(session_id)
+            if not session.is_active:
+                raise Session.DoesNotExist
             
-            # Convert to AgentState
-            state = AgentState.from_dict(agent_state_dict.to_dict() if hasattr(agent_state_dict, 'to_dict') else agent_state_dict)
+            # Conversation history: checkpoint + messages saved since the last turn
+            history = await session_manager.aload_history(session)
+            history_view = build_history_view(history, user_message)
+            state = AgentState(
+                session_id=str(session.id),
+                messages=list(history.messages),
+                conversation_history=history_view["recent"],
+                conversation_summary=history_view["summary"],
+            )
             
             # Update user info from conversation_data, then visitor profile (persist across sessions)
             state.user_name = conversation_data.get('name') or state.user_name or visitor.name
@@ -71,6 +175,8 @@ class ChatAPIIntegration:
             state.question_count = int(conversation_data.get('question_count') or 0)
             state.last_team_offer_count = int(conversation_data.get('last_team_offer_count') or 0)
             state.awaiting_team_connection_confirm = bool(conversation_data.get('awaiting_team_connection_confirm') or False)
+            state.defer_validation = bool(defer_validation and ENABLE_BACKGROUND_VALIDATION)
+            state.defer_suggestions = bool(defer_suggestions and ENABLE_BACKGROUND_SUGGESTIONS)
             
             # Add user message
             state.messages.append({
@@ -83,17 +189,95 @@ class ChatAPIIntegration:
             if state.step in {"chatting", "awaiting_team_connection"} and not conversation_data.get("collecting_user_info", False):
                 state.question_count = _increment_question_count(conversation_data)
             
-            # Get graph and invoke
-            graph = get_graph()
             logger.info("=" * 80)
-            logger.info(f"[AGENT_V2] ===== USING LANGGRAPH AGENT V2 =====")
+            logger.info("[AGENT_V2] ===== USING LANGGRAPH AGENT V2 =====")
             logger.info(f"[AGENT_V2] Processing message for session: {session_id}")
             logger.info(f"[AGENT_V2] User message: {user_message[:100]}")
             logger.info("=" * 80)
             
-            # Invoke graph
-            final_state_dict = graph.invoke(state.to_dict())
-            final_state = AgentState.from_dict(final_state_dict)
+            # Semantic answer cache - only for plain questions in normal chat flow, from anonymous visitors
+            cache_probe = None
+            answered_from_cache = False
+            validation_job = None
+            suggestion_job = None
+            if (
+                ENABLE_CACHING
+                and state.step == "chatting"
+                and not state.awaiting_team_connection_confirm
+                and not ChatAPIIntegration._is_personalised(state)
+                and not conversation_data.get("collecting_user_info", False)
+                and not has_contact_signal(user_message)
+                and is_cacheable_question(
+                    user_message,
+                    has_history=any(m.get("role") == "assistant" for m in state.messages)
+                )
+            ):
+                try:
+                    cache_probe = await bounded(lookup_answer(user_message))
+                except DeadlineExceeded as e:
+                    logger.warning(f"[AGENT_V2] Answer cache lookup out of time: {str(e)}")
+            
+            if cache_probe and cache_probe["hit"]:
+                cached = cache_probe["hit"]
+                logger.info("[AGENT_V2] Answer cache hit - skipping graph")
+                final_state = state
+                final_state.question_type = cached["question_type"]
+                final_state.final_response = cached["response"]
+                final_state.suggestions = list(cached["suggestions"])
+                apply_team_connection_offer(final_state)
+                answered_from_cache = True
+            else:
+                # Get graph and invoke
+                graph = get_graph()
+                speculative_rag = SpeculativeRetrieval()
+                run_config = {"configurable": {"on_token": on_token, "speculative_rag": speculative_rag}}
+                deadline = get_current_deadline()
+                try:
+                    invoke = graph.ainvoke(state.to_dict(), config=run_config)
+                    if deadline:
+                        # Backstop: nodes stop on their own (generation at the finalize
+                        # reserve), this only fires if one overruns
+                        invoke = asyncio.wait_for(invoke, deadline.timeout(DEADLINE_FINALIZE_RESERVE / 2))
+                    final_state = AgentState.from_dict(await invoke)
+                except asyncio.TimeoutError:
+                    # Without a turn deadline this is a timeout inside the graph (socket, Pinecone, ...)
+                    if deadline:
+                        logger.error(f"[AGENT_V2] Turn exceeded its {RESPONSE_TIMEOUT}s deadline - sending fallback answer")
+                        deadline.expired = True
+                    else:
+                        logger.error("[AGENT_V2] Request timed out inside the graph - sending fallback answer", exc_info=True)
+                    final_state = state
+                    final_state.final_response = DEADLINE_FALLBACK_RESPONSE
+                finally:
+                    # Not consumed (route was not knowledge) - drop it
+                    speculative_rag.discard()
+                
+                if final_state.defer_validation and final_state.used_rag:
+                    validation_job = ValidationJob(state=final_state)
+                if final_state.suggestions_pending:
+                    suggestion_job = SuggestionJob(
+                        messages=final_state.messages,
+                        answer=final_state.draft_response or final_state.final_response or ""
+                    )
+                
+                if cache_probe and ChatAPIIntegration._is_storable_answer(final_state):
+                    store = functools.partial(
+                        store_answer,
+                        cache_probe,
+                        user_message,
+                        final_state.final_response,
+                        # Filled in place once the background suggestions are generated
+                        suggestion_job.suggestions if suggestion_job else final_state.suggestions,
+                        final_state.question_type
+                    )
+                    if validation_job:
+                        # Only cache once the background checks have passed
+                        # (callers run them after the background suggestions)
+                        validation_job.on_passed = store
+                    elif suggestion_job:
+                        suggestion_job.on_ready = store
+                    else:
+                        await store()
             
             # Extract response
             response_message = final_state.final_response or final_state.draft_response or ""
@@ -112,7 +296,21 @@ class ChatAPIIntegration:
             
             # Save conversation data
             session.conversation_data = conversation_data
-            session.save(update_fields=['conversation_data'])
+            await session.asave(update_fields=['conversation_data'])
+            
+            try:
+                await session_manager.asave_checkpoint(session, history)
+            except Exception as e:
+                logger.warning(f"[AGENT_V2] Failed to save conversation checkpoint: {str(e)}")
+            else:
+                if needs_summary_refresh(history_view):
+                    refresh = refresh_summary(str(session.id), history, history_view)
+                    if background_summary:
+                        task = asyncio.create_task(without_deadline(refresh))
+                        _summary_tasks.add(task)
+                        task.add_done_callback(_summary_tasks.discard)
+                    else:
+                        await without_deadline(refresh)
 
             # Persist contact info to visitor so next session doesn't ask again
             updated = False
@@ -126,13 +324,35 @@ class ChatAPIIntegration:
                 visitor.phone = final_state.user_phone
                 updated = True
             if updated:
-                visitor.save(update_fields=['name', 'email', 'phone'])
+                await visitor.asave(update_fields=['name', 'email', 'phone'])
             
             # NOTE: Do not call `session_manager.save_agent_state` here.
             # That helper expects the v1 `agents.state.AgentState` object, and it also writes assistant messages.
             # WebSocket/REST layers already persist assistant messages via `session_manager.save_assistant_message`,
             # so calling it here would be redundant and error-prone.
             
+            metadata = {
+                'question_type': final_state.question_type,
+                'validation_passed': final_state.validation_result.get('overall_valid', True) if final_state.validation_result else True,
+                'answer_cache': 'hit' if answered_from_cache else ('miss' if cache_probe else 'skipped'),
+                'reasoning_path': (final_state.reasoning_output or {}).get('path')
+            }
+            if validation_job:
+                metadata['validation'] = build_pending_metadata(final_state)
+            if suggestion_job:
+                metadata['suggestions'] = build_pending_suggestions_metadata()
+            deadline = get_current_deadline()
+            if deadline:
+                metadata['deadline'] = deadline.to_dict()
+            trace = get_current_trace()
+            if trace:
+                trace.answer_cache = metadata['answer_cache']
+                metadata['trace'] = trace.to_dict()
+                logger.info(
+                    f"[AGENT_V2] Turn took {metadata['trace']['total_ms']:.0f}ms: "
+                    + ", ".join(f"{n['node']}={n['wall_ms']:.0f}ms" for n in metadata['trace']['nodes'])
+                )
+            
             # Format response
             return {
                 'message': response_message,
@@ -141,10 +361,9 @@ class ChatAPIIntegration:
                 'needs_info': final_state.needs_info,
                 'followup_type': final_state.followup_type or '',
                 'followup_message': final_state.followup_message or '',
-                'metadata': {
-                    'question_type': final_state.question_type,
-                    'validation_passed': final_state.validation_result.get('overall_valid', True) if final_state.validation_result else True
-                }
+                'metadata': metadata,
+                'validation_job': validation_job,
+                'suggestion_job': suggestion_job
             }
             
         except Session.DoesNotExist:
@@ -169,3 +388,8 @@ class ChatAPIIntegration:
                 'followup_message': '',
                 'metadata': {'error': str(e)}
             }
+        finally:
+            if deadline_token:
+                end_deadline(deadline_token)
+            if trace_token:
+                end_trace(trace_token)
@@ -1,12 +1,16 @@
 """
 Contact collection node.
-LLM-driven flow for collecting, confirming, and updating contact details.
+Flow for collecting, confirming, and updating contact details. Replies the contact
+patterns read confidently are handled directly; the rest are interpreted by the LLM.
 """
 import logging
-from typing import Any, Dict, Literal
+from typing import Any, Dict, Literal, Optional
 
 from ..state import AgentState
 from ..tools.llm import llm_call_json
+from ..tools.contact_extraction import extract_contact_patterns, match_confirmation, match_callback_datetime
+from ..config import ENABLE_PATTERN_CONTACT_EXTRACTION, CONTACT_CONFIDENCE_THRESHOLD
+from agents.llm_pool import TIER_CLASSIFY
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +51,7 @@ def _build_callback_prompt(state: AgentState) -> str:
     )
 
 
-def _callback_intent_llm(user_message: str, state: AgentState) -> Dict[str, Any]:
+async def _callback_intent_llm(user_message: str, state: AgentState) -> Dict[str, Any]:
     """
     LLM interprets user's callback scheduling preference.
     We store free-text to avoid timezone/locale parsing bugs.
@@ -87,14 +91,14 @@ Rules:
 5) Do NOT invent a datetime; only extract what the user wrote.
 """
     try:
-        result = llm_call_json(prompt=prompt, temperature=0.1, max_tokens=250)
+        result = await llm_call_json(prompt=prompt, temperature=0.1, max_tokens=250, cache=True, tier=TIER_CLASSIFY)
         return result if isinstance(result, dict) else {}
     except Exception as exc:
         logger.warning("[CONTACT] Callback parse failed: %s", str(exc))
         return {}
 
 
-def _contact_intent_llm(user_message: str, state: AgentState) -> Dict[str, Any]:
+async def _contact_intent_llm(user_message: str, state: AgentState) -> Dict[str, Any]:
     """
     LLM interprets user intent and extracts contact updates.
     """
@@ -134,7 +138,7 @@ Rules:
 """
 
     try:
-        result = llm_call_json(prompt=prompt, temperature=0.1, max_tokens=350)
+        result = await llm_call_json(prompt=prompt, temperature=0.1, max_tokens=350, tier=TIER_CLASSIFY)
         if not isinstance(result, dict):
             return {}
         return result
@@ -143,6 +147,33 @@ Rules:
         return {}
 
 
+def _pattern_callback_intent(user_message: str) -> Optional[Dict[str, Any]]:
+    """Pattern-tier equivalent of `_callback_intent_llm` (None when not confident)."""
+    if not ENABLE_PATTERN_CONTACT_EXTRACTION:
+        return None
+    parsed = match_callback_datetime(user_message)
+    return parsed if parsed["confidence"] >= CONTACT_CONFIDENCE_THRESHOLD else None
+
+
+def _pattern_contact_intent(user_message: str, state: AgentState) -> Optional[Dict[str, Any]]:
+    """Pattern-tier equivalent of `_contact_intent_llm` (None when not confident)."""
+    if not ENABLE_PATTERN_CONTACT_EXTRACTION:
+        return None
+    if state.step == "confirmation" and match_confirmation(user_message) >= CONTACT_CONFIDENCE_THRESHOLD:
+        return {"intent": "confirm", "confirmed": True, "updates": {}}
+
+    expected_field = state.step if state.step in {"name", "email", "phone"} else None
+    matched = extract_contact_patterns(user_message, expected_field)
+    if matched["confidence"] < CONTACT_CONFIDENCE_THRESHOLD:
+        return None
+    updates = {key: matched[key] for key in ("name", "email", "phone") if matched[key]}
+    if state.step == "confirmation" and (not updates or "name" in updates):
+        # "no", questions, free text - the LLM writes the reply; it also decides name changes
+        # ("This is Wrong" is not a new name)
+        return None
+    return {"intent": "provide_details" if updates else "unclear", "confirmed": False, "updates": updates}
+
+
 def _apply_updates(state: AgentState, updates: Dict[str, Any]) -> bool:
     """Apply LLM-extracted updates to state."""
     if not isinstance(updates, dict):
@@ -180,7 +211,7 @@ def _next_missing_field(state: AgentState) -> str:
     return "phone"
 
 
-def contact_collection_node(state: AgentState) -> AgentState:
+async def contact_collection_node(state: AgentState) -> AgentState:
     """
     Handle contact information collection with LLM-driven interpretation.
     """
@@ -190,7 +221,7 @@ def contact_collection_node(state: AgentState) -> AgentState:
 
     # Callback scheduling step (after confirmation).
     if state.step == "callback_schedule":
-        parsed = _callback_intent_llm(user_message, state)
+        parsed = _pattern_callback_intent(user_message) or await _callback_intent_llm(user_message, state)
         intent = parsed.get("intent")
 
         if intent == "provide_datetime" and isinstance(parsed.get("preferred_datetime"), str) and parsed["preferred_datetime"].strip():
@@ -230,7 +261,7 @@ def contact_collection_node(state: AgentState) -> AgentState:
 
     # Highest priority: if already in confirmation, process confirmation/change first.
     if state.step == "confirmation":
-        parsed = _contact_intent_llm(user_message, state)
+        parsed = _pattern_contact_intent(user_message, state) or await _contact_intent_llm(user_message, state)
         intent = parsed.get("intent")
 
         if parsed.get("confirmed") is True or intent == "confirm":
@@ -281,7 +312,7 @@ def contact_collection_node(state: AgentState) -> AgentState:
 
     # Collect details flow.
     state.collecting_user_info = True
-    parsed = _contact_intent_llm(user_message, state)
+    parsed = _pattern_contact_intent(user_message, state) or await _contact_intent_llm(user_message, state)
     _apply_updates(state, parsed.get("updates", {}))
 
     if _all_contact_present(state):
@@ -7,7 +7,7 @@ from ..state import AgentState
 logger = logging.getLogger(__name__)
 
 
-def final_node(state: AgentState) -> AgentState:
+async def final_node(state: AgentState) -> AgentState:
     """
     Final node - ensures response is ready.
     """
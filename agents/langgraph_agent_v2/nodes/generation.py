@@ -1,12 +1,25 @@
 """
 Response generation node.
 """
+import inspect
 import logging
 from typing import Optional
+from langchain_core.runnables import RunnableConfig
 from ..state import AgentState
-from ..tools.llm import llm_call
+from ..history import format_history
+from ..tools.llm import llm_call, llm_stream
+from agents.llm_executor import PRIORITY_GENERATION
+from agents.llm_pool import TIER_GENERATE
 from ..prompts.system import build_system_prompt
-from ..config import LLM_TEMPERATURE_RESPONSE, LLM_MAX_TOKENS_RESPONSE
+from ..deadline import stage_allowed, mark_skipped, DeadlineExceeded
+from ..config import (
+    LLM_TEMPERATURE_RESPONSE,
+    LLM_MAX_TOKENS_RESPONSE,
+    ENABLE_TOKEN_STREAMING,
+    DEADLINE_COMPACT_RAG_CHUNKS,
+    DEADLINE_COMPACT_MAX_TOKENS,
+    DEADLINE_FALLBACK_RESPONSE,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +29,19 @@ def assemble_generation_prompt(
     rag_context: list,
     reasoning_output: dict,
     user_name: Optional[str],
-    conversation_history: list,
+    history_text: str,
     system_prompt: str,
-    question_type: str = "domain_question"
+    question_type: str = "domain_question",
+    max_sources: int = 5
 ) -> str:
     """Assemble comprehensive generation prompt."""
     # Format RAG context
     rag_text = ""
     if rag_context:
-        for i, chunk in enumerate(rag_context[:5], 1):
+        for i, chunk in enumerate(rag_context[:max_sources], 1):
+            # No URLs: postprocess strips links, so streamed tokens would differ from the final answer
             content = chunk.get("content", "")
-            url = chunk.get("metadata", {}).get("url", "")
             rag_text += f"\n[Source {i}]\n{content}\n"
-            if url:
-                rag_text += f"Source: {url}\n"
     
     # Format reasoning outputs
     intent_analysis = reasoning_output.get("intent", {})
@@ -68,12 +80,12 @@ REASONING OUTPUTS:
 - Must Include: {', '.join(coverage_plan.get('must_include', []))}
 
 CONVERSATION HISTORY:
-{chr(10).join([f"{msg.get('role', 'user')}: {msg.get('content', '')[:100]}" for msg in conversation_history[-3:]])}
+{history_text}
 
 INSTRUCTIONS:
 1. Generate a response following the structure plan
 2. Cover all topics in the "must include" list
-3. Use knowledge base context accurately - cite sources with URLs
+3. Use knowledge base context accurately - do not include URLs or links
 4. Keep answer concise ({structure_plan.get('ideal_length', 4)} key points)
 5. Use markdown formatting (bold, headings, lists)
 6. Use single \\n for line breaks, \\n\\n for paragraph separation
@@ -86,14 +98,24 @@ Generate the response now:"""
     return prompt
 
 
-def response_generation_node(state: AgentState) -> AgentState:
+def _get_token_callback(config: Optional[RunnableConfig]):
+    """Return the caller's `on_token` callback (sync or async) from the run config, if any."""
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get("on_token")
+
+
+async def response_generation_node(state: AgentState, config: Optional[RunnableConfig] = None) -> AgentState:
     """
     Generate response using all reasoning outputs.
+    
+    When the caller passes `on_token` in the run config (WebSocket layer), tokens are
+    forwarded as the model produces them. Only the first attempt is streamed; validation
+    retries regenerate silently and the caller sends the final text on completion.
     """
     user_question = state.messages[-1]["content"] if state.messages else ""
     rag_context = state.rag_context
     reasoning = state.reasoning_output or {}
-    conversation_history = state.messages[:-1] if len(state.messages) > 1 else []
     question_type = state.question_type or "domain_question"
     
     logger.info(f"[GENERATION] Generating response for question type: {question_type}")
@@ -106,30 +128,63 @@ def response_generation_node(state: AgentState) -> AgentState:
         step=state.step
     )
     
+    # Short on time: fewer sources, no history and a shorter answer
+    compact = not stage_allowed("full_prompt")
+    
     # Assemble generation prompt
     generation_prompt = assemble_generation_prompt(
         user_question=user_question,
         rag_context=rag_context,
         reasoning_output=reasoning,
         user_name=state.user_name,
-        conversation_history=conversation_history,
+        history_text="" if compact else format_history(state, default=""),
         system_prompt=system_prompt,
-        question_type=question_type
+        question_type=question_type,
+        max_sources=DEADLINE_COMPACT_RAG_CHUNKS if compact else 5
     )
+    max_tokens = DEADLINE_COMPACT_MAX_TOKENS if compact else LLM_MAX_TOKENS_RESPONSE
+    
+    on_token = _get_token_callback(config)
+    should_stream = bool(ENABLE_TOKEN_STREAMING and on_token and state.validation_retry_count == 0)
     
     # Generate response
+    parts = []
     try:
-        response = llm_call(
-            prompt=generation_prompt,
-            temperature=LLM_TEMPERATURE_RESPONSE,
-            max_tokens=LLM_MAX_TOKENS_RESPONSE
-        )
+        if should_stream:
+            async def stream_tokens():
+                async for delta in llm_stream(
+                    prompt=generation_prompt,
+                    temperature=LLM_TEMPERATURE_RESPONSE,
+                    max_tokens=max_tokens,
+                    tier=TIER_GENERATE
+                ):
+                    parts.append(delta)
+                    sent = on_token(delta)
+                    if inspect.isawaitable(sent):
+                        await sent
+            
+            # llm_stream applies the generation deadline per chunk
+            await stream_tokens()
+            response = "".join(parts).strip()
+        else:
+            response = await llm_call(
+                prompt=generation_prompt,
+                temperature=LLM_TEMPERATURE_RESPONSE,
+                max_tokens=max_tokens,
+                priority=PRIORITY_GENERATION,
+                tier=TIER_GENERATE
+            )
         
         state.draft_response = response
         state.last_assistant_message = response
         
-        logger.info(f"[GENERATION] Generated response ({len(response)} chars)")
+        logger.info(f"[GENERATION] Generated response ({len(response)} chars, streamed={should_stream})")
         
+    except DeadlineExceeded as e:
+        # Keep what was already streamed to the user, if anything
+        logger.error(f"[GENERATION] Out of time: {str(e)}")
+        mark_skipped("generation")
+        state.draft_response = "".join(parts).strip() or DEADLINE_FALLBACK_RESPONSE
     except Exception as e:
         logger.error(f"[GENERATION] Failed: {str(e)}", exc_info=True)
         state.draft_response = "I apologize, but I encountered an error generating a response. Please try again."
@@ -2,17 +2,24 @@
 Knowledge retrieval node - Enhanced RAG search with parallel queries.
 """
 import logging
+from typing import Optional
+from asgiref.sync import sync_to_async
+from langchain_core.runnables import RunnableConfig
 from ..state import AgentState
-from ..tools.rag import search_knowledge_base
+from ..tools.rag import search_with_variations, generate_query_variations, get_speculative_retrieval
+from agents.llm_executor import get_shared_executor, closing_db_connections
+from ..deadline import bounded, mark_skipped, DeadlineExceeded
 from ..config import RAG_TOP_K
 
 logger = logging.getLogger(__name__)
 
 
-def knowledge_retrieval_node(state: AgentState) -> AgentState:
+async def knowledge_retrieval_node(state: AgentState, config: Optional[RunnableConfig] = None) -> AgentState:
     """
-    Enhanced RAG search with query variations.
+    Enhanced RAG search with query variations (searched as one batch, see search_with_variations).
     Special handling for service_discovery queries.
+    Reuses the speculative retrieval started in preprocess when the query is close enough
+    and no variations are searched.
     """
     query = state.rag_query or state.messages[-1]["content"] if state.messages else ""
     question_type = state.question_type or "domain_question"
@@ -25,8 +32,29 @@ def knowledge_retrieval_node(state: AgentState) -> AgentState:
         query = "WhipSmart services features capabilities what we offer what does WhipSmart do"
         logger.info(f"[KNOWLEDGE] Service discovery detected - using service query")
     
-    # Single RAG call (avoid multiple Pinecone searches per message)
-    results = search_knowledge_base(query, top_k=RAG_TOP_K)
+    results = None
+    try:
+        speculative_rag = get_speculative_retrieval(config)
+        if speculative_rag:
+            if len(generate_query_variations(query, question_type)) == 1:
+                results = await bounded(speculative_rag.take(query))
+            else:
+                # The speculative search only covers the base query
+                speculative_rag.discard()
+        
+        if results is None:
+            # One embeddings request and one vector search, however many variations are enabled.
+            # Embedding + Pinecone clients are sync, so run them off the event loop.
+            results = await bounded(
+                sync_to_async(closing_db_connections(search_with_variations), thread_sensitive=False, executor=get_shared_executor())(
+                    query, question_type, top_k=RAG_TOP_K
+                )
+            )
+    except DeadlineExceeded as e:
+        # Answer without knowledge base context rather than not at all
+        logger.error(f"[KNOWLEDGE] Out of time: {str(e)}")
+        mark_skipped("knowledge")
+        results = []
     
     state.rag_context = results
     state.knowledge_results = results
@@ -3,10 +3,19 @@ Postprocessing node - Suggestions and formatting.
 """
 import logging
 import re
-from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from asgiref.sync import sync_to_async
 from ..state import AgentState
-from ..config import MAX_PARALLEL_WORKERS, TEAM_CONNECTION_THRESHOLD
+from ..deadline import stage_allowed, bounded
+from ..config import (
+    TEAM_CONNECTION_THRESHOLD,
+    ENABLE_SUGGESTION_BANK,
+    SUGGESTION_BANK_MIN_SUGGESTIONS,
+    SUGGESTION_BANK_CONVERSION_SUGGESTION,
+)
 from agents.suggestions import generate_suggestions
+from agents.llm_executor import get_shared_executor, closing_db_connections
+from knowledgebase.services.suggestion_bank import get_bank_suggestions
 
 logger = logging.getLogger(__name__)
 
@@ -39,38 +48,14 @@ def format_response(response: str, rag_context: list) -> str:
     return _strip_links(response)
 
 
-def postprocess_node(state: AgentState) -> AgentState:
+def apply_team_connection_offer(state: AgentState) -> bool:
     """
-    Final processing: suggestions and formatting.
+    Persistent, gentle team connection offer after threshold until connected.
+    Also used for answers served from the answer cache (which skip this node).
+    
+    Returns:
+        True if an offer was added as the follow-up message
     """
-    logger.info("[POSTPROCESS] Starting postprocessing")
-
-    # Always format response (cheap)
-    formatted_response = format_response(state.draft_response or "", state.rag_context)
-    state.final_response = formatted_response or state.draft_response
-
-    # Bypass suggestion generation entirely during follow-ups / info collection
-    in_followup_flow = bool(
-        state.collecting_user_info
-        or state.needs_info
-        or state.step in {"awaiting_team_connection", "name", "email", "phone", "confirmation", "callback_schedule"}
-        or state.awaiting_team_connection_confirm
-    )
-
-    if in_followup_flow:
-        suggestions = []
-        logger.info("[POSTPROCESS] Skipping suggestion generation (follow-up/info flow)")
-    else:
-        # Generate suggestions only in normal chat flow
-        try:
-            suggestions = generate_suggestions(state.messages, state.draft_response, 3)
-        except Exception as e:
-            logger.warning(f"[POSTPROCESS] Suggestion generation failed: {str(e)}")
-            suggestions = []
-
-    state.suggestions = suggestions
-
-    # Persistent, gentle team connection offer after threshold until connected
     missing_contact = (not state.user_name) or (not state.user_email) or (not state.user_phone)
     if (
         not state.is_complete
@@ -95,7 +80,80 @@ def postprocess_node(state: AgentState) -> AgentState:
         state.step = "awaiting_team_connection"
         state.last_team_offer_count = state.question_count
         logger.info(f"[POSTPROCESS] Offering team connection (persistent) at question_count={state.question_count}")
+        return True
+    return False
+
+
+async def bank_suggestions(state: AgentState, max_suggestions: int = 3) -> List[str]:
+    """
+    Suggestions from the suggestion bank of the retrieved chunks (no LLM call).
+    Empty when the bank has too few questions that were not asked already.
+    """
+    if not ENABLE_SUGGESTION_BANK or not state.rag_context:
+        return []
+    asked = [m.get("content", "") for m in state.messages if m.get("role") == "user"]
+    try:
+        suggestions = await sync_to_async(closing_db_connections(get_bank_suggestions), thread_sensitive=False, executor=get_shared_executor())(
+            state.rag_context, asked, max_suggestions - 1
+        )
+    except Exception as e:
+        logger.warning(f"[POSTPROCESS] Suggestion bank lookup failed: {str(e)}")
+        return []
+    if len(suggestions) < SUGGESTION_BANK_MIN_SUGGESTIONS:
+        return []
+    return suggestions + [SUGGESTION_BANK_CONVERSION_SUGGESTION]
+
+
+async def postprocess_node(state: AgentState) -> AgentState:
+    """
+    Final processing: suggestions and formatting.
+    """
+    logger.info("[POSTPROCESS] Starting postprocessing")
+
+    # Always format response (cheap)
+    formatted_response = format_response(state.draft_response or "", state.rag_context)
+    state.final_response = formatted_response or state.draft_response
+
+    # Bypass suggestion generation entirely during follow-ups / info collection
+    in_followup_flow = bool(
+        state.collecting_user_info
+        or state.needs_info
+        or state.step in {"awaiting_team_connection", "name", "email", "phone", "confirmation", "callback_schedule"}
+        or state.awaiting_team_connection_confirm
+    )
+
+    if in_followup_flow:
+        suggestions = []
+        logger.info("[POSTPROCESS] Skipping suggestion generation (follow-up/info flow)")
+    else:
+        # Precomputed for the retrieved chunks - LLM generation only when the bank falls short
+        suggestions = await bank_suggestions(state)
+        if suggestions:
+            logger.info("[POSTPROCESS] Using suggestion bank")
+        elif state.defer_suggestions:
+            # Generated after the answer is sent (background_suggestions.py)
+            pass
+        elif not stage_allowed("suggestions"):
+            suggestions = []
+        else:
+            # Generate suggestions only in normal chat flow
+            try:
+                suggestions = await bounded(sync_to_async(generate_suggestions, thread_sensitive=False, executor=get_shared_executor())(
+                    state.messages, state.draft_response, 3
+                ))
+            except Exception as e:
+                logger.warning(f"[POSTPROCESS] Suggestion generation failed: {str(e)}")
+                suggestions = []
+
+    state.suggestions = suggestions
+
+    offered = apply_team_connection_offer(state)
+    # No suggestions are shown next to a team connection offer
+    state.suggestions_pending = bool(state.defer_suggestions and not suggestions and not in_followup_flow and not offered)
     
-    logger.info(f"[POSTPROCESS] Generated {len(suggestions)} suggestions")
+    if state.suggestions_pending:
+        logger.info("[POSTPROCESS] Suggestions deferred until the answer is sent")
+    else:
+        logger.info(f"[POSTPROCESS] Generated {len(suggestions)} suggestions")
     
     return state
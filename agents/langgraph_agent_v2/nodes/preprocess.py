@@ -1,14 +1,32 @@
 """
-Preprocessing node - Parallel intent classification, contact extraction, and context analysis.
+Preprocessing node - Concurrent intent classification, contact extraction, and context analysis.
+
+With ENABLE_FUSED_PREPROCESS, all three (plus the routing decision) come from a single LLM call.
 """
+import asyncio
 import logging
 import re
-from typing import Dict
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from langchain_core.runnables import RunnableConfig
 from ..state import AgentState
+from ..history import format_history
 from ..tools.llm import llm_call_json
-from ..tools.contact_extraction import extract_contact_info
-from ..config import MAX_PARALLEL_WORKERS
+from agents.llm_pool import TIER_CLASSIFY
+from ..tools.contact_extraction import (
+    extract_contact_info,
+    extract_contact_patterns,
+    has_contact_signal,
+    clean_contact_result,
+    CASUAL_PHRASES,
+)
+from ..tools.rag import get_speculative_retrieval
+from ..config import (
+    ENABLE_FUSED_PREPROCESS,
+    ENABLE_SPECULATIVE_RAG,
+    RAG_TOP_K,
+    ENABLE_PATTERN_CONTACT_EXTRACTION,
+    CONTACT_CONFIDENCE_THRESHOLD,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +44,21 @@ def _is_negative(text: str) -> bool:
     return t in {"no", "n", "nope", "nah", "not now", "later", "don't", "do not"}
 
 
-def classify_intent(user_message: str, conversation_history: list) -> Dict:
-    """Classify user intent using LLM."""
+SERVICE_DISCOVERY_RAG_QUERY = "WhipSmart services features capabilities offerings"
+
+DEFAULT_CONTEXT = {
+    "responding_to": "",
+    "is_correction": False,
+    "conversation_flow": "normal",
+    "needs_clarification": False,
+    "clarification_question": ""
+}
+
+ROUTE_ACTIONS = {"knowledge", "vehicle", "direct"}
+
+
+def _fast_path_intent(user_message: str) -> Optional[Dict]:
+    """Phrase-based intent for greetings and service discovery (no LLM call needed)."""
     # Fast-path: greetings / small-talk should never use RAG
     message_lower = user_message.lower().strip()
     greeting_phrases = [
@@ -53,16 +84,59 @@ def classify_intent(user_message: str, conversation_history: list) -> Dict:
         logger.info(f"[PREPROCESS] Detected service_discovery from phrase: {user_message[:50]}")
         return {
             "intent": "service_discovery",
-            "rag_query": "WhipSmart services features capabilities offerings",
+            "rag_query": SERVICE_DISCOVERY_RAG_QUERY,
             "confidence": 0.9,
             "reasoning": "Detected service discovery phrase"
         }
+    return None
+
+
+def _reclassify_unclear_intent(result: Dict, message_lower: str) -> Dict:
+    """
+    If confidence is low and intent is clarification_needed,
+    check if it might be service_discovery.
+    """
+    if result.get("intent") == "clarification_needed" and result.get("confidence", 1.0) < 0.7:
+        if any(phrase in message_lower for phrase in ["what", "options", "services", "offer", "have", "surprise"]):
+            logger.info(f"[PREPROCESS] Reclassifying clarification_needed -> service_discovery")
+            result["intent"] = "service_discovery"
+            result["rag_query"] = SERVICE_DISCOVERY_RAG_QUERY
+            result["confidence"] = 0.8
+    return result
+
+
+def _fallback_intent(user_message: str) -> Dict:
+    """Keyword-based intent used when the LLM call fails."""
+    message_lower = user_message.lower().strip()
+    # Fallback: if message contains "what" or "options", assume service_discovery
+    if any(word in message_lower for word in ["what", "options", "services", "surprise"]):
+        return {
+            "intent": "service_discovery",
+            "rag_query": SERVICE_DISCOVERY_RAG_QUERY,
+            "confidence": 0.6,
+            "reasoning": "Fallback: detected service discovery keywords"
+        }
+    return {
+        "intent": "domain_question",
+        "rag_query": user_message,
+        "confidence": 0.5,
+        "reasoning": "Fallback classification"
+    }
+
+
+async def classify_intent(user_message: str, history_text: str) -> Dict:
+    """Classify user intent using LLM."""
+    fast_result = _fast_path_intent(user_message)
+    if fast_result:
+        return fast_result
+    message_lower = user_message.lower().strip()
     
     prompt = f"""
     Classify the user's message intent:
     
     Message: {user_message}
-    Conversation History: {conversation_history[-3:] if len(conversation_history) > 3 else conversation_history}
+    Conversation History:
+    {history_text}
     
     Classify as one of:
     - service_discovery: User asking "what are my options?", "what services do you offer?", "what can you help with?", "surprise me", "what do you have?"
@@ -90,43 +164,21 @@ def classify_intent(user_message: str, conversation_history: list) -> Dict:
     """
     
     try:
-        result = llm_call_json(prompt, temperature=0.2, max_tokens=300)
-        
-        # Post-process: if confidence is low and intent is clarification_needed, 
-        # check if it might be service_discovery
-        if result.get("intent") == "clarification_needed" and result.get("confidence", 1.0) < 0.7:
-            if any(phrase in message_lower for phrase in ["what", "options", "services", "offer", "have", "surprise"]):
-                logger.info(f"[PREPROCESS] Reclassifying clarification_needed -> service_discovery")
-                result["intent"] = "service_discovery"
-                result["rag_query"] = "WhipSmart services features capabilities offerings"
-                result["confidence"] = 0.8
-        
-        return result
+        result = await llm_call_json(prompt, temperature=0.2, max_tokens=300, tier=TIER_CLASSIFY)
+        return _reclassify_unclear_intent(result, message_lower)
     except Exception as e:
         logger.error(f"[PREPROCESS] Intent classification failed: {str(e)}")
-        # Fallback: if message contains "what" or "options", assume service_discovery
-        if any(word in message_lower for word in ["what", "options", "services", "surprise"]):
-            return {
-                "intent": "service_discovery",
-                "rag_query": "WhipSmart services features capabilities offerings",
-                "confidence": 0.6,
-                "reasoning": "Fallback: detected service discovery keywords"
-            }
-        return {
-            "intent": "domain_question",
-            "rag_query": user_message,
-            "confidence": 0.5,
-            "reasoning": "Fallback classification"
-        }
+        return _fallback_intent(user_message)
 
 
-def analyze_context(user_message: str, conversation_history: list) -> Dict:
+async def analyze_context(user_message: str, history_text: str) -> Dict:
     """Analyze conversation context using LLM."""
     prompt = f"""
     Analyze the conversation context:
     
     User Message: {user_message}
-    Recent History: {conversation_history[-3:] if len(conversation_history) > 3 else conversation_history}
+    Recent History:
+    {history_text}
     
     Determine:
     1. What is the user responding to? (if "yes", what question?)
@@ -144,37 +196,140 @@ def analyze_context(user_message: str, conversation_history: list) -> Dict:
     """
     
     try:
-        result = llm_call_json(prompt, temperature=0.3, max_tokens=300)
+        result = await llm_call_json(prompt, temperature=0.3, max_tokens=300, tier=TIER_CLASSIFY)
         return result
     except Exception as e:
         logger.error(f"[PREPROCESS] Context analysis failed: {str(e)}")
-        return {
-            "responding_to": "",
-            "is_correction": False,
-            "conversation_flow": "normal",
-            "needs_clarification": False,
-            "clarification_question": ""
-        }
+        return dict(DEFAULT_CONTEXT)
 
 
-def preprocess_node(state: AgentState) -> AgentState:
+async def fused_preprocess(user_message: str, history_text: str, force_contact: bool) -> Tuple[Dict, Dict, Dict, Optional[Dict]]:
+    """
+    Intent, contact extraction, context analysis and routing in ONE LLM call.
+    
+    Returns:
+        (intent_result, contact_result, context_result, route_result). route_result is None
+        when routing should be left to route_decision.
     """
-    Preprocess user message in parallel:
+    no_contact = {"name": None, "email": None, "phone": None}
+    message_lower = user_message.lower().strip()
+    # Same gate as extract_contact_info: only trust contact fields when the message can carry them
+    extract_contact = bool(
+        force_contact
+        or (has_contact_signal(user_message) and not any(p in message_lower for p in CASUAL_PHRASES))
+    )
+
+    # Greetings / service discovery are classified by phrase and routed deterministically,
+    # so only call the LLM if contact details might be present.
+    fast_result = _fast_path_intent(user_message)
+    if fast_result and not extract_contact:
+        return fast_result, no_contact, dict(DEFAULT_CONTEXT), None
+
+    prompt = f"""
+    Analyze the user's message in ONE pass: classify intent, extract contact details,
+    analyze conversation context and decide the next action.
+    
+    Message: {user_message}
+    Recent History:
+    {history_text}
+    
+    1) intent - one of:
+    - service_discovery: User asking "what are my options?", "what services do you offer?", "what can you help with?", "surprise me", "what do you have?"
+    - domain_question: Questions about WhipSmart, novated leases, EVs, tax, benefits, etc.
+    - vehicle_search: User wants to search for vehicles ("find me a car", "show me EVs under $X")
+    - contact_request: User wants to connect with team ("I want to speak with someone", "connect me")
+    - greeting: Greetings (hi, hello, hey, good morning)
+    - goodbye: Thank you, goodbye, done, I'm finished
+    - clarification_needed: Unclear intent (ONLY use if truly unclear)
+    Only use clarification_needed if the message is truly ambiguous.
+    For service_discovery, rag_query is "{SERVICE_DISCOVERY_RAG_QUERY}".
+    For domain_question, generate an optimized RAG query based on the question.
+    
+    2) contact - BE STRICT, return ONLY what is explicitly present, otherwise null:
+    - name: only if the user gives their name (accept lowercase names; never guess)
+    - email: only an actual email address (must contain '@' and a domain)
+    - phone: only a phone number with at least 8 digits
+    
+    3) context:
+    - What is the user responding to? (if "yes", what question?)
+    - Is the user correcting a previous mistake?
+    - What is the conversation flow? Any clarifications needed?
+    
+    4) action:
+    - knowledge: Search knowledge base (domain questions, service discovery)
+    - vehicle: Search for vehicles (only if user explicitly wants to search for cars)
+    - direct: Respond directly without tools (only greetings, goodbyes, simple acknowledgments)
+    For service_discovery or domain_question, ALWAYS use "knowledge". For vehicle_search, use "vehicle".
+    
+    Return JSON: {{
+        "intent": "...",
+        "rag_query": "...",
+        "confidence": 0.0-1.0,
+        "reasoning": "...",
+        "name": string|null,
+        "email": string|null,
+        "phone": string|null,
+        "responding_to": "...",
+        "is_correction": true/false,
+        "conversation_flow": "...",
+        "needs_clarification": true/false,
+        "clarification_question": "...",
+        "action": "knowledge"|"vehicle"|"direct",
+        "action_reason": "..."
+    }}
+    """
+
+    result = await llm_call_json(prompt, temperature=0.2, max_tokens=500, tier=TIER_CLASSIFY)
+
+    if fast_result:
+        intent_result = fast_result
+    else:
+        intent_result = _reclassify_unclear_intent({
+            "intent": result.get("intent", "domain_question"),
+            "rag_query": result.get("rag_query"),
+            "confidence": result.get("confidence", 1.0),
+            "reasoning": result.get("reasoning", ""),
+        }, message_lower)
+
+    contact_result = no_contact
+    if extract_contact:
+        matched = extract_contact_patterns(user_message) if ENABLE_PATTERN_CONTACT_EXTRACTION else None
+        if matched and matched["confidence"] >= CONTACT_CONFIDENCE_THRESHOLD:
+            contact_result = matched
+        else:
+            contact_result = clean_contact_result(result, user_message)
+
+    context_result = {key: result.get(key, default) for key, default in DEFAULT_CONTEXT.items()}
+
+    route_result = None
+    if result.get("action") in ROUTE_ACTIONS:
+        route_result = {"action": result["action"], "reason": result.get("action_reason", "")}
+
+    return intent_result, contact_result, context_result, route_result
+
+
+async def preprocess_node(state: AgentState, config: Optional[RunnableConfig] = None) -> AgentState:
+    """
+    Preprocess user message concurrently:
     1. Intent classification
     2. Contact info extraction
     3. Context analysis
+    
+    Speculative knowledge retrieval for the raw message (if enabled) runs alongside.
     """
     user_message = state.messages[-1]["content"] if state.messages else ""
-    conversation_history = state.messages[:-1] if len(state.messages) > 1 else []
+    history_text = format_history(state)
     
     logger.info(f"[PREPROCESS] Processing message: {user_message[:50]}...")
     # Default: assume we won't use RAG unless knowledge node runs
     state.used_rag = False
+    state.next_action = None
+    state.routing_reason = None
 
     # If we're waiting for the user to confirm team connection, handle it deterministically
     if state.step == "awaiting_team_connection":
         # If they paste details without saying "yes", treat it as acceptance too.
-        details = extract_contact_info(user_message, force_llm=True)
+        details = await extract_contact_info(user_message, force_llm=True)
         if details.get("email") or details.get("phone") or details.get("name"):
             state.user_name = details.get("name") or state.user_name
             state.user_email = details.get("email") or state.user_email
@@ -202,21 +357,63 @@ def preprocess_node(state: AgentState) -> AgentState:
         state.step = "chatting"
         # continue normal classification below
     
-    # Parallel execution
-    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS) as executor:
-        intent_future = executor.submit(classify_intent, user_message, conversation_history)
-        force_llm = bool(state.collecting_user_info or state.step in {"name", "email", "phone", "confirmation", "callback_schedule"})
-        contact_future = executor.submit(extract_contact_info, user_message, force_llm)
-        context_future = executor.submit(analyze_context, user_message, conversation_history)
-        
-        intent_result = intent_future.result()
-        contact_result = contact_future.result()
-        context_result = context_future.result()
+    force_llm = bool(state.collecting_user_info or state.step in {"name", "email", "phone", "confirmation", "callback_schedule"})
+    expected_field = state.step if state.step in {"name", "email", "phone"} else None
+
+    # Most turns end up in knowledge retrieval - start it now, off the critical path
+    speculative_rag = get_speculative_retrieval(config)
+    if (
+        ENABLE_SPECULATIVE_RAG
+        and speculative_rag
+        and not force_llm
+        and not has_contact_signal(user_message)
+        and (_fast_path_intent(user_message) or {}).get("intent") not in {"greeting", "service_discovery"}
+    ):
+        speculative_rag.start(user_message, top_k=RAG_TOP_K)
+
+    route_result = None
+    fused = False
+    pattern_matched = False
+    if force_llm and ENABLE_PATTERN_CONTACT_EXTRACTION:
+        # Contact flow replies go to the contact node whatever their intent, so when the
+        # patterns read the reply confidently (a name, an email, "yes", "tomorrow 3pm")
+        # no LLM call is needed
+        contact_result = extract_contact_patterns(user_message, expected_field)
+        if contact_result["confidence"] >= CONTACT_CONFIDENCE_THRESHOLD:
+            intent_result = {
+                "intent": "contact_request",
+                "rag_query": None,
+                "confidence": contact_result["confidence"],
+                "reasoning": "Contact flow reply (pattern match)",
+            }
+            context_result = dict(DEFAULT_CONTEXT)
+            pattern_matched = True
+
+    if ENABLE_FUSED_PREPROCESS and not pattern_matched:
+        try:
+            intent_result, contact_result, context_result, route_result = await fused_preprocess(
+                user_message, history_text, force_llm
+            )
+            fused = True
+        except Exception as e:
+            logger.error(f"[PREPROCESS] Fused preprocess failed, falling back to separate calls: {str(e)}")
+
+    if not (fused or pattern_matched):
+        # Concurrent execution on the event loop
+        intent_result, contact_result, context_result = await asyncio.gather(
+            classify_intent(user_message, history_text),
+            extract_contact_info(user_message, force_llm, expected_field),
+            analyze_context(user_message, history_text),
+        )
     
     # Update state
     state.question_type = intent_result.get("intent", "domain_question")
     state.rag_query = intent_result.get("rag_query")
     state.context_analysis = context_result
+    if route_result:
+        # route_decision uses this instead of making its own LLM call
+        state.next_action = route_result["action"]
+        state.routing_reason = route_result["reason"]
     
     # Update contact info if detected - be very strict
     # Only set contact_info_detected if we have clear, valid contact information
@@ -248,6 +445,6 @@ def preprocess_node(state: AgentState) -> AgentState:
     # Only set contact_info_detected if we have at least one valid contact field
     state.contact_info_detected = has_contact
     
-    logger.info(f"[PREPROCESS] Intent: {state.question_type}, Contact detected: {state.contact_info_detected} (name={bool(state.user_name)}, email={bool(state.user_email)}, phone={bool(state.user_phone)})")
+    logger.info(f"[PREPROCESS] Fused: {fused}, Pattern: {pattern_matched}, Intent: {state.question_type}, Contact detected: {state.contact_info_detected} (name={bool(state.user_name)}, email={bool(state.user_email)}, phone={bool(state.user_phone)})")
     
     return state
@@ -1,24 +1,34 @@
 """
-Reasoning node - Parallel multi-agent reasoning.
+Reasoning node - Concurrent multi-agent reasoning, gated by question complexity.
 """
+import asyncio
 import logging
-from typing import Dict
-from concurrent.futures import ThreadPoolExecutor
+import re
+from typing import Dict, Tuple, List
 from ..state import AgentState
+from ..history import format_history
 from ..tools.llm import llm_call_json
-from ..config import MAX_PARALLEL_WORKERS, LLM_TEMPERATURE_REASONING
+from agents.llm_pool import TIER_REASON
+from ..deadline import stage_allowed
+from ..config import (
+    LLM_TEMPERATURE_REASONING,
+    ENABLE_REASONING_GATE,
+    REASONING_GATE_COMBINED_MIN_SCORE,
+    REASONING_GATE_FULL_MIN_SCORE,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def analyze_intent_deep(user_question: str, rag_context: list, conversation_history: list) -> Dict:
+async def analyze_intent_deep(user_question: str, rag_context: list, history_text: str) -> Dict:
     """Deep intent analysis."""
     prompt = f"""
     Analyze the user's question in depth:
     
     Question: {user_question}
     Available Context: {len(rag_context)} knowledge base chunks
-    Conversation History: {conversation_history[-3:] if len(conversation_history) > 3 else conversation_history}
+    Conversation History:
+    {history_text}
     
     Determine:
     1. Required depth (short, medium, detailed)
@@ -33,7 +43,7 @@ def analyze_intent_deep(user_question: str, rag_context: list, conversation_hist
     """
     
     try:
-        return llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=500)
+        return await llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=500, tier=TIER_REASON)
     except Exception as e:
         logger.error(f"[REASONING] Intent analysis failed: {str(e)}")
         return {
@@ -43,7 +53,7 @@ def analyze_intent_deep(user_question: str, rag_context: list, conversation_hist
         }
 
 
-def plan_structure(user_question: str, question_type: str) -> Dict:
+async def plan_structure(user_question: str, question_type: str) -> Dict:
     """Plan answer structure."""
     prompt = f"""
     Plan the answer structure for this question:
@@ -64,7 +74,7 @@ def plan_structure(user_question: str, question_type: str) -> Dict:
     """
     
     try:
-        return llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=300)
+        return await llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=300, cache=True, tier=TIER_REASON)
     except Exception as e:
         logger.error(f"[REASONING] Structure planning failed: {str(e)}")
         return {
@@ -74,7 +84,7 @@ def plan_structure(user_question: str, question_type: str) -> Dict:
         }
 
 
-def define_coverage(user_question: str, rag_context: list, question_type: str) -> Dict:
+async def define_coverage(user_question: str, rag_context: list, question_type: str) -> Dict:
     """Define what must be covered."""
     prompt = f"""
     Define what MUST be covered in the answer:
@@ -96,7 +106,7 @@ def define_coverage(user_question: str, rag_context: list, question_type: str) -
     """
     
     try:
-        return llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=500)
+        return await llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=500, tier=TIER_REASON)
     except Exception as e:
         logger.error(f"[REASONING] Coverage definition failed: {str(e)}")
         return {
@@ -106,38 +116,170 @@ def define_coverage(user_question: str, rag_context: list, question_type: str) -
         }
 
 
-def reasoning_node(state: AgentState) -> AgentState:
+# Defaults used when reasoning is skipped (and as fallbacks for the combined call)
+DEFAULT_INTENT = {"required_depth": "short", "key_dimensions": [], "structure_needs": "concise"}
+DEFAULT_STRUCTURE = {"structure": "bullets", "ideal_length": 3, "ordering": "importance"}
+DEFAULT_COVERAGE = {"must_include": [], "optional": [], "exclude": []}
+
+# Small keyword model: phrases that signal multi-part / analytical questions
+COMPLEXITY_KEYWORDS = {
+    "compare": 2.0, "comparison": 2.0, "difference": 2.0, "versus": 2.0, " vs ": 2.0,
+    "pros and cons": 2.5, "better": 1.5, "should i": 1.5, "which": 1.0,
+    "step": 1.5, "process": 1.5, "how does": 1.0, "how do i": 1.0, "why": 1.0, "explain": 1.0,
+    "calculate": 2.0, "cost": 1.0, "tax": 1.0, "fbt": 1.0, "salary": 1.0, "benefits": 1.0,
+    "end of lease": 1.5, "residual": 1.5, "options": 1.0, "if i": 1.0, "what happens": 1.5,
+}
+# Question types that never need reasoning
+NO_REASONING_TYPES = {"greeting", "goodbye", "contact_request"}
+_WORD_RE = re.compile(r"\w+")
+
+
+def assess_complexity(user_question: str, question_type: str, rag_context: list) -> Tuple[str, float, List[str]]:
     """
-    Parallel multi-agent reasoning:
-    1. Intent analyzer
-    2. Structure planner
-    3. Coverage definer
+    Cheap complexity gate (no LLM call).
+    
+    Returns:
+        (path, score, signals) where path is "none", "combined" or "full"
+    """
+    if question_type in NO_REASONING_TYPES:
+        return "none", 0.0, [f"type:{question_type}"]
+    if not rag_context:
+        return "none", 0.0, ["no_rag_context"]
+    
+    text = f" {(user_question or '').lower()} "
+    signals = []
+    score = 0.0
+    
+    # Question length
+    word_count = len(_WORD_RE.findall(text))
+    if word_count > 25:
+        score += 2.0
+        signals.append("long_question")
+    elif word_count > 12:
+        score += 1.0
+        signals.append("medium_question")
+    
+    # Multi-part questions
+    if text.count("?") > 1 or " and " in text or " also " in text:
+        score += 1.5
+        signals.append("multi_part")
+    
+    # Question type
+    if question_type == "service_discovery":
+        score += 2.0
+        signals.append("service_discovery")
+    
+    # Keyword model
+    for keyword, weight in COMPLEXITY_KEYWORDS.items():
+        if keyword in text:
+            score += weight
+            signals.append(f"kw:{keyword.strip()}")
+    
+    # RAG hits: many relevant chunks -> more material to organise; one strong hit -> simple lookup
+    scores = [float(chunk.get("score", 0.0) or 0.0) for chunk in rag_context]
+    relevant = [s for s in scores if s >= 0.75]
+    if len(relevant) >= 4:
+        score += 1.0
+        signals.append("many_rag_hits")
+    if scores and max(scores) >= 0.88 and len(relevant) <= 2:
+        score -= 1.0
+        signals.append("strong_single_hit")
+    
+    if score >= REASONING_GATE_FULL_MIN_SCORE:
+        path = "full"
+    elif score >= REASONING_GATE_COMBINED_MIN_SCORE:
+        path = "combined"
+    else:
+        path = "none"
+    return path, round(score, 2), signals
+
+
+async def combined_reasoning(user_question: str, rag_context: list, history_text: str, question_type: str) -> Dict:
+    """Intent depth, structure and coverage in ONE LLM call."""
+    prompt = f"""
+    Plan the answer to this question:
+    
+    Question: {user_question}
+    Question Type: {question_type}
+    Available Context: {len(rag_context)} knowledge base chunks
+    Conversation History:
+    {history_text}
+    
+    Determine:
+    1. Required depth (short, medium, detailed) and key dimensions to cover
+    2. Best structure (bullets, sections, lifecycle, comparison) and ideal length (number of key points)
+    3. MUST INCLUDE topics, OPTIONAL topics (if context supports), EXCLUDE (fluff, speculation)
+    
+    Return JSON: {{
+        "intent": {{"required_depth": "short"|"medium"|"detailed", "key_dimensions": ["..."], "structure_needs": "..."}},
+        "structure": {{"structure": "bullets"|"sections"|"lifecycle"|"comparison", "ideal_length": 4, "ordering": "..."}},
+        "coverage": {{"must_include": ["..."], "optional": ["..."], "exclude": ["..."]}}
+    }}
+    """
+    
+    try:
+        result = await llm_call_json(prompt, temperature=LLM_TEMPERATURE_REASONING, max_tokens=600, tier=TIER_REASON)
+    except Exception as e:
+        logger.error(f"[REASONING] Combined reasoning failed: {str(e)}")
+        result = {}
+    
+    return {
+        "intent": result.get("intent") if isinstance(result.get("intent"), dict) else dict(DEFAULT_INTENT),
+        "structure": result.get("structure") if isinstance(result.get("structure"), dict) else dict(DEFAULT_STRUCTURE),
+        "coverage": result.get("coverage") if isinstance(result.get("coverage"), dict) else dict(DEFAULT_COVERAGE),
+    }
+
+
+async def reasoning_node(state: AgentState) -> AgentState:
+    """
+    Multi-agent reasoning, gated by question complexity:
+    - none: no LLM call, default plan
+    - combined: one call returning intent, structure and coverage
+    - full: concurrent intent analyzer, structure planner and coverage definer
+    Short on time, the full path falls back to combined and combined to none.
     """
     user_question = state.messages[-1]["content"] if state.messages else ""
     rag_context = state.rag_context
-    conversation_history = state.messages[:-1] if len(state.messages) > 1 else []
+    history_text = format_history(state)
     question_type = state.question_type or "domain_question"
     
-    logger.info("[REASONING] Starting parallel reasoning")
+    if ENABLE_REASONING_GATE:
+        path, score, signals = assess_complexity(user_question, question_type, rag_context)
+    else:
+        path, score, signals = "full", None, ["gate_disabled"]
+    
+    if path == "full" and not stage_allowed("reasoning_fanout"):
+        path = "combined"
+    if path == "combined" and not stage_allowed("reasoning"):
+        path = "none"
+    
+    logger.info(f"[REASONING] Path: {path} (score={score}, signals={signals})")
     
-    # Parallel execution
-    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS) as executor:
-        intent_future = executor.submit(
-            analyze_intent_deep, user_question, rag_context, conversation_history
+    if path == "none":
+        reasoning_output = {
+            "intent": dict(DEFAULT_INTENT),
+            "structure": dict(DEFAULT_STRUCTURE),
+            "coverage": dict(DEFAULT_COVERAGE),
+        }
+    elif path == "combined":
+        reasoning_output = await combined_reasoning(user_question, rag_context, history_text, question_type)
+    else:
+        # Concurrent execution on the event loop
+        intent_analysis, structure_plan, coverage_plan = await asyncio.gather(
+            analyze_intent_deep(user_question, rag_context, history_text),
+            plan_structure(user_question, question_type),
+            define_coverage(user_question, rag_context, question_type),
         )
-        structure_future = executor.submit(plan_structure, user_question, question_type)
-        coverage_future = executor.submit(define_coverage, user_question, rag_context, question_type)
-        
-        intent_analysis = intent_future.result()
-        structure_plan = structure_future.result()
-        coverage_plan = coverage_future.result()
-    
-    # Combine reasoning outputs
-    state.reasoning_output = {
-        "intent": intent_analysis,
-        "structure": structure_plan,
-        "coverage": coverage_plan
-    }
+        reasoning_output = {
+            "intent": intent_analysis,
+            "structure": structure_plan,
+            "coverage": coverage_plan
+        }
+    
+    # Combine reasoning outputs (path/score are reported per turn in the response metadata)
+    reasoning_output["path"] = path
+    reasoning_output["complexity_score"] = score
+    state.reasoning_output = reasoning_output
     
     logger.info("[REASONING] Reasoning complete")
     
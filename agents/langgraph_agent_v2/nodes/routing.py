@@ -5,11 +5,12 @@ import logging
 from typing import Literal
 from ..state import AgentState
 from ..tools.llm import llm_call_json
+from agents.llm_pool import TIER_CLASSIFY
 
 logger = logging.getLogger(__name__)
 
 
-def route_decision(state: AgentState) -> Literal["knowledge", "vehicle", "direct", "contact"]:
+async def route_decision(state: AgentState) -> Literal["knowledge", "vehicle", "direct", "contact"]:
     """
     Decide routing based on state.
     Returns the next node to execute.
@@ -36,6 +37,11 @@ def route_decision(state: AgentState) -> Literal["knowledge", "vehicle", "direct
         state.routing_reason = "Service discovery query requires knowledge base search"
         return "knowledge"
     
+    # Fused preprocess already decided the route in the same LLM call
+    if state.next_action in {"knowledge", "vehicle", "direct"}:
+        logger.info(f"[ROUTING] Decided (fused preprocess): {state.next_action} - {state.routing_reason}")
+        return state.next_action
+    
     # Use LLM to decide routing
     prompt = f"""
     Analyze the user's message and determine the best action:
@@ -59,7 +65,7 @@ def route_decision(state: AgentState) -> Literal["knowledge", "vehicle", "direct
     """
     
     try:
-        decision = llm_call_json(prompt, temperature=0.3, max_tokens=200)
+        decision = await llm_call_json(prompt, temperature=0.3, max_tokens=200, tier=TIER_CLASSIFY)
         action = decision.get("action", "knowledge")  # Default to knowledge for safety
         state.next_action = action
         state.routing_reason = decision.get("reason", "")
@@ -73,7 +79,7 @@ def route_decision(state: AgentState) -> Literal["knowledge", "vehicle", "direct
         return "direct"
 
 
-def routing_node(state: AgentState) -> AgentState:
+async def routing_node(state: AgentState) -> AgentState:
     """Routing node - prepares state for next action."""
     # Decision is made in route_decision function
     # This node just passes through
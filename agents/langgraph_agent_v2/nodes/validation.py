@@ -1,18 +1,20 @@
 """
 Validation node - Multi-layer LLM-based validation.
 """
+import asyncio
 import logging
 from typing import Literal, Dict
-from concurrent.futures import ThreadPoolExecutor
 from ..state import AgentState
 from ..tools.llm import llm_call_json
+from agents.llm_pool import TIER_CLASSIFY, TIER_REASON
 from ..prompts.validation import VALIDATION_PROMPTS
-from ..config import MAX_PARALLEL_WORKERS, MAX_VALIDATION_RETRIES, VALIDATION_CONFIDENCE_THRESHOLD
+from ..deadline import stage_allowed
+from ..config import MAX_VALIDATION_RETRIES, VALIDATION_CONFIDENCE_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 
-def validate_facts(draft_response: str, rag_context: list) -> Dict:
+async def validate_facts(draft_response: str, rag_context: list) -> Dict:
     """Validate facts against RAG context."""
     rag_text = "\n".join([chunk.get("content", "")[:500] for chunk in rag_context[:3]])
     
@@ -22,13 +24,13 @@ def validate_facts(draft_response: str, rag_context: list) -> Dict:
     )
     
     try:
-        return llm_call_json(prompt, temperature=0.3, max_tokens=300)
+        return await llm_call_json(prompt, temperature=0.3, max_tokens=300, tier=TIER_REASON)
     except Exception as e:
         logger.error(f"[VALIDATION] Fact check failed: {str(e)}")
         return {"valid": True, "issues": [], "confidence": 0.5}
 
 
-def validate_completeness(draft_response: str, coverage_plan: dict, user_question: str) -> Dict:
+async def validate_completeness(draft_response: str, coverage_plan: dict, user_question: str) -> Dict:
     """Validate completeness."""
     prompt = VALIDATION_PROMPTS["completeness"].format(
         draft_response=draft_response,
@@ -37,43 +39,33 @@ def validate_completeness(draft_response: str, coverage_plan: dict, user_questio
     )
     
     try:
-        return llm_call_json(prompt, temperature=0.3, max_tokens=300)
+        return await llm_call_json(prompt, temperature=0.3, max_tokens=300, cache=True, tier=TIER_REASON)
     except Exception as e:
         logger.error(f"[VALIDATION] Completeness check failed: {str(e)}")
         return {"valid": True, "missing_topics": [], "completeness_score": 0.5}
 
 
-def validate_tone(draft_response: str) -> Dict:
+async def validate_tone(draft_response: str) -> Dict:
     """Validate tone."""
     prompt = VALIDATION_PROMPTS["tone"].format(draft_response=draft_response)
     
     try:
-        return llm_call_json(prompt, temperature=0.3, max_tokens=300)
+        return await llm_call_json(prompt, temperature=0.3, max_tokens=300, cache=True, tier=TIER_CLASSIFY)
     except Exception as e:
         logger.error(f"[VALIDATION] Tone check failed: {str(e)}")
         return {"valid": True, "tone_issues": [], "tone_score": 0.5}
 
 
-def validation_node(state: AgentState) -> AgentState:
+async def run_validation_checks(draft_response: str, rag_context: list, coverage_plan: dict, user_question: str) -> Dict:
     """
-    Multi-layer LLM-based validation.
+    Run the fact, completeness and tone checks concurrently and combine them.
+    Shared by the inline validation node, background validation and offline audits.
     """
-    draft_response = state.draft_response or ""
-    rag_context = state.rag_context
-    coverage_plan = state.reasoning_output.get("coverage", {}) if state.reasoning_output else {}
-    user_question = state.messages[-1]["content"] if state.messages else ""
-    
-    logger.info("[VALIDATION] Starting validation")
-    
-    # Parallel validation
-    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS) as executor:
-        fact_future = executor.submit(validate_facts, draft_response, rag_context)
-        completeness_future = executor.submit(validate_completeness, draft_response, coverage_plan, user_question)
-        tone_future = executor.submit(validate_tone, draft_response)
-        
-        fact_check = fact_future.result()
-        completeness_check = completeness_future.result()
-        tone_check = tone_future.result()
+    fact_check, completeness_check, tone_check = await asyncio.gather(
+        validate_facts(draft_response, rag_context),
+        validate_completeness(draft_response, coverage_plan, user_question),
+        validate_tone(draft_response),
+    )
     
     # Combine validation results
     confidence = min(
@@ -88,7 +80,7 @@ def validation_node(state: AgentState) -> AgentState:
         tone_check.get("valid", False)
     ])
 
-    validation_result = {
+    return {
         "fact_check": fact_check,
         "completeness": completeness_check,
         "tone": tone_check,
@@ -98,26 +90,59 @@ def validation_node(state: AgentState) -> AgentState:
         # are not guaranteed to persist in LangGraph
         "should_retry": False,
     }
+
+
+def collect_validation_issues(validation_result: Dict) -> list:
+    """Flatten the issues reported by the failed checks."""
+    issues = []
+    if not validation_result["fact_check"].get("valid"):
+        issues.extend(validation_result["fact_check"].get("issues", []))
+    if not validation_result["completeness"].get("valid"):
+        issues.extend(validation_result["completeness"].get("missing_topics", []))
+    if not validation_result["tone"].get("valid"):
+        issues.extend(validation_result["tone"].get("tone_issues", []))
+    return issues
+
+
+def needs_fact_correction(validation_result: Dict) -> bool:
+    """
+    Only likely hallucination/fact issues with low confidence warrant a regeneration.
+    Generic completeness complaints do not (it can loop and waste tokens).
+    """
+    return (
+        validation_result["fact_check"].get("valid") is False
+        and validation_result["confidence"] < VALIDATION_CONFIDENCE_THRESHOLD
+    )
+
+
+async def validation_node(state: AgentState) -> AgentState:
+    """
+    Multi-layer LLM-based validation.
+    """
+    draft_response = state.draft_response or ""
+    rag_context = state.rag_context
+    coverage_plan = state.reasoning_output.get("coverage", {}) if state.reasoning_output else {}
+    user_question = state.messages[-1]["content"] if state.messages else ""
+    
+    logger.info("[VALIDATION] Starting validation")
+    
+    validation_result = await run_validation_checks(draft_response, rag_context, coverage_plan, user_question)
     
     state.validation_result = validation_result
     
     if not validation_result["overall_valid"]:
         # Generate improvement suggestions
-        issues = []
-        if not fact_check.get("valid"):
-            issues.extend(fact_check.get("issues", []))
-        if not completeness_check.get("valid"):
-            issues.extend(completeness_check.get("missing_topics", []))
-        if not tone_check.get("valid"):
-            issues.extend(tone_check.get("tone_issues", []))
+        issues = collect_validation_issues(validation_result)
         
         state.improvement_suggestions = issues
         logger.warning(f"[VALIDATION] Validation failed: {issues}")
 
         # Retry ONLY when we detect likely hallucination/fact issues.
-        # Do not retry for generic completeness complaints (it can loop and waste tokens).
-        should_retry_for_facts = (fact_check.get("valid") is False)
-        if should_retry_for_facts and confidence < VALIDATION_CONFIDENCE_THRESHOLD and state.validation_retry_count < MAX_VALIDATION_RETRIES:
+        if (
+            needs_fact_correction(validation_result)
+            and state.validation_retry_count < MAX_VALIDATION_RETRIES
+            and stage_allowed("validation")
+        ):
             state.validation_retry_count += 1
             validation_result["should_retry"] = True
             logger.info(f"[VALIDATION] Retrying (attempt {state.validation_retry_count})")
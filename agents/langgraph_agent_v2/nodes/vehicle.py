@@ -2,13 +2,14 @@
 Vehicle search node.
 """
 import logging
+from asgiref.sync import sync_to_async
 from ..state import AgentState
 from ..tools.vehicle_search import search_vehicles
 
 logger = logging.getLogger(__name__)
 
 
-def vehicle_search_node(state: AgentState) -> AgentState:
+async def vehicle_search_node(state: AgentState) -> AgentState:
     """
     Search for vehicles based on user query.
     """
@@ -20,7 +21,7 @@ def vehicle_search_node(state: AgentState) -> AgentState:
     filters = {}
     
     # Search
-    result = search_vehicles(filters)
+    result = await sync_to_async(search_vehicles, thread_sensitive=False)(filters)
     
     if result.get("success"):
         vehicles = result.get("vehicles", [])
@@ -15,6 +15,9 @@ class AgentState:
     # Core
     session_id: str
     messages: List[Dict[str, str]] = field(default_factory=list)
+    # Trimmed history window shared by all node prompts (see history.py)
+    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    conversation_summary: Optional[str] = None
     
     # User Information
     user_name: Optional[str] = None
@@ -59,9 +62,12 @@ class AgentState:
     validation_result: Optional[Dict] = None
     improvement_suggestions: Optional[List[str]] = None
     validation_retry_count: int = 0
+    defer_validation: bool = False  # validate after the answer is sent (see background_validation.py)
     
     # Post-processing
     suggestions: List[str] = field(default_factory=list)
+    defer_suggestions: bool = False  # generate after the answer is sent (see background_suggestions.py)
+    suggestions_pending: bool = False  # set by postprocess when generation was deferred
     
     # Flags
     should_ask_for_name: bool = False
@@ -80,6 +86,8 @@ class AgentState:
         return {
             'session_id': self.session_id,
             'messages': self.messages,
+            'conversation_history': self.conversation_history,
+            'conversation_summary': self.conversation_summary,
             'user_name': self.user_name,
             'user_email': self.user_email,
             'user_phone': self.user_phone,
@@ -106,7 +114,10 @@ class AgentState:
             'validation_result': self.validation_result,
             'improvement_suggestions': self.improvement_suggestions,
             'validation_retry_count': self.validation_retry_count,
+            'defer_validation': self.defer_validation,
             'suggestions': self.suggestions,
+            'defer_suggestions': self.defer_suggestions,
+            'suggestions_pending': self.suggestions_pending,
             'should_ask_for_name': self.should_ask_for_name,
             'should_offer_team_connection': self.should_offer_team_connection,
             'is_complete': self.is_complete,
@@ -136,6 +147,8 @@ class AgentState:
         return cls(
             session_id=data.get('session_id', ''),
             messages=data.get('messages', []),
+            conversation_history=data.get('conversation_history', []),
+            conversation_summary=data.get('conversation_summary'),
             user_name=data.get('user_name'),
             user_email=data.get('user_email'),
             user_phone=data.get('user_phone'),
@@ -162,7 +175,10 @@ class AgentState:
             validation_result=data.get('validation_result'),
             improvement_suggestions=data.get('improvement_suggestions'),
             validation_retry_count=data.get('validation_retry_count', 0),
+            defer_validation=bool(data.get('defer_validation', False)),
             suggestions=data.get('suggestions', []),
+            defer_suggestions=bool(data.get('defer_suggestions', False)),
+            suggestions_pending=bool(data.get('suggestions_pending', False)),
             should_ask_for_name=data.get('should_ask_for_name', False),
             should_offer_team_connection=data.get('should_offer_team_connection', False),
             is_complete=data.get('is_complete', False),
@@ -1,7 +1,7 @@
 """
 Tools for LangGraph Agent V2.
 """
-from .llm import get_llm_client, llm_call
+from .llm import get_llm_client, llm_call, llm_stream, get_llm_cache_stats
 from .rag import search_knowledge_base, generate_query_variations
 from .vehicle_search import search_vehicles
 from .contact_extraction import extract_contact_info
@@ -9,6 +9,8 @@ from .contact_extraction import extract_contact_info
 __all__ = [
     'get_llm_client',
     'llm_call',
+    'llm_stream',
+    'get_llm_cache_stats',
     'search_knowledge_base',
     'generate_query_variations',
     'search_vehicles',
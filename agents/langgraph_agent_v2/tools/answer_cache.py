@@ -0,0 +1,196 @@
+"""
+Semantic answer cache for LangGraph Agent V2.
+
+Repeated customer questions ("what is a novated lease?") are answered from cache
+instead of running the full graph. Questions are normalized and embedded; a cached
+answer is reused when a stored question is similar enough AND was answered against
+the current knowledge base version.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+import numpy as np
+from asgiref.sync import sync_to_async
+from knowledgebase.services.embedding_service import embed
+from knowledgebase.services.kb_version import get_kb_version
+from agents.llm_executor import get_shared_executor, closing_db_connections
+from ..config import (
+    CACHE_TTL,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s$%]")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Words that refer back to earlier turns - the question is not self-contained
+_CONTEXT_REFERENCE_RE = re.compile(r"\b(it|its|that|this|these|those|they|them|their|he|she|one|same)\b")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = _PUNCTUATION_RE.sub(" ", (question or "").lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def is_cacheable_question(question: str, has_history: bool) -> bool:
+    """
+    Only self-contained questions are cached. A follow-up like "how does it work?"
+    depends on earlier turns, so it is only cacheable as the first message.
+    """
+    normalized = normalize_question(question)
+    if len(normalized) < 3:
+        return False
+    if has_history and _CONTEXT_REFERENCE_RE.search(normalized):
+        return False
+    return True
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of final answers keyed by normalized question.
+    Bounded (LRU eviction) and thread-safe; entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_valid(self, entry: Dict[str, Any], kb_version: str, now: float) -> bool:
+        return entry["kb_version"] == kb_version and (now - entry["created_at"]) < self.ttl
+
+    def get_exact(self, normalized: str, kb_version: str) -> Optional[Dict[str, Any]]:
+        """Look up an identical normalized question (no embedding needed)."""
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is None:
+                return None
+            if not self._is_valid(entry, kb_version, time.time()):
+                del self._entries[normalized]
+                return None
+            self._entries.move_to_end(normalized)
+            return entry
+
+    def get_similar(self, embedding: List[float], kb_version: str) -> Optional[Dict[str, Any]]:
+        """Find the most similar stored question above the similarity threshold."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        now = time.time()
+        best_key, best_score = None, self.threshold
+
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if not self._is_valid(entry, kb_version, now)]
+            for key in stale:
+                del self._entries[key]
+
+            for key, entry in self._entries.items():
+                score = float(np.dot(entry["embedding"], query)) / (entry["norm"] * query_norm)
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+
+        logger.info(f"[ANSWER_CACHE] Similar question matched (score={best_score:.3f}): {entry['question'][:50]}")
+        return entry
+
+    def set(self, normalized: str, embedding: List[float], kb_version: str, entry: Dict[str, Any]) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        entry = dict(
+            entry,
+            embedding=vector,
+            norm=float(np.linalg.norm(vector)) or 1.0,
+            kb_version=kb_version,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._entries[normalized] = entry
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global cache instance
+answer_cache = SemanticAnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl=CACHE_TTL,
+    threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD,
+)
+
+
+async def lookup_answer(question: str) -> Dict[str, Any]:
+    """
+    Look up a cached answer for a question.
+
+    Returns:
+        Probe dictionary: {"hit": entry or None, "normalized", "embedding", "kb_version"}.
+        Pass it to `store_answer` after a miss to avoid embedding the question twice.
+    """
+    normalized = normalize_question(question)
+    probe = {"hit": None, "normalized": normalized, "embedding": None, "kb_version": None}
+
+    try:
+        probe["kb_version"] = await sync_to_async(
+            closing_db_connections(get_kb_version), thread_sensitive=False, executor=get_shared_executor()
+        )()
+
+        entry = answer_cache.get_exact(normalized, probe["kb_version"])
+        if entry is None:
+            probe["embedding"] = await sync_to_async(
+                closing_db_connections(embed), thread_sensitive=False, executor=get_shared_executor()
+            )(normalized)
+            entry = answer_cache.get_similar(probe["embedding"], probe["kb_version"])
+        probe["hit"] = entry
+    except Exception as e:
+        logger.warning(f"[ANSWER_CACHE] Lookup failed: {str(e)}")
+
+    answer_cache.record(probe["hit"] is not None)
+    return probe
+
+
+async def store_answer(probe: Dict[str, Any], question: str, response: str, suggestions: List[str], question_type: Optional[str]) -> None:
+    """Store a final answer using the embedding/version computed during lookup."""
+    if not probe or probe.get("kb_version") is None or not response:
+        return
+
+    try:
+        embedding = probe.get("embedding")
+        if embedding is None:
+            embedding = await sync_to_async(
+                closing_db_connections(embed), thread_sensitive=False, executor=get_shared_executor()
+            )(probe["normalized"])
+        answer_cache.set(probe["normalized"], embedding, probe["kb_version"], {
+            "question": question,
+            "response": response,
+            "suggestions": list(suggestions or []),
+            "question_type": question_type,
+        })
+        logger.info(f"[ANSWER_CACHE] Stored answer for: {question[:50]}")
+    except Exception as e:
+        logger.warning(f"[ANSWER_CACHE] Store failed: {str(e)}")
@@ -1,15 +1,27 @@
 """
 Contact information extraction tools for LangGraph Agent V2.
+
+Extraction is tiered: compiled patterns (emails, AU phone numbers, names, confirmations,
+callback date/times) run first and score their confidence; the LLM is only called when
+the confidence is below CONTACT_CONFIDENCE_THRESHOLD.
 """
 import re
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Any, List, Tuple
 from .llm import llm_call_json
+from agents.llm_pool import TIER_CLASSIFY
+from ..config import ENABLE_PATTERN_CONTACT_EXTRACTION, CONTACT_CONFIDENCE_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
+# Common casual phrases - messages containing these are very unlikely to carry contact info
+CASUAL_PHRASES = [
+    "surprise me", "tell me", "what are", "what is", "how do", "why", "when", "where",
+    "yes", "no", "ok", "okay", "thanks", "thank you", "please", "help", "hello", "hi", "hey"
+]
+
 
-def extract_with_llm(message: str, force: bool = False) -> Dict[str, Optional[str]]:
+async def extract_with_llm(message: str, force: bool = False) -> Dict[str, Optional[str]]:
     """
     Extract contact information using LLM.
     VERY STRICT - only extract if explicitly present.
@@ -24,12 +36,7 @@ def extract_with_llm(message: str, force: bool = False) -> Dict[str, Optional[st
     message_lower = message.lower().strip()
     
     # Reject common casual phrases immediately
-    casual_phrases = [
-        "surprise me", "tell me", "what are", "what is", "how do", "why", "when", "where",
-        "yes", "no", "ok", "okay", "thanks", "thank you", "please", "help", "hello", "hi", "hey"
-    ]
-    
-    if (not force) and any(phrase in message_lower for phrase in casual_phrases):
+    if (not force) and any(phrase in message_lower for phrase in CASUAL_PHRASES):
         # Very likely not contact info - skip LLM call
         logger.info(f"[CONTACT] Skipping LLM extraction for casual phrase: {message[:30]}")
         return {"name": None, "email": None, "phone": None}
@@ -61,10 +68,11 @@ Return JSON ONLY:
 """
     
     try:
-        result = llm_call_json(
+        result = await llm_call_json(
             prompt=prompt,
             temperature=0.1,  # Very low temperature for strict extraction
-            max_tokens=150
+            max_tokens=150,
+            tier=TIER_CLASSIFY
         )
         
         # Additional strict validation
@@ -102,32 +110,63 @@ Return JSON ONLY:
         return {"name": None, "email": None, "phone": None}
 
 
-def extract_contact_info(message: str, force_llm: bool = False) -> Dict[str, Optional[str]]:
+async def extract_contact_info(
+    message: str,
+    force_llm: bool = False,
+    expected_field: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Extract contact information using LLM only.
-    We intentionally avoid regex to keep behaviour consistent and avoid false positives.
+    Extract contact information: patterns first, the LLM only when they are not confident.
     
     Args:
         message: User message
+        force_llm: Contact flow turn - ask the LLM whenever the patterns are not confident
+        expected_field: The field the user was just asked for ("name", "email", "phone")
     
     Returns:
-        Dictionary with name, email, phone (or None)
+        Dictionary with name, email, phone (or None) and the pattern "confidence"
+        (0.0 when the patterns were not used)
     """
-    message_stripped = message.strip()
-    message_lower = message_stripped.lower()
+    if ENABLE_PATTERN_CONTACT_EXTRACTION:
+        matched = extract_contact_patterns(message, expected_field)
+        if matched["confidence"] >= CONTACT_CONFIDENCE_THRESHOLD:
+            if matched["name"] or matched["email"] or matched["phone"]:
+                logger.info(
+                    f"[CONTACT] Pattern match ({matched['confidence']:.2f}) - name: {bool(matched['name'])}, "
+                    f"email: {bool(matched['email'])}, phone: {bool(matched['phone'])}"
+                )
+            return matched
 
-    # Call LLM if:
-    # - forced (during contact flow), OR
-    # - message contains strong signals of contact info (email / digits / separators)
+    if not (force_llm or has_contact_signal(message)):
+        return {"name": None, "email": None, "phone": None, "confidence": 0.0}
+
+    result = await extract_with_llm(message, force=True if force_llm else False)
+    return dict(clean_contact_result(result, message), confidence=0.0)
+
+
+def has_contact_signal(message: str) -> bool:
+    """
+    Check whether a message contains strong signals of contact info (email / digits / separators).
+    Outside the contact flow, extraction is only attempted when this is True.
+    """
+    message_stripped = (message or "").strip()
     has_email_signal = "@" in message_stripped
     has_phone_signal = len(re.sub(r"\D", "", message_stripped)) >= 8
     has_separator_signal = any(sep in message_stripped for sep in [",", ";"])
-    should_use_llm = bool(force_llm or has_email_signal or has_phone_signal or has_separator_signal)
+    return bool(has_email_signal or has_phone_signal or has_separator_signal)
 
-    if not should_use_llm:
-        return {"name": None, "email": None, "phone": None}
 
-    result = extract_with_llm(message, force=True if force_llm else False)
+def clean_contact_result(result: Dict[str, Optional[str]], message: str) -> Dict[str, Optional[str]]:
+    """
+    Final strict validation of extracted contact fields.
+    Shared by `extract_contact_info` and the fused preprocess call.
+    """
+    message_lower = (message or "").strip().lower()
+    result = {
+        "name": result.get("name"),
+        "email": result.get("email"),
+        "phone": result.get("phone"),
+    }
     
     # Final strict validation
     if result["email"] and "@" not in result["email"]:
@@ -171,3 +210,265 @@ def extract_contact_info(message: str, force_llm: bool = False) -> Dict[str, Opt
     logger.info(f"[CONTACT] Extracted - name: {bool(result['name'])}, email: {bool(result['email'])}, phone: {bool(result['phone'])}")
     
     return result
+
+
+# ---- Pattern tier ----
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)*\.[A-Za-z]{2,}\b")
+
+_SEP = r"[\s\-.]?"
+# (pattern, confidence): AU mobiles, landlines, 1300/1800 numbers, then any 8-15 digit number
+PHONE_PATTERNS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(rf"(?<![\d+])(?:\+?61{_SEP}\(?0?|\(?0)4\)?\d{{2}}{_SEP}\d{{3}}{_SEP}\d{{3}}(?!\d)"), 0.97),
+    (re.compile(rf"(?<![\d+])(?:\+?61{_SEP}\(?0?|\(?0)[2378]\)?{_SEP}\d{{4}}{_SEP}\d{{4}}(?!\d)"), 0.95),
+    (re.compile(rf"(?<![\d+])1[38]00{_SEP}\d{{3}}{_SEP}\d{{3}}(?!\d)"), 0.9),
+    (re.compile(r"(?<![\w+])\+?\d[\d\s\-().]{6,18}\d(?!\d)"), 0.6),
+]
+
+_STRONG_NAME_INTRO = r"my name is|my name's|my name|name is|name's|name:|call me"
+_WEAK_NAME_INTRO = r"this is|i am|i'm|im|it's|its"
+NAME_INTRO_RE = re.compile(
+    rf"\b(?:({_STRONG_NAME_INTRO})|({_WEAK_NAME_INTRO}))\s+([A-Za-z][A-Za-z'\-]*(?:\s+[A-Za-z][A-Za-z'\-]*){{0,3}})",
+    re.IGNORECASE
+)
+NAME_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*(?:\s+[A-Za-z][A-Za-z'\-]*){0,2}")
+_SEGMENT_SPLIT_RE = re.compile(r"[,;\n|/]+")
+
+# Words that end a name captured after "my name is ..."
+_NAME_STOP_WORDS = {
+    "and", "my", "email", "e-mail", "mail", "phone", "mobile", "number", "is", "at", "from", "here",
+    "you", "can", "on", "or", "but", "please", "thanks", "i", "im", "i'm", "also", "with",
+}
+# Words that are never (part of) a name
+_NOT_NAME_WORDS = {
+    "surprise", "me", "tell", "more", "what", "how", "why", "when", "where", "who", "which",
+    "yes", "no", "ok", "okay", "thanks", "thank", "you", "please", "help", "hello", "hi", "hey",
+    "good", "morning", "afternoon", "evening", "sure", "great", "fine", "done", "confirmed",
+    "correct", "interested", "looking", "not", "just", "here", "there", "the", "a", "an", "is",
+    "are", "was", "want", "need", "would", "like", "can", "could", "do", "does", "don't", "dont",
+    "lease", "car", "cars", "ev", "novated", "team", "call", "email", "phone", "number", "mobile",
+    "contact", "details", "change", "update", "it", "that", "this", "so", "to", "of", "in", "on",
+    "at", "my", "your", "cheers", "bye", "nope", "yep", "yeah", "nah", "wait", "sorry", "later",
+    "anytime", "whenever", "tomorrow", "today", "asap", "but", "use", "old", "was", "instead", "also",
+    "wrong", "incorrect", "right", "confused", "unsure", "employed", "unemployed", "self", "retired",
+    "working", "full", "part", "time", "casual", "contractor", "student", "busy", "free", "available",
+    "happy", "keen", "ready", "new", "still", "already", "currently", "trying", "thinking", "wondering",
+}
+# Words around contact details that carry no other meaning
+_CONTACT_FILLER_WORDS = {
+    "my", "name", "names", "is", "s", "email", "e", "mail", "address", "phone", "number", "mobile",
+    "mob", "ph", "cell", "contact", "details", "and", "the", "it", "its", "here", "are", "you",
+    "can", "reach", "me", "on", "at", "call", "or", "i", "am", "im", "m", "sure", "yes", "ok",
+    "okay", "thanks", "thank", "hi", "hello", "hey", "please", "this", "of", "to", "change",
+    "update", "new", "instead", "use", "correct", "should", "be", "best",
+}
+
+
+def _clean_name(candidate: str) -> Optional[str]:
+    """Trim a captured name at the first stop word; None if it is not a plausible name."""
+    words = []
+    for word in candidate.split():
+        if word.lower() in _NAME_STOP_WORDS:
+            break
+        words.append(word)
+    if not words or len(words) > 3:
+        return None
+    if any(word.lower() in _NOT_NAME_WORDS for word in words):
+        return None
+    return " ".join(words)
+
+
+def _find_phones(message: str) -> List[Tuple[str, float, Tuple[int, int]]]:
+    """Phone numbers with the confidence of the most specific pattern that matched."""
+    found = []
+    taken: List[Tuple[int, int]] = []
+    for pattern, confidence in PHONE_PATTERNS:
+        for match in pattern.finditer(message):
+            if any(match.start() < end and start < match.end() for start, end in taken):
+                continue
+            digits = re.sub(r"\D", "", match.group(0))
+            if not 8 <= len(digits) <= 15:
+                continue
+            taken.append(match.span())
+            found.append((match.group(0).strip(), confidence, match.span()))
+    return found
+
+
+def _residual_words(message: str, spans: List[Tuple[int, int]], filler: set) -> List[str]:
+    """Words left after removing the matched spans and filler words."""
+    residual = message
+    for start, end in sorted(spans, reverse=True):
+        residual = residual[:start] + " " + residual[end:]
+    return [w for w in re.findall(r"[a-z']+", residual.lower()) if w.strip("'") not in filler]
+
+
+def extract_contact_patterns(message: str, expected_field: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pattern tier of contact extraction.
+    
+    Args:
+        message: User message
+        expected_field: The field the user was just asked for ("name", "email", "phone")
+    
+    Returns:
+        {"name", "email", "phone", "confidence"} - confidence that the result is complete
+        and correct (a message without any contact signal scores 1.0 with no fields)
+    """
+    message = (message or "").strip()
+    result: Dict[str, Any] = {"name": None, "email": None, "phone": None}
+    confidences = []
+    spans: List[Tuple[int, int]] = []
+
+    emails = list(EMAIL_RE.finditer(message))
+    if emails:
+        result["email"] = emails[0].group(0)
+        confidences.append(0.99 if len({m.group(0).lower() for m in emails}) == 1 else 0.5)
+        spans.extend(m.span() for m in emails)
+
+    phones = _find_phones(message)
+    if phones:
+        result["phone"] = phones[0][0]
+        confidences.append(phones[0][1] if len({re.sub(r"\D", "", p[0]) for p in phones}) == 1 else 0.5)
+        spans.extend(p[2] for p in phones)
+
+    # Names: "my name is ...", then standalone segments ("jete, jete@x.com, 0411 ...")
+    intro = NAME_INTRO_RE.search(message)
+    if intro:
+        name = _clean_name(intro.group(3))
+        if name:
+            strong = bool(intro.group(1))
+            # "this is / it's / I'm ..." mostly introduces something else ("I'm Confused"):
+            # only a name when the user was just asked for one, otherwise the LLM decides
+            if strong or expected_field == "name":
+                result["name"] = name
+                confidences.append(0.95 if strong else 0.85)
+                spans.append((intro.start(), intro.start(3) + len(name)))
+            else:
+                confidences.append(0.5)
+    if not result["name"] and (expected_field == "name" or emails or phones):
+        masked = message
+        for start, end in spans:
+            masked = masked[:start] + "," + " " * (end - start - 1) + masked[end:]
+        segments = [seg.strip(" .!") for seg in _SEGMENT_SPLIT_RE.split(masked) if seg.strip(" .!")]
+        candidates = [seg for seg in segments if NAME_RE.fullmatch(seg) and _clean_name(seg) == seg]
+        if len(candidates) == 1:
+            result["name"] = candidates[0]
+            confidences.append(0.9 if expected_field == "name" and len(segments) == 1 else 0.85)
+            position = masked.find(candidates[0])
+            spans.append((position, position + len(candidates[0])))
+
+    if confidences:
+        confidence = min(confidences)
+        # Unexplained words ("my old email was ... use this one") - leave it to the LLM
+        if len(_residual_words(message, spans, _CONTACT_FILLER_WORDS)) >= 3:
+            confidence = min(confidence, 0.6)
+    elif expected_field in {"name", "email", "phone"}:
+        confidence = 0.3  # asked for a detail but none recognised
+    elif "@" in message or len(re.sub(r"\D", "", message)) >= 8:
+        confidence = 0.3  # looks like contact details the patterns do not cover
+    else:
+        confidence = 1.0
+
+    result["confidence"] = confidence
+    return result
+
+
+CONFIRMATION_PHRASES = {
+    "yes", "y", "yep", "yeah", "yup", "ya", "ok", "okay", "k", "sure", "done", "ok done", "okay done",
+    "confirm", "confirmed", "ok confirmed", "yes confirmed", "correct", "yes correct", "all correct",
+    "thats correct", "that is correct", "yes thats correct", "thats right", "that is right",
+    "yes thats right", "right", "all good", "yes all good", "looks good", "looks right", "looks correct",
+    "sounds good", "go ahead", "yes go ahead", "yes please", "perfect", "great", "fine", "all fine",
+}
+
+
+def match_confirmation(message: str) -> float:
+    """Confidence that the message is a plain confirmation ("yes", "ok done", "looks good")."""
+    normalized = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", (message or "").lower())).strip()
+    return 0.95 if normalized in CONFIRMATION_PHRASES else 0.0
+
+
+_WEEKDAYS = r"(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tues?|wed|thu(?:rs?)?|fri|sat|sun)"
+_MONTHS = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+CALLBACK_DATE_RE = re.compile(
+    rf"\b(?:(?:the\s+)?day after tomorrow|today|tonight|tomorrow|tmrw|(?:next|this)\s+(?:week(?:end)?|{_WEEKDAYS})"
+    rf"|{_WEEKDAYS}|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTHS}|{_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?"
+    rf"|\d{{1,2}}/\d{{1,2}}(?:/\d{{2,4}})?)\b",
+    re.IGNORECASE
+)
+CALLBACK_TIME_RE = re.compile(
+    r"\b(?:\d{1,2}(?:[:.]\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}|noon|midday|tonight"
+    r"|(?:in the\s+)?(?:morning|afternoon|evening|arvo))(?![\w])",
+    re.IGNORECASE
+)
+CALLBACK_TIMEZONE_RE = re.compile(
+    r"\b(?:AEST|AEDT|ACST|ACDT|AWST|AWDT|NZST|NZDT|(?:UTC|GMT)(?:\s*[+-]\s*\d{1,2}(?::?\d{2})?)?"
+    r"|(?:sydney|melbourne|brisbane|perth|adelaide|hobart|darwin|canberra)\s+time)(?![\w])",
+    re.IGNORECASE
+)
+_CALLBACK_QUALIFIER_RE = re.compile(r"\b(?:after|before|around|about|from|by|until|between|not before|no later than)\s+$", re.IGNORECASE)
+CALLBACK_DECLINE_RE = re.compile(
+    r"\b(?:any\s?time|no preference|you decide|whenever|doesn'?t matter|don'?t mind|either is fine|can'?t say|not sure)\b",
+    re.IGNORECASE
+)
+_CALLBACK_FILLER_WORDS = {
+    "at", "on", "around", "about", "please", "call", "me", "works", "work", "best", "is", "good", "fine",
+    "for", "the", "a", "ok", "okay", "yes", "sure", "maybe", "would", "be", "great", "perfect", "or",
+    "ish", "any", "by", "from", "time", "callback", "back", "i", "im", "am", "available", "free", "lets",
+    "let's", "say", "then", "that", "thanks", "thank", "you", "how", "what", "suits", "suit",
+}
+
+
+def match_callback_datetime(message: str) -> Dict[str, Any]:
+    """
+    Pattern tier of callback scheduling ("Tomorrow 3pm", "Friday 10:30am", "18 Mar at 2pm AEST").
+    
+    Returns:
+        The same fields as the LLM parse (intent, preferred_datetime, timezone,
+        needs_clarification, clarification_question) plus "confidence"
+    """
+    message = (message or "").strip()
+    dates = list(CALLBACK_DATE_RE.finditer(message))
+    times = list(CALLBACK_TIME_RE.finditer(message))
+    timezones = list(CALLBACK_TIMEZONE_RE.finditer(message))
+    result: Dict[str, Any] = {
+        "intent": "unclear",
+        "preferred_datetime": None,
+        "timezone": timezones[0].group(0) if timezones else None,
+        "needs_clarification": False,
+        "clarification_question": None,
+        "confidence": 0.0,
+    }
+
+    if not dates and not times:
+        if CALLBACK_DECLINE_RE.search(message):
+            result.update(intent="decline", confidence=0.9)
+        return result
+
+    spans = [m.span() for m in dates + times + timezones]
+    residual = _residual_words(message, spans, _CALLBACK_FILLER_WORDS)
+    # Several dates / times ("Monday or Tuesday", "between 2 and 4pm") or extra words: ask the LLM
+    confidence = 0.95 if len(dates) <= 1 and len(times) <= 1 and len(residual) < 3 else 0.6
+
+    if dates and times:
+        start = min(m.start() for m in dates + times)
+        end = max(m.end() for m in dates + times)
+        qualifier = _CALLBACK_QUALIFIER_RE.search(message[:start])  # keep "after 5pm tomorrow" intact
+        if qualifier:
+            start = qualifier.start()
+        result.update(intent="provide_datetime", preferred_datetime=message[start:end].strip(), confidence=confidence)
+    elif dates:
+        result.update(
+            intent="ask_clarify",
+            needs_clarification=True,
+            clarification_question=f"Sure — what **time** on {dates[0].group(0)} works best for the callback?",
+            confidence=confidence,
+        )
+    else:
+        result.update(
+            intent="ask_clarify",
+            needs_clarification=True,
+            clarification_question=f"Sure — which **day** works best for a call around {times[0].group(0)}?",
+            confidence=confidence,
+        )
+    return result
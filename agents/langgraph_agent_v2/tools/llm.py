@@ -1,61 +1,180 @@
 """
 LLM utilities for LangGraph Agent V2.
+
+All calls are async (AsyncAzureOpenAI, via the shared deployment pool in
+agents.llm_pool) so graph nodes run on the ASGI event loop instead of blocking a
+worker thread per in-flight LLM request.
 """
+import hashlib
+import json
 import logging
-from typing import Optional, Dict, Any, List
-from openai import AzureOpenAI
-from django.conf import settings
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from asgiref.sync import sync_to_async
+from django.core.cache import cache as django_cache
+from knowledgebase.services.kb_version import get_kb_version
+from agents.llm_executor import llm_slot, get_shared_executor, closing_db_connections, PRIORITY_GENERATION
+from agents.single_flight import llm_flight
+from agents.llm_pool import get_async_chat_client, AsyncPooledChatClient, TIER_REASON, TIER_GENERATE
+from ..tracing import record_llm_call
+from ..deadline import bounded, DeadlineExceeded
+from ..config import (
+    ENABLE_CACHING,
+    LLM_MEMO_MAX_ENTRIES,
+    LLM_MEMO_TTL,
+    LLM_MEMO_USE_SHARED_CACHE,
+)
 
 logger = logging.getLogger(__name__)
 
-# Singleton client
-_client: Optional[AzureOpenAI] = None
-_model: Optional[str] = None
+def get_llm_client(tier: Optional[str] = None) -> tuple[Optional[AsyncPooledChatClient], Optional[str]]:
+    """
+    Get the async chat client and model. With a tier, the client applies the tier's
+    timeout and max_tokens ceiling.
+    Requests go through the shared deployment pool (rate-limit aware routing, 429 backoff, failover).
+    """
+    return get_async_chat_client(tier)
 
 
-def get_llm_client() -> tuple[Optional[AzureOpenAI], Optional[str]]:
-    """Get or create Azure OpenAI client (singleton)."""
-    global _client, _model
-    
-    if _client is not None:
-        return _client, _model
-    
-    try:
-        api_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-        endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-        api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-        deployment_name = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
-        
-        if not api_key or not endpoint:
-            logger.error("Azure OpenAI credentials not configured")
-            return None, None
-        
-        _client = AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=endpoint
-        )
-        _model = deployment_name
-        
-        logger.info(f"Initialized Azure OpenAI client: {deployment_name}")
-        return _client, _model
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
-        return None, None
+class LLMMemo:
+    """
+    Memoization of deterministic LLM calls.
+    Tier 1: bounded in-process LRU. Tier 2 (optional): the Django cache, shared across workers.
+    """
+
+    SHARED_KEY_PREFIX = "agent_v2:llm_memo:"
+
+    def __init__(self, max_entries: int, ttl: int, use_shared_cache: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_shared_cache = use_shared_cache
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(kwargs: Dict[str, Any], kb_version: str) -> str:
+        """Hash of (model, messages, temperature, max_tokens, response_format) + knowledge base version."""
+        payload = json.dumps({
+            "model": kwargs.get("model"),
+            "messages": kwargs.get("messages"),
+            "temperature": kwargs.get("temperature"),
+            "max_tokens": kwargs.get("max_tokens"),
+            "response_format": kwargs.get("response_format"),
+            "kb_version": kb_version,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.use_shared_cache:
+            value = django_cache.get(self.SHARED_KEY_PREFIX + key)
+            if value is not None:
+                self._set_local(key, value)
+                with self._lock:
+                    self.stats["shared_hits"] += 1
+                return value
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self._set_local(key, value)
+        if self.use_shared_cache:
+            django_cache.set(self.SHARED_KEY_PREFIX + key, value, self.ttl)
+
+    def _set_local(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
+
+
+# Global memo instance
+llm_memo = LLMMemo(
+    max_entries=LLM_MEMO_MAX_ENTRIES,
+    ttl=LLM_MEMO_TTL,
+    use_shared_cache=LLM_MEMO_USE_SHARED_CACHE,
+)
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the LLM memoization layer."""
+    return llm_memo.get_stats()
+
 
+def _is_cacheable_content(content: str, response_format: Optional[Dict[str, str]]) -> bool:
+    """Never memoize a malformed JSON response - the next call should get a fresh attempt."""
+    if response_format and response_format.get("type") == "json_object":
+        try:
+            json.loads(content)
+        except json.JSONDecodeError:
+            return False
+    return bool(content)
 
-def llm_call(
+
+def _build_messages(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    messages: Optional[List[Dict[str, str]]] = None
+) -> List[Dict[str, str]]:
+    """Build the chat message list for a single call."""
+    message_list = []
+    if system_prompt:
+        message_list.append({"role": "system", "content": system_prompt})
+
+    if messages:
+        message_list.extend(messages)
+
+    message_list.append({"role": "user", "content": prompt})
+    return message_list
+
+
+async def _create(client: AsyncPooledChatClient, kwargs: Dict[str, Any], priority: Optional[int]) -> Tuple[Any, float]:
+    """One completion request; returns (response, seconds queued for an LLM slot)."""
+    queued_at = time.perf_counter()
+    async with llm_slot(priority):
+        queue_wait = time.perf_counter() - queued_at
+        response = await client.chat.completions.create(**kwargs)
+    return response, queue_wait
+
+
+async def llm_call(
     prompt: str,
     system_prompt: Optional[str] = None,
     messages: Optional[List[Dict[str, str]]] = None,
     temperature: float = 0.7,
     max_tokens: int = 2000,
-    response_format: Optional[Dict[str, str]] = None
+    response_format: Optional[Dict[str, str]] = None,
+    cache: bool = False,
+    priority: Optional[int] = None,
+    tier: str = TIER_REASON
 ) -> str:
     """
     Make LLM call with error handling.
-    
+
     Args:
         prompt: User prompt
         system_prompt: Optional system prompt
@@ -63,68 +182,205 @@ def llm_call(
         temperature: Temperature for generation
         max_tokens: Maximum tokens
         response_format: Optional response format (e.g., {"type": "json_object"})
-    
+        cache: Memoize the response (opt-in; only for low-temperature calls whose
+            output is fully determined by the inputs)
+        priority: Queue priority for the process-wide LLM limiter
+            (defaults to the priority of the calling context, see `llm_priority`)
+        tier: Model tier (TIER_CLASSIFY / TIER_REASON / TIER_GENERATE); picks the
+            model and timeout and caps max_tokens (see LLM_MODEL_TIERS)
+
     Returns:
         LLM response text
+
+    Raises:
+        DeadlineExceeded: No response within the time left in the turn (TIER_GENERATE
+            calls produce the answer and may use all of it, see deadline.py)
     """
-    client, model = get_llm_client()
-    
+    client, model = get_llm_client(tier)
+
     if not client or not model:
         raise RuntimeError("LLM client not available")
-    
-    # Build messages
-    message_list = []
-    if system_prompt:
-        message_list.append({"role": "system", "content": system_prompt})
-    
-    if messages:
-        message_list.extend(messages)
-    
-    message_list.append({"role": "user", "content": prompt})
-    
+
     try:
         kwargs = {
             "model": model,
-            "messages": message_list,
+            "messages": _build_messages(prompt, system_prompt, messages),
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
-        
+
         if response_format:
             kwargs["response_format"] = response_format
-        
-        response = client.chat.completions.create(**kwargs)
-        return response.choices[0].message.content.strip()
-        
+
+        started_at = time.perf_counter()
+        memo_key = None
+        if cache and ENABLE_CACHING:
+            # Not thread_sensitive: that would queue concurrent turns on Django's one sync thread
+            kb_version = await sync_to_async(
+                closing_db_connections(get_kb_version), thread_sensitive=False, executor=get_shared_executor()
+            )()
+            memo_key = LLMMemo.make_key(kwargs, kb_version)
+            cached = llm_memo.get(memo_key)
+            if cached is not None:
+                record_llm_call(wall_ms=(time.perf_counter() - started_at) * 1000, cache="hit")
+                return cached
+
+        async def request() -> str:
+            nonlocal made_request
+            made_request = True
+            response, queue_wait = await bounded(_create(client, kwargs, priority), generation=tier == TIER_GENERATE)
+            content = response.choices[0].message.content.strip()
+
+            usage = getattr(response, "usage", None)
+            record_llm_call(
+                wall_ms=(time.perf_counter() - started_at) * 1000,
+                queue_wait_ms=queue_wait * 1000,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                cache="miss" if memo_key else None
+            )
+
+            if memo_key and _is_cacheable_content(content, response_format):
+                llm_memo.set(memo_key, content)
+            return content
+
+        made_request = False
+        if not memo_key:
+            return await request()
+
+        # Identical cacheable calls in flight (e.g. two visitors asking the same
+        # question) share one upstream request
+        content = await llm_flight.ado(memo_key, request)
+        if not made_request:
+            record_llm_call(wall_ms=(time.perf_counter() - started_at) * 1000, cache="coalesced")
+        return content
+
     except Exception as e:
         logger.error(f"LLM call failed: {str(e)}", exc_info=True)
         raise
 
 
-def llm_call_json(
+async def llm_stream(
     prompt: str,
     system_prompt: Optional[str] = None,
     messages: Optional[List[Dict[str, str]]] = None,
     temperature: float = 0.7,
-    max_tokens: int = 2000
+    max_tokens: int = 2000,
+    priority: int = PRIORITY_GENERATION,
+    tier: str = TIER_GENERATE
+) -> AsyncIterator[str]:
+    """
+    Make a streaming LLM call and yield content deltas as the model produces them.
+
+    Args:
+        prompt: User prompt
+        system_prompt: Optional system prompt
+        messages: Optional message history
+        temperature: Temperature for generation
+        max_tokens: Maximum tokens
+        priority: Queue priority for the process-wide LLM limiter (the slot is held
+            until the stream is fully consumed)
+        tier: Model tier (see `llm_call`)
+
+    Yields:
+        Text deltas (not stripped, so the concatenation preserves formatting)
+
+    Raises:
+        DeadlineExceeded: The stream did not finish before the finalize reserve of the
+            turn; it is closed and the deltas yielded so far are the partial answer
+    """
+    client, model = get_llm_client(tier)
+
+    if not client or not model:
+        raise RuntimeError("LLM client not available")
+
+    started_at = time.perf_counter()
+    queue_wait = 0.0
+    usage = None
+    chunks = 0
+
+    def record() -> None:
+        # Streams only carry usage when the API version supports it; otherwise
+        # the number of content chunks approximates the completion tokens.
+        record_llm_call(
+            wall_ms=(time.perf_counter() - started_at) * 1000,
+            queue_wait_ms=queue_wait * 1000,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None) or chunks,
+            streamed=True
+        )
+
+    try:
+        async with llm_slot(priority):
+            queue_wait = time.perf_counter() - started_at
+            stream = await bounded(client.chat.completions.create(
+                model=model,
+                messages=_build_messages(prompt, system_prompt, messages),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            ), generation=True)
+            try:
+                iterator = stream.__aiter__()
+                while True:
+                    try:
+                        # Bounded per chunk: a stalled stream stops at the finalize reserve
+                        chunk = await bounded(iterator.__anext__(), generation=True)
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, "usage", None) or usage
+                    # Azure sends a leading chunk with no choices (content filter results)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks += 1
+                        yield delta
+            finally:
+                # Release the connection (and the LLM slot) even when the consumer stops early
+                close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+                if close:
+                    await close()
+
+        record()
+
+    except DeadlineExceeded as e:
+        logger.warning(f"LLM stream stopped after {chunks} chunks: {str(e)}")
+        record()
+        raise
+    except Exception as e:
+        logger.error(f"LLM stream failed: {str(e)}", exc_info=True)
+        raise
+
+
+async def llm_call_json(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 2000,
+    cache: bool = False,
+    priority: Optional[int] = None,
+    tier: str = TIER_REASON
 ) -> Dict[str, Any]:
     """
     Make LLM call and parse JSON response.
-    
+
     Returns:
         Parsed JSON as dictionary
     """
-    import json
-    
-    response = llm_call(
+    response = await llm_call(
         prompt=prompt,
         system_prompt=system_prompt,
         messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
-        response_format={"type": "json_object"}
+        response_format={"type": "json_object"},
+        cache=cache,
+        priority=priority,
+        tier=tier
     )
-    
+
     try:
         return json.loads(response)
     except json.JSONDecodeError as e:
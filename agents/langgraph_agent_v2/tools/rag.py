@@ -6,15 +6,19 @@ Important: Do NOT import `search_knowledge_base` from `agents.tools.rag_tool` be
 
 We reuse the proven tool implementation in `agents.langgraph_agent.tools.search_knowledge_base`.
 """
+import asyncio
 import logging
-from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
+import re
+from typing import List, Dict, Any, Optional
+from asgiref.sync import sync_to_async
 
 from agents.langgraph_agent.tools import search_knowledge_base as v1_search_knowledge_base
+from agents.llm_executor import get_shared_executor, closing_db_connections
 from ..config import (
     ENABLE_RAG_QUERY_VARIATIONS_DOMAIN,
     ENABLE_RAG_QUERY_VARIATIONS_SERVICE_DISCOVERY,
     MAX_RAG_QUERY_VARIATIONS,
+    SPECULATIVE_RAG_MIN_OVERLAP,
 )
 
 logger = logging.getLogger(__name__)
@@ -26,7 +30,7 @@ def _normalize_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     {
       "content": "...",
       "score": 0.0,
-      "metadata": {"url": "..."}
+      "metadata": {"url": "...", "chunk_id": "..."}
     }
     """
     normalized: List[Dict[str, Any]] = []
@@ -37,7 +41,7 @@ def _normalize_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             {
                 "content": r.get("text", "") or "",
                 "score": r.get("score", 0.0) or 0.0,
-                "metadata": {"url": r.get("source", "") or ""},
+                "metadata": {"url": r.get("source", "") or "", "chunk_id": r.get("chunk_id")},
             }
         )
     return normalized
@@ -67,6 +71,31 @@ def search_knowledge_base(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         return []
 
 
+def search_knowledge_base_batch(queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+    """
+    Search several queries with one embeddings request and one batched vector search
+    (agents.tools.rag_tool.search_batch). Results match `search_knowledge_base` per query.
+    """
+    from agents.tools.rag_tool import search_batch
+
+    batch = search_batch(queries)
+    results = []
+    for query, docs in zip(queries, batch):
+        # Same fields and limits as the V1 tool (top 4, text capped at 500 characters)
+        formatted = [
+            {
+                "text": (doc.get("text") or "")[:500],
+                "score": doc.get("score", 0.0),
+                "source": doc.get("reference_url") or doc.get("url") or "",
+                "chunk_id": doc.get("chunk_id"),
+            }
+            for doc in docs[:4]
+        ]
+        results.append(_normalize_results(formatted)[:top_k])
+    logger.info(f"[RAG_V2] Retrieved {[len(r) for r in results]} results for {len(queries)} queries")
+    return results
+
+
 def generate_query_variations(base_query: str, question_type: str) -> List[str]:
     """
     Generate query variations for better retrieval.
@@ -110,7 +139,7 @@ def search_with_variations(
     top_k: int = 5
 ) -> List[Dict[str, Any]]:
     """
-    Search knowledge base with multiple query variations in parallel.
+    Search knowledge base with multiple query variations as one batch.
     
     Args:
         base_query: Original query
@@ -122,33 +151,107 @@ def search_with_variations(
     """
     # Generate variations
     queries = generate_query_variations(base_query, question_type)
+    if len(queries) == 1:
+        return search_knowledge_base(queries[0], top_k)
     
-    # Search in parallel
-    with ThreadPoolExecutor(max_workers=min(len(queries), 4)) as executor:
-        search_futures = [
-            executor.submit(search_knowledge_base, query, top_k)
-            for query in queries
-        ]
-        all_results = [f.result() for f in search_futures]
-    
-    # Combine and deduplicate
-    seen_ids = set()
-    combined_results = []
+    try:
+        # One embeddings request and one vector search for all variations
+        all_results = search_knowledge_base_batch(queries, top_k)
+    except Exception as e:
+        logger.warning(f"[RAG] Batched search failed, searching each variation: {str(e)}")
+        # One after the other: this runs on the shared agent pool, and a pool task waiting on
+        # tasks queued behind it can deadlock the pool under load
+        all_results = [search_knowledge_base(query, top_k) for query in queries]
     
+    # Combine: a chunk found by several variations is kept once, with its best score
+    best: Dict[Any, Dict[str, Any]] = {}
     for results in all_results:
         for result in results:
-            # Use URL or content hash as unique identifier
-            result_id = result.get("metadata", {}).get("url") or hash(result.get("content", ""))
-            if result_id not in seen_ids:
-                seen_ids.add(result_id)
-                combined_results.append(result)
+            result_id = result.get("metadata", {}).get("chunk_id") or hash(result.get("content", ""))
+            if result_id not in best or result.get("score", 0.0) > best[result_id].get("score", 0.0):
+                best[result_id] = result
     
-    # Sort by relevance score if available
-    combined_results.sort(
-        key=lambda x: x.get("score", 0.0),
-        reverse=True
-    )
+    # Sort by relevance score
+    combined_results = sorted(best.values(), key=lambda x: x.get("score", 0.0), reverse=True)
     
     # Return top_k
     logger.info(f"[RAG] Combined {len(combined_results)} unique results from {len(queries)} queries")
     return combined_results[:top_k]
+
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "i", "me", "my",
+    "you", "your", "we", "our", "it", "to", "of", "in", "on", "for", "and", "or", "can", "could",
+    "would", "should", "what", "how", "why", "when", "where", "which", "who", "about", "with",
+    "please", "tell", "explain", "whipsmart",
+}
+
+
+def _query_terms(text: str) -> set:
+    return {w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS}
+
+
+def query_overlap(query_a: str, query_b: str) -> float:
+    """Word-level Jaccard similarity between two queries (stopwords ignored)."""
+    terms_a, terms_b = _query_terms(query_a), _query_terms(query_b)
+    if not terms_a or not terms_b:
+        return 1.0 if (query_a or "").strip().lower() == (query_b or "").strip().lower() else 0.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+
+class SpeculativeRetrieval:
+    """
+    Knowledge base search started before routing has decided that it is needed.
+
+    One instance per turn is passed to the graph via the run config. `start` launches the
+    search for the raw user message; `take` returns its results if the final query is
+    close enough, otherwise None (the caller searches normally).
+    """
+
+    def __init__(self, min_overlap: float = SPECULATIVE_RAG_MIN_OVERLAP):
+        self.min_overlap = min_overlap
+        self.query: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, query: str, top_k: int = 5) -> None:
+        if self._task is not None or not query:
+            return
+        self.query = query
+        self._task = asyncio.ensure_future(
+            sync_to_async(closing_db_connections(search_knowledge_base), thread_sensitive=False, executor=get_shared_executor())(
+                query, top_k=top_k
+            )
+        )
+        logger.info(f"[RAG_V2] Speculative retrieval started for: {query[:50]}...")
+
+    async def take(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        if self._task is None:
+            return None
+        overlap = query_overlap(self.query, query)
+        if overlap < self.min_overlap:
+            logger.info(f"[RAG_V2] Speculative retrieval discarded (overlap={overlap:.2f})")
+            self.discard()
+            return None
+        try:
+            results = await self._task
+        except Exception as e:
+            logger.warning(f"[RAG_V2] Speculative retrieval failed: {str(e)}")
+            return None
+        finally:
+            self._task = None
+        logger.info(f"[RAG_V2] Reusing speculative retrieval (overlap={overlap:.2f})")
+        return results
+
+    def discard(self) -> None:
+        """Drop an unused search (the worker thread finishes; its result is ignored)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def get_speculative_retrieval(config) -> Optional[SpeculativeRetrieval]:
+    """Return the turn's SpeculativeRetrieval from the run config, if any."""
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get("speculative_rag")
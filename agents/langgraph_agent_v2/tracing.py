@@ -0,0 +1,202 @@
+"""
+Per-turn tracing for LangGraph Agent V2.
+
+Records wall time per graph node and, for every LLM call made inside a node, the
+wall time, time spent queued for an LLM slot, prompt/completion tokens and whether
+the call was answered from the memo cache. The trace is saved on the assistant
+ChatMessage.metadata["trace"]; `summarize_traces` aggregates stored traces
+(p50/p95 per node) for the admin metrics endpoint.
+"""
+import contextvars
+import inspect
+import logging
+import math
+import time
+from typing import Optional, Dict, Any, List, Callable, Iterable
+from langchain_core.runnables import RunnableConfig
+from .state import AgentState
+
+logger = logging.getLogger(__name__)
+
+
+class TurnTrace:
+    """Timings of one chat turn (one graph run)."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.nodes: List[Dict[str, Any]] = []
+        self.unattributed_calls: List[Dict[str, Any]] = []  # LLM calls made outside a node
+        self.answer_cache: Optional[str] = None
+
+    def _elapsed_ms(self, since: Optional[float] = None) -> float:
+        return round((time.perf_counter() - (since or self.started_at)) * 1000, 1)
+
+    def start_node(self, name: str) -> Dict[str, Any]:
+        span = {"node": name, "start_ms": self._elapsed_ms(), "wall_ms": None, "llm_calls": []}
+        self.nodes.append(span)
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        nodes = []
+        for span in self.nodes:
+            calls = span["llm_calls"]
+            nodes.append({
+                "node": span["node"],
+                "start_ms": span["start_ms"],
+                "wall_ms": span["wall_ms"],
+                **_sum_calls(calls),
+                "calls": calls,
+            })
+
+        all_calls = [call for span in self.nodes for call in span["llm_calls"]] + self.unattributed_calls
+        trace = {
+            "total_ms": self._elapsed_ms(),
+            "nodes": nodes,
+            "totals": _sum_calls(all_calls),
+        }
+        if self.unattributed_calls:
+            trace["unattributed_calls"] = self.unattributed_calls
+        if self.answer_cache:
+            trace["answer_cache"] = self.answer_cache
+        return trace
+
+
+def _sum_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "llm_calls": len(calls),
+        "llm_ms": round(sum(c["wall_ms"] for c in calls), 1),
+        "queue_wait_ms": round(sum(c["queue_wait_ms"] for c in calls), 1),
+        "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in calls),
+        "completion_tokens": sum(c["completion_tokens"] or 0 for c in calls),
+        "cache_hits": sum(1 for c in calls if c["cache"] == "hit"),
+    }
+
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("agent_v2_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("agent_v2_trace_span", default=None)
+
+
+def start_trace() -> contextvars.Token:
+    """Start tracing the current turn. Pass the returned token to `end_trace`."""
+    return _current_trace.set(TurnTrace())
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+def get_current_trace() -> Optional[TurnTrace]:
+    return _current_trace.get()
+
+
+def record_llm_call(
+    wall_ms: float,
+    queue_wait_ms: float = 0.0,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    cache: Optional[str] = None,
+    streamed: bool = False
+) -> None:
+    """Record one LLM call on the active node (no-op when the turn is not traced)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+
+    call = {
+        "wall_ms": round(wall_ms, 1),
+        "queue_wait_ms": round(queue_wait_ms, 1),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cache": cache,
+    }
+    if streamed:
+        call["streamed"] = True
+
+    span = _current_span.get()
+    (span["llm_calls"] if span is not None else trace.unattributed_calls).append(call)
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    """
+    Wrap a graph node so its wall time (and the LLM calls it makes) are recorded.
+    The wrapper always accepts `config` and forwards it only to nodes that take it.
+    """
+    accepts_config = "config" in inspect.signature(node).parameters
+
+    async def wrapper(state: AgentState, config: RunnableConfig) -> AgentState:
+        trace = _current_trace.get()
+        if trace is None:
+            return await node(state, config) if accepts_config else await node(state)
+
+        span = trace.start_node(name)
+        token = _current_span.set(span)
+        started_at = time.perf_counter()
+        try:
+            return await node(state, config) if accepts_config else await node(state)
+        finally:
+            span["wall_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+            _current_span.reset(token)
+
+    wrapper.__name__ = getattr(node, "__name__", name)
+    wrapper.__doc__ = node.__doc__
+    return wrapper
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[index], 1)
+
+
+def summarize_traces(traces: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate stored turn traces into p50/p95 per node.
+
+    A node that ran more than once in a turn (validation retry) counts as the sum of its runs.
+
+    Returns:
+        {"turns", "total_ms": {...}, "nodes": {name: {"count", "p50_ms", "p95_ms", ...}}}
+    """
+    totals = []
+    per_node: Dict[str, Dict[str, List[float]]] = {}
+
+    for trace in traces:
+        if not trace or not trace.get("nodes"):
+            continue
+        totals.append(trace.get("total_ms") or 0.0)
+
+        turn_nodes: Dict[str, Dict[str, float]] = {}
+        for span in trace["nodes"]:
+            agg = turn_nodes.setdefault(span["node"], {"wall_ms": 0.0, "queue_wait_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "llm_calls": 0, "cache_hits": 0})
+            agg["wall_ms"] += span.get("wall_ms") or 0.0
+            for key in ("queue_wait_ms", "prompt_tokens", "completion_tokens", "llm_calls", "cache_hits"):
+                agg[key] += span.get(key) or 0
+
+        for name, agg in turn_nodes.items():
+            samples = per_node.setdefault(name, {key: [] for key in agg})
+            for key, value in agg.items():
+                samples[key].append(value)
+
+    nodes = {}
+    for name, samples in per_node.items():
+        count = len(samples["wall_ms"])
+        nodes[name] = {
+            "count": count,
+            "p50_ms": _percentile(samples["wall_ms"], 50),
+            "p95_ms": _percentile(samples["wall_ms"], 95),
+            "queue_wait_p95_ms": _percentile(samples["queue_wait_ms"], 95),
+            "avg_llm_calls": round(sum(samples["llm_calls"]) / count, 2),
+            "avg_prompt_tokens": round(sum(samples["prompt_tokens"]) / count, 1),
+            "avg_completion_tokens": round(sum(samples["completion_tokens"]) / count, 1),
+            "cache_hit_rate": round(sum(samples["cache_hits"]) / max(1, sum(samples["llm_calls"])), 3),
+        }
+
+    return {
+        "turns": len(totals),
+        "total_ms": {
+            "p50": _percentile(totals, 50) if totals else None,
+            "p95": _percentile(totals, 95) if totals else None,
+        },
+        "nodes": nodes,
+    }
@@ -0,0 +1,314 @@
+"""
+Process-wide LLM concurrency control shared by all agents.
+
+Every LLM request (V2 graph nodes, multi-agent reasoning, suggestions) takes a slot
+from one bounded limiter before calling Azure OpenAI, so the process never has more
+than LLM_MAX_CONCURRENCY requests in flight. When all slots are taken, waiters are
+served by priority (user-facing generation first, background work last) and FIFO
+within a priority.
+
+Works from both async code (`async with llm_slot(...)`) and worker threads
+(`with llm_slot_sync(...)`). Blocking helper work that used to create a
+ThreadPoolExecutor per call runs on the shared `get_shared_executor()` instead.
+"""
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, Dict, Any, Callable, TypeVar
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Priorities (lower value is served first)
+PRIORITY_GENERATION = 0   # user-facing answer generation / streaming
+PRIORITY_INTERACTIVE = 1  # other calls on the critical path of a turn (intent, reasoning, ...)
+PRIORITY_BACKGROUND = 2   # suggestions, background validation, offline audits
+
+PRIORITY_NAMES = {
+    PRIORITY_GENERATION: "generation",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Default priority for calls that do not pass one explicitly.
+# Background tasks set it once (see `llm_priority`) and every call they make inherits it.
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_priority", default=PRIORITY_INTERACTIVE
+)
+
+# Number of recent wait times kept for percentile metrics
+WAIT_SAMPLE_SIZE = 1000
+# Log a warning when a request waited this long for a slot (cap likely too low for the load)
+SLOW_WAIT_WARNING_SECONDS = 2.0
+
+
+class _Waiter:
+    """A queued request for a slot (from a thread or an event loop)."""
+
+    __slots__ = ("priority", "enqueued_at", "granted", "cancelled", "_event", "_loop", "_future")
+
+    def __init__(self, priority: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self._loop = loop
+        self._future = loop.create_future() if loop else None
+        self._event = None if loop else threading.Event()
+
+    def wake(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._set_result)
+        else:
+            self._event.set()
+
+    def _set_result(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class LLMConcurrencyLimiter:
+    """
+    Thread-safe priority semaphore for LLM requests.
+    Tracks queue depth (per priority), in-flight requests and queue wait times.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._queue = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._reset_metrics()
+
+    def _reset_metrics(self) -> None:
+        self._max_in_flight = 0
+        self._max_queue_depth = 0
+        self._acquired = {priority: 0 for priority in PRIORITY_NAMES}
+        self._queued_total = {priority: 0 for priority in PRIORITY_NAMES}
+        self._wait_total = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._wait_max = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._wait_samples = {priority: deque(maxlen=WAIT_SAMPLE_SIZE) for priority in PRIORITY_NAMES}
+
+    # ---- internal (call with self._lock held) ----
+
+    def _try_acquire_now(self, priority: int) -> bool:
+        """Take a free slot immediately if nobody with the same or higher priority is waiting."""
+        if self._in_flight < self.max_concurrency and not (self._queue and self._queue[0][0] <= priority):
+            self._grant(priority, 0.0)
+            return True
+        return False
+
+    def _grant(self, priority: int, waited: float) -> None:
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        self._acquired[priority] += 1
+        self._wait_total[priority] += waited
+        self._wait_max[priority] = max(self._wait_max[priority], waited)
+        self._wait_samples[priority].append(waited)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+        self._queued[waiter.priority] += 1
+        self._queued_total[waiter.priority] += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the highest-priority waiters."""
+        while self._queue and self._in_flight < self.max_concurrency:
+            _, _, waiter = heapq.heappop(self._queue)
+            self._queued[waiter.priority] -= 1
+            if waiter.cancelled:
+                continue
+            waiter.granted = True
+            waited = time.monotonic() - waiter.enqueued_at
+            self._grant(waiter.priority, waited)
+            waiter.wake()
+            if waited >= SLOW_WAIT_WARNING_SECONDS:
+                logger.warning(
+                    f"[LLM_LIMITER] {PRIORITY_NAMES[waiter.priority]} request waited {waited:.2f}s for a slot "
+                    f"(queue depth {len(self._queue)}, cap {self.max_concurrency})"
+                )
+
+    # ---- public API ----
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def acquire_sync(self, priority: int) -> None:
+        """Block the calling thread until a slot is available."""
+        with self._lock:
+            if self._try_acquire_now(priority):
+                return
+            waiter = _Waiter(priority)
+            self._enqueue(waiter)
+        waiter._event.wait()
+
+    async def acquire(self, priority: int) -> None:
+        """Wait (without blocking the event loop) until a slot is available."""
+        with self._lock:
+            if self._try_acquire_now(priority):
+                return
+            waiter = _Waiter(priority, asyncio.get_running_loop())
+            self._enqueue(waiter)
+
+        try:
+            await waiter._future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # Slot was handed over just as we were cancelled - give it back
+                    self._in_flight -= 1
+                    self._dispatch()
+                else:
+                    waiter.cancelled = True
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of the limiter metrics."""
+        with self._lock:
+            priorities = {}
+            for priority, name in PRIORITY_NAMES.items():
+                samples = sorted(self._wait_samples[priority])
+                acquired = self._acquired[priority]
+                priorities[name] = {
+                    "queued": self._queued[priority],
+                    "acquired": acquired,
+                    "had_to_wait": self._queued_total[priority],
+                    "wait_avg_ms": round(self._wait_total[priority] / acquired * 1000, 1) if acquired else 0.0,
+                    "wait_p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1) if samples else 0.0,
+                    "wait_max_ms": round(self._wait_max[priority] * 1000, 1),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "priorities": priorities,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._reset_metrics()
+
+
+# Global limiter instance (one per process)
+llm_limiter = LLMConcurrencyLimiter(
+    max_concurrency=getattr(settings, 'LLM_MAX_CONCURRENCY', 16)
+)
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+_worker_local = threading.local()
+
+
+def _mark_shared_worker() -> None:
+    _worker_local.shared = True
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """
+    Process-wide bounded thread pool for blocking agent work (sync LLM clients, vector searches).
+    A task on this pool must never block on other tasks submitted to it: under load every
+    worker ends up waiting on children queued behind it and the pool deadlocks. Fan out
+    with `submit_shared`, which runs the work inline when called from a pool thread.
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AGENT_EXECUTOR_MAX_WORKERS', 32),
+                    thread_name_prefix="agent-worker",
+                    initializer=_mark_shared_worker
+                )
+    return _shared_executor
+
+
+def on_shared_executor() -> bool:
+    """True on a thread of the shared executor."""
+    return getattr(_worker_local, "shared", False)
+
+
+def submit_shared(func: Callable[..., T], *args, **kwargs) -> "Future[T]":
+    """
+    Submit to the shared executor for a caller that waits on the result; on a pool thread
+    the call runs inline and the returned future is already done.
+    """
+    if not on_shared_executor():
+        return get_shared_executor().submit(func, *args, **kwargs)
+    future: "Future[T]" = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+
+def closing_db_connections(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap a callable that uses the ORM and runs on a pool thread (the shared executor or
+    sync_to_async with thread_sensitive=False). Pool threads live as long as the process,
+    so like a request each call closes connections that broke or passed CONN_MAX_AGE.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> T:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def _resolve_priority(priority: Optional[int]) -> int:
+    return _current_priority.get() if priority is None else priority
+
+
+@asynccontextmanager
+async def llm_slot(priority: Optional[int] = None):
+    """Hold one LLM concurrency slot (async code)."""
+    await llm_limiter.acquire(_resolve_priority(priority))
+    try:
+        yield
+    finally:
+        llm_limiter.release()
+
+
+@contextmanager
+def llm_slot_sync(priority: Optional[int] = None):
+    """Hold one LLM concurrency slot (sync code running in a worker thread)."""
+    llm_limiter.acquire_sync(_resolve_priority(priority))
+    try:
+        yield
+    finally:
+        llm_limiter.release()
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Set the default priority for LLM calls made inside this block (and tasks started from it)."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def get_llm_limiter_stats() -> Dict[str, Any]:
+    """Queue depth / wait time metrics of the process-wide LLM limiter."""
+    return llm_limiter.get_stats()
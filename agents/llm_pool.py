@@ -0,0 +1,591 @@
+"""
+Shared Azure OpenAI client pool for all agents.
+
+Chat completions can be spread across several deployments (or endpoints) listed in
+the AZURE_OPENAI_DEPLOYMENTS setting; without it the pool has the single deployment
+configured by the AZURE_OPENAI_* settings. For every deployment the pool tracks the
+remaining request/token budget reported in the `x-ratelimit-*` response headers and
+routes each request to the deployment with the most budget left.
+
+On a 429 the deployment cools down for the server's `retry-after` (or an exponential
+backoff with full jitter when the server gives none) and the request fails over to
+the next deployment. Connection errors, timeouts and 5xx responses fail over the same
+way; any other error (bad request, content filter) is raised as is.
+
+Callers keep using the OpenAI client interface:
+
+    client, model = get_chat_client()          # sync (worker threads)
+    client, model = get_async_chat_client()    # async (event loop)
+    response = client.chat.completions.create(model=model, messages=[...])
+
+`model` is a model alias: requests go to the deployments serving that alias (the
+alias defaults to the deployment name). Call sites pick the model by tier
+(`get_chat_client(TIER_CLASSIFY)`); LLM_MODEL_TIERS maps tiers to models.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
+from typing import Optional, Dict, Any, List, Tuple
+from openai import AzureOpenAI, AsyncAzureOpenAI, APIConnectionError, InternalServerError, RateLimitError
+from django.conf import settings
+from agents.cassettes import (
+    get_cassette,
+    llm_completion as cassette_llm_completion,
+    allm_completion as cassette_allm_completion,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeploymentConfig:
+    """One Azure OpenAI deployment the pool can send chat completions to."""
+    name: str
+    endpoint: str
+    api_key: str
+    deployment: str
+    model: str
+    api_version: str = "2024-02-15-preview"
+    weight: float = 1.0
+
+
+def load_deployment_configs() -> List[DeploymentConfig]:
+    """
+    Deployments from settings.
+
+    AZURE_OPENAI_DEPLOYMENTS is a list (or JSON string) of objects with `endpoint`,
+    `deployment` and optionally `api_key`, `api_version`, `model`, `name` and `weight`.
+    Missing keys fall back to the AZURE_OPENAI_* settings. When it is empty, the single
+    AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_DEPLOYMENT_NAME deployment is used.
+    """
+    default_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
+    default_endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
+    default_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
+    default_deployment = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', None) or 'gpt-4o'
+
+    entries = getattr(settings, 'AZURE_OPENAI_DEPLOYMENTS', None) or []
+    if isinstance(entries, str):
+        try:
+            entries = json.loads(entries) if entries.strip() else []
+        except json.JSONDecodeError as e:
+            logger.error(f"[LLM_POOL] AZURE_OPENAI_DEPLOYMENTS is not valid JSON: {str(e)}")
+            entries = []
+
+    configs = []
+    for index, entry in enumerate(entries):
+        endpoint = entry.get('endpoint') or default_endpoint
+        api_key = entry.get('api_key') or default_key
+        deployment = entry.get('deployment') or default_deployment
+        if not endpoint or not api_key:
+            logger.error(f"[LLM_POOL] Deployment #{index} has no endpoint or API key - skipped")
+            continue
+        configs.append(DeploymentConfig(
+            name=entry.get('name') or f"{deployment}@{endpoint}",
+            endpoint=endpoint,
+            api_key=api_key,
+            deployment=deployment,
+            model=entry.get('model') or deployment,
+            api_version=entry.get('api_version') or default_version,
+            weight=float(entry.get('weight', 1.0)),
+        ))
+
+    if not configs and default_key and default_endpoint:
+        configs.append(DeploymentConfig(
+            name=default_deployment,
+            endpoint=default_endpoint,
+            api_key=default_key,
+            deployment=default_deployment,
+            model=default_deployment,
+            api_version=default_version,
+        ))
+    return configs
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit reset header ("20", "1.5s", "6m0s", "250ms")."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Server-suggested wait of a 429 response, in seconds."""
+    if headers is None:
+        return None
+    retry_after_ms = _parse_int(headers.get("retry-after-ms"))
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return _parse_duration(headers.get("retry-after"))
+
+
+class Deployment:
+    """A deployment plus its observed rate-limit budget and health."""
+
+    def __init__(self, config: DeploymentConfig, budget_window: float, backoff_base: float, backoff_max: float):
+        self.config = config
+        self.budget_window = budget_window
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._sync_client: Optional[AzureOpenAI] = None
+        # One async client per event loop: httpx connection pools are bound to the loop that created them.
+        # Short-lived loops close theirs with aclose_async_clients()
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAzureOpenAI]" = weakref.WeakKeyDictionary()
+
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.limit_requests: Optional[int] = None
+        self.limit_tokens: Optional[int] = None
+        self.budget_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    # ---- clients (retries are handled by the pool, so the SDK's own are disabled) ----
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "api_key": self.config.api_key,
+            "api_version": self.config.api_version,
+            "azure_endpoint": self.config.endpoint,
+            "max_retries": 0,
+            "timeout": getattr(settings, 'LLM_POOL_REQUEST_TIMEOUT', 60.0),
+        }
+
+    def sync_client(self) -> AzureOpenAI:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = AzureOpenAI(**self._client_kwargs())
+        return self._sync_client
+
+    def async_client(self) -> AsyncAzureOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncAzureOpenAI(**self._client_kwargs())
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose_async_client(self) -> None:
+        """Close the async client bound to the running loop (its connections die with the loop)."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    # ---- budget / health ----
+
+    def score(self, now: float) -> float:
+        """Share of the request/token budget left (0..1) times the weight; unknown budget counts as full."""
+        with self._lock:
+            if now >= self.budget_reset_at:
+                fraction = 1.0
+            else:
+                fraction = min(
+                    _fraction(self.remaining_requests, self.limit_requests),
+                    _fraction(self.remaining_tokens, self.limit_tokens),
+                )
+        return fraction * self.config.weight
+
+    def is_cooling(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def record_success(self, headers) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.consecutive_failures = 0
+            remaining_requests = _parse_int(headers.get("x-ratelimit-remaining-requests"))
+            remaining_tokens = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+            if remaining_requests is None and remaining_tokens is None:
+                return
+            self.remaining_requests = remaining_requests
+            self.remaining_tokens = remaining_tokens
+            # Azure does not always send the limits: the largest remaining value seen approximates them
+            self.limit_requests = _parse_int(headers.get("x-ratelimit-limit-requests")) or max(self.limit_requests or 0, remaining_requests or 0) or None
+            self.limit_tokens = _parse_int(headers.get("x-ratelimit-limit-tokens")) or max(self.limit_tokens or 0, remaining_tokens or 0) or None
+            reset = max(
+                _parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                _parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+            )
+            self.budget_reset_at = time.monotonic() + (reset or self.budget_window)
+
+    def record_rate_limited(self, retry_after: Optional[float]) -> float:
+        """Cool down after a 429; returns the cooldown in seconds."""
+        with self._lock:
+            self.stats["rate_limited"] += 1
+            self.consecutive_failures += 1
+            self.remaining_requests = 0
+            self.budget_reset_at = time.monotonic() + (retry_after or self.budget_window)
+            cooldown = self._cooldown(retry_after)
+            self.cooldown_until = time.monotonic() + cooldown
+            return cooldown
+
+    def record_failure(self) -> float:
+        """Cool down after a connection error / timeout / 5xx; returns the cooldown in seconds."""
+        with self._lock:
+            self.stats["errors"] += 1
+            self.consecutive_failures += 1
+            cooldown = self._cooldown(None)
+            self.cooldown_until = time.monotonic() + cooldown
+            return cooldown
+
+    def _cooldown(self, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # Spread the retries of all workers that were told the same retry-after
+            return retry_after + random.uniform(0, min(1.0, retry_after * 0.25))
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1)))
+
+    def get_stats(self, now: float) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "deployment": self.config.deployment,
+                "model": self.config.model,
+                "endpoint": self.config.endpoint,
+                "remaining_requests": self.remaining_requests,
+                "remaining_tokens": self.remaining_tokens,
+                "cooling_down_ms": round(max(0.0, self.cooldown_until - now) * 1000),
+                **self.stats,
+            }
+
+
+def _replaying() -> bool:
+    cassette = get_cassette()
+    return cassette is not None and cassette.replaying
+
+
+def _fraction(remaining: Optional[int], limit: Optional[int]) -> float:
+    if remaining is None:
+        return 1.0
+    if not limit:
+        return 1.0 if remaining else 0.0
+    return max(0.0, min(1.0, remaining / limit))
+
+
+class LLMClientPool:
+    """Routes chat completions across deployments with 429 backoff and failover."""
+
+    def __init__(
+        self,
+        configs: List[DeploymentConfig],
+        max_attempts: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        budget_window: float = 10.0
+    ):
+        self._deployment_args = (budget_window, backoff_base, backoff_max)
+        self.deployments = [Deployment(config, *self._deployment_args) for config in configs]
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_max = backoff_max
+        self._next = 0  # round-robin tie break
+        self._lock = threading.Lock()
+        self.stats = {"failovers": 0, "exhausted": 0}
+
+    def __bool__(self) -> bool:
+        # A replayed cassette answers without any deployment configured
+        return bool(self.deployments) or _replaying()
+
+    @property
+    def default_model(self) -> Optional[str]:
+        if self.deployments:
+            return self.deployments[0].config.model
+        return (getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', None) or "gpt-4o") if _replaying() else None
+
+    def _candidates(self, model: Optional[str]) -> List[Deployment]:
+        matching = [d for d in self.deployments if d.config.model == model or d.config.deployment == model]
+        if matching or not model:
+            return matching or self.deployments
+        return self._add_model(model)
+
+    def _add_model(self, model: str) -> List[Deployment]:
+        """
+        A model no configured deployment serves (e.g. a tier's small model) is taken to be a
+        deployment of that name on every configured endpoint.
+        """
+        with self._lock:
+            matching = [d for d in self.deployments if d.config.model == model]
+            if matching:
+                return matching
+            endpoints = {}
+            for d in self.deployments:
+                endpoints.setdefault(d.config.endpoint, d.config)
+            added = [
+                Deployment(
+                    replace(config, name=f"{model}@{config.endpoint}", deployment=model, model=model),
+                    *self._deployment_args
+                )
+                for config in endpoints.values()
+            ]
+            self.deployments = self.deployments + added
+        logger.info(f"[LLM_POOL] Added deployments: {', '.join(d.config.name for d in added)}")
+        return added
+
+    def _choose(self, model: Optional[str], tried: set) -> Tuple[Deployment, float]:
+        """
+        Pick the deployment for the next attempt: untried before tried, then the most budget left.
+        Returns (deployment, seconds to wait first) - the wait is non-zero only when every
+        candidate is cooling down.
+        """
+        now = time.monotonic()
+        candidates = self._candidates(model)
+        with self._lock:
+            offset = self._next
+            self._next += 1
+
+        ready = [d for d in candidates if not d.is_cooling(now)]
+        if ready:
+            untried = [d for d in ready if id(d) not in tried]
+            pool = untried or ready
+            rotated = pool[offset % len(pool):] + pool[:offset % len(pool)]
+            return max(rotated, key=lambda d: d.score(now)), 0.0
+
+        soonest = min(candidates, key=lambda d: d.cooldown_until)
+        return soonest, min(self.backoff_max, soonest.cooldown_until - now)
+
+    def _record_error(self, deployment: Deployment, error: Exception, attempt: int) -> None:
+        if isinstance(error, RateLimitError):
+            cooldown = deployment.record_rate_limited(_retry_after(getattr(error.response, "headers", None)))
+            reason = "429"
+        else:
+            cooldown = deployment.record_failure()
+            reason = type(error).__name__
+        logger.warning(
+            f"[LLM_POOL] {deployment.config.name} failed ({reason}, attempt {attempt + 1}/{self.max_attempts}); "
+            f"cooling down {cooldown:.2f}s"
+        )
+
+    def _exhausted(self, error: Exception) -> None:
+        with self._lock:
+            self.stats["exhausted"] += 1
+        logger.error(f"[LLM_POOL] All attempts failed: {str(error)}")
+        raise error
+
+    def _failover(self, attempt: int) -> None:
+        if attempt:
+            with self._lock:
+                self.stats["failovers"] += 1
+
+    def create(self, **kwargs):
+        """Blocking `chat.completions.create` with routing, 429 backoff and failover."""
+        if get_cassette() is not None:
+            return cassette_llm_completion(kwargs, lambda: self._create(**kwargs))
+        return self._create(**kwargs)
+
+    def _create(self, **kwargs):
+        model = kwargs.get("model")
+        tried = set()
+        for attempt in range(self.max_attempts):
+            deployment, wait = self._choose(model, tried)
+            if wait > 0:
+                time.sleep(wait)
+            self._failover(attempt)
+            tried.add(id(deployment))
+            try:
+                raw = deployment.sync_client().chat.completions.with_raw_response.create(
+                    **dict(kwargs, model=deployment.config.deployment)
+                )
+            except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                self._record_error(deployment, e, attempt)
+                if attempt == self.max_attempts - 1:
+                    self._exhausted(e)
+                continue
+            deployment.record_success(raw.headers)
+            return raw.parse()
+
+    async def acreate(self, **kwargs):
+        """Async `chat.completions.create` with routing, 429 backoff and failover."""
+        if get_cassette() is not None:
+            return await cassette_allm_completion(kwargs, lambda: self._acreate(**kwargs))
+        return await self._acreate(**kwargs)
+
+    async def _acreate(self, **kwargs):
+        model = kwargs.get("model")
+        tried = set()
+        for attempt in range(self.max_attempts):
+            deployment, wait = self._choose(model, tried)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._failover(attempt)
+            tried.add(id(deployment))
+            try:
+                raw = await deployment.async_client().chat.completions.with_raw_response.create(
+                    **dict(kwargs, model=deployment.config.deployment)
+                )
+            except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                self._record_error(deployment, e, attempt)
+                if attempt == self.max_attempts - 1:
+                    self._exhausted(e)
+                continue
+            deployment.record_success(raw.headers)
+            return raw.parse()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "deployments": {d.config.name: d.get_stats(now) for d in self.deployments},
+        }
+
+
+class _Completions:
+    def __init__(self, create, tier: Optional["ModelTier"] = None):
+        self._create = create
+        self._tier = tier
+
+    def create(self, **kwargs):
+        if self._tier is not None:
+            kwargs.setdefault("timeout", self._tier.timeout)
+            kwargs["max_tokens"] = self._tier.cap_tokens(kwargs.get("max_tokens"))
+        return self._create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, create, tier: Optional["ModelTier"] = None):
+        self.completions = _Completions(create, tier)
+
+
+class PooledChatClient:
+    """Stand-in for `AzureOpenAI` in code that only calls `client.chat.completions.create(...)`."""
+
+    def __init__(self, pool: LLMClientPool, tier: Optional["ModelTier"] = None):
+        self.pool = pool
+        self.chat = _Chat(pool.create, tier)
+
+
+class AsyncPooledChatClient:
+    """Stand-in for `AsyncAzureOpenAI` in code that only calls `await client.chat.completions.create(...)`."""
+
+    def __init__(self, pool: LLMClientPool, tier: Optional["ModelTier"] = None):
+        self.pool = pool
+        self.chat = _Chat(pool.acreate, tier)
+
+
+# Model tiers: every call site declares what kind of call it makes and settings
+# (LLM_MODEL_TIERS) map the tier to a model, a max_tokens ceiling and a timeout.
+TIER_CLASSIFY = "classify"  # intent, routing, extraction, tone checks, suggestions, summaries
+TIER_REASON = "reason"      # answer planning, fact / completeness checks
+TIER_GENERATE = "generate"  # the answer the user reads
+
+DEFAULT_TIERS = {
+    TIER_CLASSIFY: {"max_tokens": 500, "timeout": 15.0},
+    TIER_REASON: {"max_tokens": 1000, "timeout": 30.0},
+    TIER_GENERATE: {"max_tokens": 2000, "timeout": 60.0},
+}
+
+
+@dataclass
+class ModelTier:
+    name: str
+    model: Optional[str]
+    max_tokens: int
+    timeout: float
+
+    def cap_tokens(self, max_tokens: Optional[int]) -> int:
+        """The call site's max_tokens, capped at the tier's ceiling."""
+        return min(max_tokens, self.max_tokens) if max_tokens else self.max_tokens
+
+
+def get_model_tier(tier: str) -> ModelTier:
+    """
+    Model and limits of a tier. A tier without a model in LLM_MODEL_TIERS uses the
+    default deployment (AZURE_OPENAI_DEPLOYMENT_NAME).
+    """
+    configured = (getattr(settings, 'LLM_MODEL_TIERS', None) or {}).get(tier) or {}
+    defaults = DEFAULT_TIERS.get(tier, DEFAULT_TIERS[TIER_REASON])
+    return ModelTier(
+        name=tier,
+        model=configured.get("model") or get_llm_pool().default_model,
+        max_tokens=int(configured.get("max_tokens") or defaults["max_tokens"]),
+        timeout=float(configured.get("timeout") or defaults["timeout"]),
+    )
+
+
+_pool: Optional[LLMClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMClientPool:
+    """The process-wide pool (built from settings on first use)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LLMClientPool(
+                    load_deployment_configs(),
+                    max_attempts=getattr(settings, 'LLM_POOL_MAX_ATTEMPTS', 4),
+                    backoff_base=getattr(settings, 'LLM_POOL_BACKOFF_BASE', 0.5),
+                    backoff_max=getattr(settings, 'LLM_POOL_BACKOFF_MAX', 8.0),
+                )
+                if _pool:
+                    logger.info(f"[LLM_POOL] Initialized with deployments: {', '.join(d.config.name for d in _pool.deployments)}")
+                else:
+                    logger.error("[LLM_POOL] Azure OpenAI credentials not configured")
+    return _pool
+
+
+def get_chat_client(tier: Optional[str] = None) -> Tuple[Optional[PooledChatClient], Optional[str]]:
+    """
+    (sync client, model) or (None, None) when no deployment is configured.
+    With a tier, requests use the tier's model and timeout and max_tokens is capped at
+    the tier's ceiling; otherwise the default model.
+    """
+    pool = get_llm_pool()
+    if not pool:
+        return None, None
+    if tier is None:
+        return PooledChatClient(pool), pool.default_model
+    model_tier = get_model_tier(tier)
+    return PooledChatClient(pool, model_tier), model_tier.model
+
+
+def get_async_chat_client(tier: Optional[str] = None) -> Tuple[Optional[AsyncPooledChatClient], Optional[str]]:
+    """Async variant of `get_chat_client`."""
+    pool = get_llm_pool()
+    if not pool:
+        return None, None
+    if tier is None:
+        return AsyncPooledChatClient(pool), pool.default_model
+    model_tier = get_model_tier(tier)
+    return AsyncPooledChatClient(pool, model_tier), model_tier.model
+
+
+async def aclose_async_clients() -> None:
+    """
+    Close the pool's async clients bound to the running event loop. Call it before a
+    short-lived loop (async_to_sync from a sync caller) ends, or the clients and their
+    connections are left open.
+    """
+    if _pool is not None:
+        for deployment in list(_pool.deployments):
+            await deployment.aclose_async_client()
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """Per-deployment budget, 429 and failover counters of the shared pool."""
+    return get_llm_pool().get_stats()
@@ -5,9 +5,10 @@ Implements parallel agent execution with orchestrator pattern for structured ans
 import logging
 import time
 from typing import Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from openai import AzureOpenAI
 from django.conf import settings
+from agents.llm_executor import submit_shared, llm_slot_sync, PRIORITY_GENERATION, PRIORITY_INTERACTIVE
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,11 @@ class MultiAgentReasoning:
         self.client = client
         self.model = model
     
+    def _create_completion(self, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Chat completion through the process-wide LLM limiter."""
+        with llm_slot_sync(priority):
+            return self.client.chat.completions.create(**kwargs)
+    
     def orchestrate(
         self,
         user_question: str,
@@ -63,69 +69,69 @@ class MultiAgentReasoning:
             # Step 2: Run Agent 3 and Agent 4 in parallel (both depend on Agent 1)
             logger.info("[MULTI-AGENT] Step 2: Running Agent 3 and Agent 4 in parallel...")
             parallel_start = time.time()
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                # Submit both agents to run concurrently with labels
-                future_to_agent = {
-                    executor.submit(
-                        self._agent3_structure_planner,
-                        user_question,
-                        agent1_result
-                    ): "agent3",
-                    executor.submit(
-                        self._agent4_coverage_definer,
-                        user_question,
-                        agent1_result,
-                        rag_context
-                    ): "agent4"
+            # Shared bounded pool (no per-turn thread creation); inline when already on it
+            # Submit both agents to run concurrently with labels
+            future_to_agent = {
+                submit_shared(
+                    self._agent3_structure_planner,
+                    user_question,
+                    agent1_result
+                ): "agent3",
+                submit_shared(
+                    self._agent4_coverage_definer,
+                    user_question,
+                    agent1_result,
+                    rag_context
+                ): "agent4"
+            }
+            
+            # Wait for both to complete and collect results
+            agent3_result = None
+            agent4_result = None
+            
+            for future in as_completed(future_to_agent):
+                agent_name = future_to_agent[future]
+                try:
+                    result = future.result()
+                    if agent_name == "agent3":
+                        agent3_result = result
+                        logger.info("[MULTI-AGENT] Agent 3 (Structure Planner) completed")
+                    elif agent_name == "agent4":
+                        agent4_result = result
+                        logger.info("[MULTI-AGENT] Agent 4 (Coverage Definer) completed")
+                except Exception as e:
+                    logger.error(f"[MULTI-AGENT] Error in {agent_name}: {str(e)}", exc_info=True)
+                    # Set fallback results if one fails
+                    if agent_name == "agent3" and agent3_result is None:
+                        agent3_result = {
+                            "length": "medium",
+                            "structure": "bullets",
+                            "ordering": "logical flow",
+                            "sections": []
+                        }
+                    elif agent_name == "agent4" and agent4_result is None:
+                        agent4_result = {
+                            "must_include": [],
+                            "optional": [],
+                            "exclude": []
+                        }
+            
+            # Ensure both results are available (fallback if needed)
+            if agent3_result is None:
+                logger.warning("[MULTI-AGENT] Agent 3 failed, using fallback")
+                agent3_result = {
+                    "length": "medium",
+                    "structure": "bullets",
+                    "ordering": "logical flow",
+                    "sections": []
+                }
+            if agent4_result is None:
+                logger.warning("[MULTI-AGENT] Agent 4 failed, using fallback")
+                agent4_result = {
+                    "must_include": [],
+                    "optional": [],
+                    "exclude": []
                 }
-                
-                # Wait for both to complete and collect results
-                agent3_result = None
-                agent4_result = None
-                
-                for future in as_completed(future_to_agent):
-                    agent_name = future_to_agent[future]
-                    try:
-                        result = future.result()
-                        if agent_name == "agent3":
-                            agent3_result = result
-                            logger.info("[MULTI-AGENT] Agent 3 (Structure Planner) completed")
-                        elif agent_name == "agent4":
-                            agent4_result = result
-                            logger.info("[MULTI-AGENT] Agent 4 (Coverage Definer) completed")
-                    except Exception as e:
-                        logger.error(f"[MULTI-AGENT] Error in {agent_name}: {str(e)}", exc_info=True)
-                        # Set fallback results if one fails
-                        if agent_name == "agent3" and agent3_result is None:
-                            agent3_result = {
-                                "length": "medium",
-                                "structure": "bullets",
-                                "ordering": "logical flow",
-                                "sections": []
-                            }
-                        elif agent_name == "agent4" and agent4_result is None:
-                            agent4_result = {
-                                "must_include": [],
-                                "optional": [],
-                                "exclude": []
-                            }
-                
-                # Ensure both results are available (fallback if needed)
-                if agent3_result is None:
-                    logger.warning("[MULTI-AGENT] Agent 3 failed, using fallback")
-                    agent3_result = {
-                        "length": "medium",
-                        "structure": "bullets",
-                        "ordering": "logical flow",
-                        "sections": []
-                    }
-                if agent4_result is None:
-                    logger.warning("[MULTI-AGENT] Agent 4 failed, using fallback")
-                    agent4_result = {
-                        "must_include": [],
-                        "optional": [],
-                        "exclude": []
-                    }
             
             parallel_time = time.time() - parallel_start
             logger.info(f"[MULTI-AGENT] Parallel agents (Agent 3 & 4) completed in {parallel_time:.2f}s (parallel execution)")
@@ -206,7 +212,7 @@ KEY_TOPICS: [List 3-5 key topics this question touches on]
 Be concise and accurate."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a question classification agent. Analyze questions and provide structured metadata."},
@@ -266,7 +272,7 @@ SECTION_BREAKDOWN: [List 2-4 main sections/points that should be covered - keep
 Ensure structure matches question type and complexity. Keep answers concise and focused."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a structure planning agent. Plan answer structure and length."},
@@ -360,7 +366,7 @@ EXCLUDE: [List items to exclude: fluff, repetition, future features, invented ca
 Be strict and focused - only what exists today and is explicitly in the provided context."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are Agent 4 — MUST-HAVE COVERAGE DEFINER (STRICT MODE). You do NOT write prose. You only define required coverage based on the question and provided context. Be strict and focused - only what exists today and is explicitly in the provided context."},
@@ -502,7 +508,8 @@ Generate the answer now:"""
         Structured Response Generator: Generates final answer using assembled prompt.
         """
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
+                priority=PRIORITY_GENERATION,
                 model=self.model,
                 messages=[
                     {
@@ -537,7 +544,8 @@ CRITICAL: COMPLETENESS REQUIREMENT - Always provide a complete, finished answer.
             if not self._is_answer_complete(answer):
                 logger.warning("[MULTI-AGENT] Answer appears incomplete, regenerating with higher token limit...")
                 # Regenerate with higher token limit
-                response = self.client.chat.completions.create(
+                response = self._create_completion(
+                    priority=PRIORITY_GENERATION,
                     model=self.model,
                     messages=[
                         {
@@ -627,7 +635,7 @@ STATUS: [APPROVED|FIX_REQUIRED]
 FIX_REQUIRED: [If STATUS is FIX_REQUIRED, list specific missing items to ADD or unsupported items to REMOVE. Be specific and concise. If APPROVED, leave empty]"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {
@@ -720,7 +728,8 @@ CRITICAL: COMPLETENESS REQUIREMENT
 Generate the fixed answer now:"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
+                priority=PRIORITY_GENERATION,
                 model=self.model,
                 messages=[
                     {
@@ -751,7 +760,8 @@ GOLD STANDARD — STYLE & DISCIPLINE:
             if not self._is_answer_complete(fixed_answer):
                 logger.warning("[MULTI-AGENT] Fixed answer appears incomplete, regenerating...")
                 # Regenerate with higher limit
-                response = self.client.chat.completions.create(
+                response = self._create_completion(
+                    priority=PRIORITY_GENERATION,
                     model=self.model,
                     messages=[
                         {
@@ -2,8 +2,7 @@
 Agent nodes for LangGraph.
 """
 import json
-from openai import AzureOpenAI
-from django.conf import settings
+from agents.llm_pool import get_chat_client
 from agents.prompts import SYSTEM_PROMPT, FINAL_SYNTHESIS_PROMPT, VALIDATION_PROMPT, DECISION_MAKER_PROMPT
 from agents.state import AgentState
 from agents.utils import is_greeting, get_greeting_response
@@ -13,11 +12,6 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-# Initialize Azure OpenAI client
-_client = None
-_model = None
-
-
 def _expand_query_for_rag(query: str) -> str:
     """
     Expand query to improve matching with knowledge base content.
@@ -55,33 +49,8 @@ def _expand_query_for_rag(query: str) -> str:
 
 
 def _get_openai_client():
-    """Initialize Azure OpenAI client (singleton)"""
-    global _client, _model
-    
-    if _client is not None:
-        return _client, _model
-    
-    api_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-    endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-    api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-    deployment_name = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
-    
-    if not api_key or not endpoint:
-        logger.error("Azure OpenAI credentials not configured in settings")
-        return None, None
-    
-    try:
-        _client = AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=endpoint
-        )
-        _model = deployment_name
-        logger.info(f"Initialized Azure OpenAI client with deployment: {deployment_name}")
-        return _client, _model
-    except Exception as e:
-        logger.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
-        return None, None
+    """Shared Azure OpenAI chat client (deployment pool, see agents.llm_pool) and default model"""
+    return get_chat_client()
 
 
 def decision_maker_node(state) -> AgentState:
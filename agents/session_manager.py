@@ -2,13 +2,30 @@
 Session manager that works with Django Session and ChatMessage models.
 """
 from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
-from chats.models import Session, ChatMessage
+from chats.models import Session, ChatMessage, ConversationCheckpoint
 from agents.state import AgentState
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Messages kept in a conversation checkpoint (the agents only look at the recent tail);
+# older messages are dropped once they are folded into the rolling summary
+CHECKPOINT_MAX_MESSAGES = 50
+
+
+@dataclass
+class ConversationHistory:
+    """Conversation history of a session as loaded from its checkpoint (see `aload_history`)."""
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    last_message_at: Optional[datetime] = None
+    last_message_ids: List[str] = field(default_factory=list)
+    message_count: int = 0
+    new_messages: int = 0  # messages read from ChatMessage on this load
+    summary: str = ''  # rolling summary of older messages (maintained by the V2 history manager)
+    summary_message_count: int = 0
+
 
 class DjangoSessionManager:
     """
@@ -56,6 +73,84 @@ class DjangoSessionManager:
             logger.error(f"Session not found: {session_id}")
             raise
     
+    async def aload_history(self, session: Session) -> ConversationHistory:
+        """
+        Load the conversation history of a session from its checkpoint plus the
+        messages saved since (normally just the new user message and the previous answer).
+        Without a checkpoint (first turn, or after invalidation) the whole history is read.
+        Fetch the session with `select_related('checkpoint')` to avoid an extra query.
+        """
+        if Session.checkpoint.is_cached(session):
+            checkpoint = getattr(session, 'checkpoint', None)
+        else:
+            checkpoint = await ConversationCheckpoint.objects.filter(session_id=session.id).afirst()
+        
+        history = ConversationHistory(
+            messages=list(checkpoint.messages) if checkpoint else [],
+            last_message_at=checkpoint.last_message_at if checkpoint else None,
+            last_message_ids=list(checkpoint.last_message_ids) if checkpoint else [],
+            message_count=checkpoint.message_count if checkpoint else 0,
+            summary=checkpoint.summary if checkpoint else '',
+            summary_message_count=checkpoint.summary_message_count if checkpoint else 0,
+        )
+        
+        new_messages = ChatMessage.objects.filter(session_id=session.id, is_deleted=False)
+        if history.last_message_at:
+            new_messages = new_messages.filter(
+                timestamp__gte=history.last_message_at
+            ).exclude(id__in=history.last_message_ids)
+        
+        async for msg in new_messages.order_by('timestamp').only('id', 'role', 'message', 'timestamp'):
+            history.messages.append({
+                "role": msg.role,
+                "content": msg.message
+            })
+            if msg.timestamp != history.last_message_at:
+                history.last_message_at = msg.timestamp
+                history.last_message_ids = []
+            history.last_message_ids.append(str(msg.id))
+            history.message_count += 1
+            history.new_messages += 1
+        
+        # Only the recent tail is ever used by the agent, but messages not yet folded into the
+        # summary are kept until they are (the summary refresh reads them from here)
+        offset = history.message_count - len(history.messages)  # session-wide position of messages[0]
+        summarized = max(0, history.summary_message_count - offset)
+        drop = min(len(history.messages) - CHECKPOINT_MAX_MESSAGES, summarized)
+        if drop > 0:
+            history.messages = history.messages[drop:]
+        
+        logger.info(
+            f"Loaded history for session: {session.id} "
+            f"({history.new_messages} new, {history.message_count} total, checkpoint={'yes' if checkpoint else 'no'})"
+        )
+        return history
+    
+    async def asave_checkpoint(self, session: Session, history: ConversationHistory) -> None:
+        """Persist the history loaded by `aload_history` (no-op when nothing new was read)."""
+        if not history.new_messages:
+            return
+        await ConversationCheckpoint.objects.aupdate_or_create(
+            session_id=session.id,
+            defaults={
+                'messages': history.messages,
+                'last_message_at': history.last_message_at,
+                'last_message_ids': history.last_message_ids,
+                'message_count': history.message_count,
+            }
+        )
+    
+    def invalidate_checkpoint(self, session_id: str) -> None:
+        """
+        Drop the checkpoint of a session after a stored message was edited or deleted;
+        the next turn rebuilds it from ChatMessage.
+        """
+        ConversationCheckpoint.objects.filter(session_id=session_id).delete()
+    
+    async def ainvalidate_checkpoint(self, session_id: str) -> None:
+        """Async variant of invalidate_checkpoint."""
+        await ConversationCheckpoint.objects.filter(session_id=session_id).adelete()
+    
     def save_agent_state(self, session_id: str, state: AgentState):
         """
         Save agent state to Django models.
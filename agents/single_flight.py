@@ -0,0 +1,127 @@
+"""
+Single-flight coalescing of identical in-flight upstream requests.
+
+When several visitors ask the same question at the same moment, each turn would make
+the same embedding request, Pinecone query and deterministic LLM calls. With single
+flight, the first caller (the leader) makes the request; identical requests that
+arrive while it is in flight wait for its result instead of calling upstream again.
+
+Nothing is cached: once the leader finishes, the next identical request goes
+upstream (caching is the job of the LLM memo / answer cache). Works across worker
+threads (`do`) and event loops (`ado`) of one process. Followers receive the
+leader's result object itself, so results must be treated as read-only.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderCancelled(Exception):
+    """The leader of a coalesced request was cancelled before it finished."""
+
+
+def make_key(*parts: Any) -> str:
+    """Hash of the JSON-serializable request parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-normalized text for request keys."""
+    return " ".join((text or "").split())
+
+
+class SingleFlight:
+    """One group of coalesced requests (e.g. all embedding requests)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0, "errors": 0}
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'AGENT_SINGLE_FLIGHT_ENABLED', True)
+
+    def _join(self, key: str):
+        """Returns (future, is_leader)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.stats["calls"] += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+            if error is not None:
+                self.stats["errors"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call `fn(*args, **kwargs)` unless an identical call is in flight (blocking callers)."""
+        if not self.enabled():
+            return fn(*args, **kwargs)
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await `fn(*args, **kwargs)` unless an identical call is in flight (async callers)."""
+        if not self.enabled():
+            return await fn(*args, **kwargs)
+        future, is_leader = self._join(key)
+        if not is_leader:
+            # shield: a cancelled follower must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            # Followers were not cancelled themselves - fail them with a regular error
+            self._finish(key, future, error=LeaderCancelled(f"{self.name} request cancelled"))
+            raise
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"calls": 0, "coalesced": 0, "errors": 0}
+
+
+embedding_flight = SingleFlight("embedding")
+vector_query_flight = SingleFlight("vector_query")
+llm_flight = SingleFlight("llm")
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """Upstream calls made and identical calls coalesced, per request kind."""
+    return {flight.name: flight.get_stats() for flight in (embedding_flight, vector_query_flight, llm_flight)}
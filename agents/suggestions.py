@@ -1,46 +1,16 @@
 """
 Utility functions for generating contextual suggestion questions.
 """
-from openai import AzureOpenAI
-from django.conf import settings
+from agents.llm_pool import get_chat_client, TIER_CLASSIFY
 import json
 import logging
+from agents.llm_executor import llm_slot_sync, PRIORITY_BACKGROUND
 
 logger = logging.getLogger(__name__)
 
-# Initialize Azure OpenAI client
-_client = None
-_model = None
-
-
 def _get_openai_client():
-    """Initialize Azure OpenAI client (singleton)"""
-    global _client, _model
-    
-    if _client is not None:
-        return _client, _model
-    
-    api_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-    endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-    api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-    deployment_name = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
-    
-    if not api_key or not endpoint:
-        logger.error("Azure OpenAI credentials not configured in settings")
-        return None, None
-    
-    try:
-        _client = AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=endpoint
-        )
-        _model = deployment_name
-        logger.info(f"Initialized Azure OpenAI client with deployment: {deployment_name}")
-        return _client, _model
-    except Exception as e:
-        logger.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
-        return None, None
+    """Shared Azure OpenAI chat client (deployment pool, see agents.llm_pool) and the classify-tier model"""
+    return get_chat_client(TIER_CLASSIFY)
 
 
 SUGGESTIONS_PROMPT = """You are generating contextual suggestion questions for a chat interface. These are quick-reply buttons that users can click to continue the conversation.
@@ -145,13 +115,14 @@ def generate_suggestions(conversation_messages, last_bot_message=None, max_sugge
         logger.info(f"Generating suggestions based on {len(recent_messages)} recent messages")
         
         # Generate suggestions using LLM
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=256,
-            temperature=0.7
-        )
+        with llm_slot_sync(PRIORITY_BACKGROUND):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                max_tokens=256,
+                temperature=0.7
+            )
         
         result_text = response.choices[0].message.content.strip()
         result_data = json.loads(result_text)
@@ -182,3 +153,27 @@ def generate_suggestions(conversation_messages, last_bot_message=None, max_sugge
         logger.error(f"Error generating suggestions: {str(e)}", exc_info=True)
         return []
 
+
+def classify_suggestion_type(suggestion_text):
+    """
+    Classify a suggestion for MessageSuggestion.suggestion_type based on its content.
+    
+    Returns:
+        'conversion', 'rag_related' or 'contextual'
+    """
+    suggestion_lower = suggestion_text.lower()
+    
+    # Conversion actions
+    if any(phrase in suggestion_lower for phrase in [
+        'connect with', 'get a quote', 'apply for', 'contact', 'speak with', 'call'
+    ]):
+        return 'conversion'
+    
+    # RAG-related questions (domain-specific)
+    if any(phrase in suggestion_lower for phrase in [
+        'tax', 'fbt', 'benefit', 'saving', 'novated', 'lease', 'vehicle', 'ev', 'eligib'
+    ]):
+        return 'rag_related'
+    
+    # Contextual suggestions
+    return 'contextual'
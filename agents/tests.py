@@ -1,3 +1,890 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from openai import RateLimitError
+from django.utils import timezone
+
+from chats.models import ChatMessage, ConversationCheckpoint, Session, Visitor
+from agents.single_flight import SingleFlight
+from agents.session_manager import CHECKPOINT_MAX_MESSAGES, session_manager
+from agents.cassettes import CassetteMiss, REPLAY_INDEX, use_cassette
+from agents.llm_pool import DeploymentConfig, LLMClientPool, aclose_async_clients
+from agents.llm_executor import closing_db_connections, get_llm_limiter_stats, get_shared_executor, submit_shared
+from agents.langgraph_agent_v2.config import DEADLINE_FALLBACK_RESPONSE, DEADLINE_FINALIZE_RESERVE
+from agents.langgraph_agent_v2.deadline import start_deadline, end_deadline, get_current_deadline
+from agents.langgraph_agent_v2.nodes.generation import assemble_generation_prompt, response_generation_node
+from agents.langgraph_agent_v2.integration import ChatAPIIntegration
+from agents.langgraph_agent_v2.nodes.contact import _pattern_contact_intent
+from agents.langgraph_agent_v2.nodes.knowledge import knowledge_retrieval_node
+from agents.langgraph_agent_v2.nodes.reasoning import assess_complexity, reasoning_node
+from agents.langgraph_agent_v2.state import AgentState
+from agents.langgraph_agent_v2.tracing import summarize_traces
+from agents.langgraph_agent_v2.tools.answer_cache import answer_cache
+from agents.langgraph_agent_v2.tools.contact_extraction import (
+    extract_contact_patterns, match_callback_datetime, match_confirmation,
+)
+from agents.langgraph_agent_v2.tools.llm import llm_call_json, llm_memo
+from agents.langgraph_agent_v2.tools.rag import search_with_variations
+from knowledgebase.models import Document
+from knowledgebase.services.embedding_service import embed_batch
+from knowledgebase.services.kb_version import bump_kb_version
+from knowledgebase.services.pinecone_service import query_vectors
+from knowledgebase.services.vector_store import NumpyVectorStore
+
+
+def fake_embedding(text, dimensions=16):
+    """Deterministic unit vector per text (equal texts -> equal vectors)."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    values = [b - 127.5 for b in digest[:dimensions]]
+    norm = sum(v * v for v in values) ** 0.5
+    return [v / norm for v in values]
+
+
+class FakeGraph:
+    """Answers every question from the knowledge base, by name when the user is known."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, state, config=None):
+        self.calls += 1
+        name = state.get("user_name")
+        greeting = f"Great question {name}! " if name else ""
+        return dict(
+            state,
+            final_response=greeting + "A novated lease is a salary packaging arrangement.",
+            question_type="domain_question",
+            used_rag=True,
+        )
+
+
+@mock.patch("agents.langgraph_agent_v2.tools.answer_cache.get_kb_version", lambda: "kb-1")
+@mock.patch("agents.langgraph_agent_v2.tools.answer_cache.embed", fake_embedding)
+class AnswerCachePersonalisationTests(TestCase):
+    def setUp(self):
+        answer_cache.clear()
+        self.graph = FakeGraph()
+        patcher = mock.patch("agents.langgraph_agent_v2.integration.get_graph", return_value=self.graph)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def session(self, name=None):
+        return Session.objects.create(visitor=Visitor.objects.create(name=name))
+
+    def ask(self, session, message):
+        return ChatAPIIntegration.process_message(str(session.id), message)
+
+    def test_answer_for_named_visitor_is_not_served_to_others(self):
+        alice = self.ask(self.session(name="Alice"), "What is a novated lease?")
+        self.assertIn("Alice", alice["message"])
+        self.assertEqual(alice["metadata"]["answer_cache"], "skipped")
+
+        anonymous = self.ask(self.session(), "what is a novated lease")
+        self.assertNotIn("Alice", anonymous["message"])
+        self.assertEqual(anonymous["metadata"]["answer_cache"], "miss")
+        self.assertEqual(self.graph.calls, 2)
+
+    def test_named_visitor_is_not_served_cached_answers(self):
+        self.ask(self.session(), "What is a novated lease?")
+        self.assertEqual(self.ask(self.session(), "what is a novated lease")["metadata"]["answer_cache"], "hit")
+
+        bob = self.ask(self.session(name="Bob"), "what is a novated lease")
+        self.assertEqual(bob["metadata"]["answer_cache"], "skipped")
+        self.assertIn("Bob", bob["message"])
+
+
+
+class TimeoutGraph:
+    async def ainvoke(self, state, config=None):
+        raise TimeoutError("read timed out")
+
+
+class TurnTimeoutTests(TestCase):
+    @mock.patch("agents.langgraph_agent_v2.integration.ENABLE_TURN_DEADLINE", False)
+    @mock.patch("agents.langgraph_agent_v2.integration.get_graph", return_value=TimeoutGraph())
+    def test_timeout_inside_the_graph_without_a_deadline_sends_the_fallback(self, get_graph):
+        session = Session.objects.create(visitor=Visitor.objects.create())
+        result = ChatAPIIntegration.process_message(str(session.id), "Can you compare two EVs for me?")
+        self.assertEqual(result["message"], DEADLINE_FALLBACK_RESPONSE)
+        self.assertNotIn("error", result["metadata"])
+
+
+class CheckpointTruncationTests(TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(visitor=Visitor.objects.create())
+
+    def add_messages(self, count):
+        for index in range(count):
+            ChatMessage.objects.create(session=self.session, role="user" if index % 2 == 0 else "assistant", message=f"m{index}")
+
+    def load(self):
+        session = Session.objects.select_related("checkpoint").get(id=self.session.id)
+        history = async_to_sync(session_manager.aload_history)(session)
+        async_to_sync(session_manager.asave_checkpoint)(session, history)
+        return history
+
+    def test_unsummarized_messages_are_kept(self):
+        self.add_messages(CHECKPOINT_MAX_MESSAGES + 10)
+        history = self.load()
+        self.assertEqual(len(history.messages), CHECKPOINT_MAX_MESSAGES + 10)
+        self.assertEqual(history.messages[0]["content"], "m0")
+
+    def test_only_summarized_messages_are_dropped(self):
+        self.add_messages(CHECKPOINT_MAX_MESSAGES + 10)
+        self.load()
+        ConversationCheckpoint.objects.filter(session=self.session).update(summary="...", summary_message_count=4)
+        self.add_messages(2)
+        history = self.load()
+        self.assertEqual(len(history.messages), CHECKPOINT_MAX_MESSAGES + 8)
+        self.assertEqual(history.messages[0]["content"], "m4")
+
+        ConversationCheckpoint.objects.filter(session=self.session).update(summary_message_count=40)
+        self.add_messages(2)
+        history = self.load()
+        self.assertEqual(len(history.messages), CHECKPOINT_MAX_MESSAGES)
+        self.assertEqual(history.message_count, CHECKPOINT_MAX_MESSAGES + 14)
+
+
+class StallingStream:
+    """Streams a few deltas, then never sends the next chunk."""
+
+    def __init__(self, deltas):
+        self.deltas = list(deltas)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.deltas:
+            await asyncio.sleep(3600)
+        delta = self.deltas.pop(0)
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        self.closed = True
+
+
+class StreamingDeadlineTests(SimpleTestCase):
+    def test_stalled_stream_ends_at_the_finalize_reserve_with_the_partial_answer(self):
+        stream = StallingStream(["A novated lease ", "is a salary packaging arrangement"])
+
+        async def create(**kwargs):
+            return stream
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        tokens = []
+
+        async def generate():
+            token = start_deadline(DEADLINE_FINALIZE_RESERVE + 0.3)
+            try:
+                state = AgentState(session_id="test", messages=[{"role": "user", "content": "What is a novated lease?"}])
+                return await response_generation_node(state, {"configurable": {"on_token": tokens.append}})
+            finally:
+                end_deadline(token)
+
+        with mock.patch("agents.langgraph_agent_v2.tools.llm.get_llm_client", return_value=(client, "gpt-test")):
+            started = time.monotonic()
+            state = async_to_sync(generate)()
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(state.draft_response, "A novated lease is a salary packaging arrangement")
+        self.assertEqual(tokens, ["A novated lease ", "is a salary packaging arrangement"])
+        self.assertTrue(stream.closed)
+        self.assertEqual(get_llm_limiter_stats()["in_flight"], 0)
+
+
+class GenerationPromptTests(SimpleTestCase):
+    def test_prompt_asks_for_no_links(self):
+        # postprocess strips links, so a URL in the streamed answer would make the client rewrite it
+        prompt = assemble_generation_prompt(
+            "What is FBT?",
+            [{"content": "FBT is fringe benefits tax.", "metadata": {"url": "https://example.com/fbt"}}],
+            {}, None, "No previous conversation", "You are WhipSmart's assistant.",
+        )
+        self.assertIn("FBT is fringe benefits tax.", prompt)
+        self.assertNotIn("https://example.com/fbt", prompt)
+        self.assertNotIn("cite sources with URLs", prompt)
+
+
+class CountingStore(NumpyVectorStore):
+    def __init__(self):
+        super().__init__()
+        self.calls = {"query": 0, "query_batch": 0}
+
+    def query(self, *args, **kwargs):
+        self.calls["query"] += 1
+        return super().query(*args, **kwargs)
+
+    def query_batch(self, *args, **kwargs):
+        self.calls["query_batch"] += 1
+        return super().query_batch(*args, **kwargs)
+
+
+CHUNKS = [
+    "A novated lease is a salary packaging arrangement.",
+    "Electric vehicles are exempt from fringe benefits tax.",
+    "WhipSmart services include vehicle search and quotes.",
+    "In NSW, stamp duty applies to vehicle purchases.",
+]
+
+
+@override_settings(KB_EMBEDDING_CACHE_ENABLED=False, KB_HYBRID_SEARCH_ENABLED=False)
+class KnowledgeVariationsTests(TestCase):
+    def setUp(self):
+        self.store = CountingStore()
+        self.store.upsert([
+            {"id": f"chunk-{i}", "values": fake_embedding(text), "metadata": {"text": text, "file_type": "pdf"}}
+            for i, text in enumerate(CHUNKS)
+        ])
+        self.embedding_requests = []
+        for target, value in [
+            ("knowledgebase.services.embedding_service._create_embeddings",
+             lambda texts: self.embedding_requests.append(list(texts)) or [fake_embedding(t) for t in texts]),
+            ("agents.tools.rag_tool.get_vector_store", lambda: self.store),
+            ("agents.langgraph_agent_v2.tools.rag.ENABLE_RAG_QUERY_VARIATIONS_DOMAIN", True),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def retrieve(self, query):
+        state = AgentState(session_id="test", messages=[{"role": "user", "content": query}], question_type="domain_question")
+        return async_to_sync(knowledge_retrieval_node)(state).knowledge_results
+
+    def test_variations_cost_one_embedding_request_and_one_vector_query(self):
+        results = self.retrieve("novated lease tax")
+
+        self.assertEqual(len(self.embedding_requests), 1)
+        self.assertEqual(len(self.embedding_requests[0]), 4)  # base query + 3 variations
+        self.assertEqual(self.store.calls, {"query": 0, "query_batch": 1})
+
+        chunk_ids = [r["metadata"]["chunk_id"] for r in results]
+        self.assertEqual(len(chunk_ids), len(set(chunk_ids)))
+        scores = [r["score"] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_merged_results_keep_the_best_score_per_chunk(self):
+        results = self.retrieve("novated lease tax")
+        variations = self.embedding_requests[0]
+
+        best = {}
+        for vector in [fake_embedding(v) for v in variations]:
+            for match in self.store.query(vector, top_k=3).matches:
+                best[match.id] = max(best.get(match.id, -1.0), match.score)
+        for result in results:
+            self.assertAlmostEqual(result["score"], best[result["metadata"]["chunk_id"]], places=5)
+
+
+class VariationsFallbackTests(SimpleTestCase):
+    def test_fallback_does_not_wait_on_the_pool_it_runs_on(self):
+        searched = []
+        single_worker = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(single_worker.shutdown, wait=False)
+        with mock.patch("agents.langgraph_agent_v2.tools.rag.ENABLE_RAG_QUERY_VARIATIONS_DOMAIN", True), \
+                mock.patch("agents.langgraph_agent_v2.tools.rag.search_knowledge_base_batch", side_effect=RuntimeError("down")), \
+                mock.patch("agents.langgraph_agent_v2.tools.rag.get_shared_executor", return_value=single_worker), \
+                mock.patch("agents.langgraph_agent_v2.tools.rag.search_knowledge_base",
+                           side_effect=lambda query, top_k: searched.append(query) or [
+                               {"content": query, "score": 0.5, "metadata": {"chunk_id": query}}]):
+            results = single_worker.submit(search_with_variations, "novated lease tax", "domain_question").result(timeout=5)
+
+        self.assertEqual(len(searched), 4)
+        self.assertEqual(len(results), 4)
+
+
+class SubmitSharedTests(SimpleTestCase):
+    def test_runs_inline_on_a_pool_thread(self):
+        def fan_out():
+            futures = [submit_shared(threading.get_ident) for _ in range(2)]
+            return threading.get_ident(), [future.result() for future in futures]
+
+        worker, children = get_shared_executor().submit(fan_out).result(timeout=5)
+        self.assertEqual(children, [worker, worker])
+        self.assertNotEqual(submit_shared(threading.get_ident).result(timeout=5), threading.get_ident())
+
+    def test_inline_exceptions_are_set_on_the_future(self):
+        def fan_out():
+            return submit_shared(int, "not a number")
+
+        future = get_shared_executor().submit(fan_out).result(timeout=5)
+        with self.assertRaises(ValueError):
+            future.result()
+
+
+class ClosingDBConnectionsTests(SimpleTestCase):
+    def test_connections_are_closed_after_success_and_failure(self):
+        def fail():
+            raise ValueError("boom")
+
+        with mock.patch("agents.llm_executor.close_old_connections") as close:
+            self.assertEqual(closing_db_connections(lambda x: x * 2)(21), 42)
+            with self.assertRaises(ValueError):
+                closing_db_connections(fail)()
+        self.assertEqual(close.call_count, 2)
+
+
+class FakeChatClient:
+    """Async chat client that answers every request with `content` and counts the requests."""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))], usage=None)
+
+
+class LLMMemoTests(TransactionTestCase):
+    # The knowledge base version is read on the shared executor, outside the test transaction
+    def setUp(self):
+        cache.clear()
+        llm_memo.clear()
+        self.client = FakeChatClient('{"complete": true}')
+        patcher = mock.patch("agents.langgraph_agent_v2.tools.llm.get_llm_client", return_value=(self.client, "gpt-test"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, prompt="Is the answer complete?", cache=True):
+        return async_to_sync(llm_call_json)(prompt, system_prompt="Validate.", temperature=0.0, cache=cache)
+
+    def test_repeated_call_is_served_from_the_memo(self):
+        self.assertEqual(self.call(), {"complete": True})
+        self.assertEqual(self.call(), {"complete": True})
+        self.assertEqual(len(self.client.requests), 1)
+        self.assertEqual(llm_memo.get_stats()["hits"], 1)
+
+    def test_different_inputs_and_opted_out_calls_miss(self):
+        self.call()
+        self.call(prompt="Is this other answer complete?")
+        self.call(cache=False)
+        self.assertEqual(len(self.client.requests), 3)
+
+    def test_malformed_json_is_not_memoized(self):
+        self.client.content = "not json"
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.call()
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_knowledge_base_change_invalidates_entries(self):
+        self.call()
+        user = get_user_model().objects.create(username="memo")
+        Document.objects.create(
+            title="FAQ", file_url="http://example.com/faq.pdf", file_type="pdf", state="live",
+            vectorized_at=timezone.now(), uploaded_by=user
+        )
+        bump_kb_version()
+
+        self.call()
+        self.assertEqual(len(self.client.requests), 2)
+        self.call()
+        self.assertEqual(len(self.client.requests), 2)
+
+
+class FakeAzureServer:
+    """
+    Local HTTP server speaking the Azure OpenAI chat completions API.
+    `responses[deployment]` is a list of (status, headers) returned in turn (the last one repeats).
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                deployment = self.path.split("/deployments/")[1].split("/")[0]
+                server.requests.append(deployment)
+                queue = server.responses[deployment]
+                status, headers = queue.pop(0) if len(queue) > 1 else queue[0]
+                if status == 200 and request.get("stream"):
+                    return self.stream(deployment)
+                body = {"error": {"code": "429", "message": "Rate limit exceeded"}} if status == 429 else {
+                    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": deployment,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": f"from {deployment}"}, "finish_reason": "stop"}],
+                }
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def stream(self, deployment):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in ["from ", deployment]:
+                    chunk = {
+                        "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": deployment,
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LLMClientPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeAzureServer()
+        self.addCleanup(self.server.close)
+
+    def pool(self, *deployments, **kwargs):
+        configs = [
+            DeploymentConfig(name=name, endpoint=self.server.endpoint, api_key="test", deployment=name, model="gpt-test")
+            for name in deployments
+        ]
+        return LLMClientPool(configs, **kwargs)
+
+    def create(self, pool):
+        return pool.create(model="gpt-test", messages=[{"role": "user", "content": "hi"}]).choices[0].message.content
+
+    def test_rate_limited_request_fails_over_and_deployment_cools_down(self):
+        self.server.responses = {"busy": [(429, {"retry-after": "5"})], "spare": [(200, {})]}
+        pool = self.pool("busy", "spare")
+
+        self.assertEqual(self.create(pool), "from spare")
+        self.assertEqual(self.create(pool), "from spare")
+        # The cooling deployment is not retried before its retry-after
+        self.assertEqual(self.server.requests, ["busy", "spare", "spare"])
+
+        stats = pool.get_stats()
+        self.assertEqual(stats["failovers"], 1)
+        self.assertEqual(stats["deployments"]["busy"]["rate_limited"], 1)
+        self.assertGreaterEqual(stats["deployments"]["busy"]["cooling_down_ms"], 4000)
+
+    def test_single_deployment_waits_for_retry_after(self):
+        self.server.responses = {"only": [(429, {"retry-after-ms": "200"}), (200, {})]}
+        pool = self.pool("only")
+
+        started = time.monotonic()
+        self.assertEqual(self.create(pool), "from only")
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(self.server.requests, ["only", "only"])
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.responses = {"a": [(429, {"retry-after-ms": "10"})], "b": [(429, {"retry-after-ms": "10"})]}
+        pool = self.pool("a", "b", max_attempts=3)
+
+        with self.assertRaises(RateLimitError):
+            self.create(pool)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(pool.get_stats()["exhausted"], 1)
+
+    def test_routes_to_the_deployment_with_most_budget_left(self):
+        self.server.responses = {
+            "low": [(200, {"x-ratelimit-remaining-requests": "5", "x-ratelimit-limit-requests": "100"})],
+            "high": [(200, {"x-ratelimit-remaining-requests": "90", "x-ratelimit-limit-requests": "100"})],
+        }
+        pool = self.pool("low", "high")
+        self.create(pool)
+        self.create(pool)
+        del self.server.requests[:]
+
+        for _ in range(3):
+            self.create(pool)
+        self.assertEqual(self.server.requests, ["high"] * 3)
+
+    def test_async_requests_fail_over(self):
+        self.server.responses = {"busy": [(429, {"retry-after": "5"})], "spare": [(200, {})]}
+        pool = self.pool("busy", "spare")
+
+        async def create():
+            response = await pool.acreate(model="gpt-test", messages=[{"role": "user", "content": "hi"}])
+            return response.choices[0].message.content
+
+        self.assertEqual(async_to_sync(create)(), "from spare")
+        self.assertEqual(self.server.requests, ["busy", "spare"])
+
+    def test_async_clients_are_closed_with_their_loop(self):
+        self.server.responses = {"only": [(200, {})]}
+        pool = self.pool("only")
+        deployment = pool.deployments[0]
+
+        async def create_and_close():
+            await pool.acreate(model="gpt-test", messages=[{"role": "user", "content": "hi"}])
+            client = deployment.async_client()
+            with mock.patch("agents.llm_pool._pool", pool):
+                await aclose_async_clients()
+            return client
+
+        client = async_to_sync(create_and_close)()
+        self.assertTrue(client.is_closed())
+        self.assertEqual(len(deployment._async_clients), 0)
+
+
+class FakeEmbeddingClient:
+    def __init__(self):
+        self.requests = []
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    def create(self, model, input):
+        self.requests.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=fake_embedding(text)) for text in input])
+
+
+class CassetteTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeAzureServer()
+        self.server.responses = {"gpt-test": [(200, {})]}
+        self.pool = LLMClientPool([
+            DeploymentConfig(name="gpt-test", endpoint=self.server.endpoint, api_key="test", deployment="gpt-test", model="gpt-test")
+        ])
+        self.addCleanup(self.server.close)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "calls.jsonl")
+
+    def complete(self, prompt="What is a novated lease?", **kwargs):
+        response = self.pool.create(model="gpt-test", messages=[{"role": "user", "content": prompt}], **kwargs)
+        return response.choices[0].message.content
+
+    def stream(self):
+        async def consume():
+            stream = await self.pool.acreate(model="gpt-test", messages=[{"role": "user", "content": "hi"}], stream=True)
+            return "".join([chunk.choices[0].delta.content async for chunk in stream if chunk.choices])
+        return async_to_sync(consume)()
+
+    def test_llm_calls_replay_without_the_network(self):
+        with use_cassette(self.path, "record"):
+            recorded = [self.complete(), self.stream()]
+        self.server.close()
+
+        with use_cassette(self.path, "replay", latency=0) as cassette:
+            self.assertEqual([self.complete(), self.stream()], recorded)
+            self.assertEqual(cassette.get_stats()["llm"]["exact"], 2)
+
+            # A changed prompt gets the recorded response of the same shape
+            self.assertEqual(self.complete(prompt="What is a novated lease exactly?"), recorded[0])
+            self.assertEqual(cassette.get_stats()["llm"]["loose"], 1)
+
+            with self.assertRaises(CassetteMiss):
+                self.complete(response_format={"type": "json_object"})
+        self.assertEqual(self.server.requests, ["gpt-test", "gpt-test"])
+
+    def test_embeddings_and_vector_queries_replay_without_the_network(self):
+        self.server.close()
+        client = FakeEmbeddingClient()
+        store = NumpyVectorStore()
+        store.upsert([{"id": f"chunk-{i}", "values": fake_embedding(text), "metadata": {"text": text}} for i, text in enumerate(CHUNKS)])
+
+        with mock.patch("knowledgebase.services.embedding_service._get_embedding_client", return_value=(client, "emb", "azure")):
+            with use_cassette(self.path, "record"):
+                vectors = embed_batch(["novated lease", "stamp duty"])
+                matches = query_vectors(store, vectors[0], top_k=2).matches
+
+            with use_cassette(self.path, "replay", latency=0) as cassette:
+                self.assertEqual(embed_batch(["novated lease", "stamp duty"]), vectors)
+                replayed = query_vectors(REPLAY_INDEX, vectors[0], top_k=2).matches
+                stats = cassette.get_stats()
+
+        self.assertEqual(len(client.requests), 1)
+        self.assertEqual([(m.id, m.score, m.metadata) for m in replayed], [(m.id, m.score, m.metadata) for m in matches])
+        self.assertEqual((stats["embedding"]["exact"], stats["vector_query"]["exact"]), (1, 1))
+
+
+class ContactPatternTests(SimpleTestCase):
+    """Pattern tier of contact extraction: (message, expected_field) -> fields the LLM is skipped for."""
+    THRESHOLD = 0.8
+
+    def confident(self, message, expected_field=None):
+        matched = extract_contact_patterns(message, expected_field)
+        if matched["confidence"] < self.THRESHOLD:
+            return None
+        return {key: matched[key] for key in ("name", "email", "phone") if matched[key]}
+
+    def check(self, cases):
+        for message, expected_field, expected in cases:
+            with self.subTest(message=message, expected_field=expected_field):
+                self.assertEqual(self.confident(message, expected_field), expected)
+
+    def test_au_phone_numbers(self):
+        self.check([
+            ("0411 372 823", "phone", {"phone": "0411 372 823"}),
+            ("0411372823", None, {"phone": "0411372823"}),
+            ("+61 411 372 823", None, {"phone": "+61 411 372 823"}),
+            ("+61 2 9876 5432", None, {"phone": "+61 2 9876 5432"}),
+            ("(02) 9876 5432", "phone", {"phone": "(02) 9876 5432"}),
+            ("1300 123 456", None, {"phone": "1300 123 456"}),
+            ("1800-123-456", None, {"phone": "1800-123-456"}),
+            ("+1 415 555 1234", None, None),  # not an AU pattern
+            ("0411 372 823 or 0422 111 222", "phone", None),  # two numbers
+        ])
+
+    def test_emails(self):
+        self.check([
+            ("sam@example.com.au", "email", {"email": "sam@example.com.au"}),
+            ("email is jo.b+ev@mail.co", "email", {"email": "jo.b+ev@mail.co"}),
+            ("my old email was a@b.com but use c@d.com instead", None, None),
+            ("sam at example dot com", "email", None),
+        ])
+
+    def test_name_intros(self):
+        self.check([
+            ("my name is Sarah and my email is sarah@x.com", None, {"name": "Sarah", "email": "sarah@x.com"}),
+            ("call me Dave", None, {"name": "Dave"}),
+            ("John", "name", {"name": "John"}),
+            ("I'm Dave", "name", {"name": "Dave"}),
+            ("Tom, 0411372823", None, {"name": "Tom", "phone": "0411372823"}),
+            # A weak intro is only a name when the user was asked for one
+            ("I'm Dave", None, None),
+            ("This is Wrong", None, {}),
+            ("It's Incorrect", None, {}),
+            ("I'm Confused", None, {}),
+            ("I am Employed full time", "name", None),
+            ("I'm Self employed", "name", None),
+            ("I'm Confused", "name", None),
+            ("I'm interested in an EV", None, {}),
+        ])
+
+    def test_no_name_from_patterns_at_confirmation(self):
+        for message in ("This is Wrong", "It's Incorrect", "I'm Confused", "my name is Noah"):
+            with self.subTest(message=message):
+                state = AgentState(session_id="s", step="confirmation")
+                self.assertIsNone(_pattern_contact_intent(message, state))
+
+        state = AgentState(session_id="s", step="confirmation")
+        self.assertEqual(_pattern_contact_intent("change email to new@x.com", state)["updates"], {"email": "new@x.com"})
+        self.assertTrue(_pattern_contact_intent("Looks good!", state)["confirmed"])
+
+    def test_match_confirmation(self):
+        for message, expected in [
+            ("yes", 0.95), ("Ok done!", 0.95), ("looks good.", 0.95), ("That's correct", 0.95),
+            ("yes but change my email", 0.0), ("no", 0.0), ("what happens next?", 0.0),
+        ]:
+            with self.subTest(message=message):
+                self.assertEqual(match_confirmation(message), expected)
+
+    def test_match_callback_datetime(self):
+        for message, intent, preferred, timezone, confidence in [
+            ("Tomorrow 3pm", "provide_datetime", "Tomorrow 3pm", None, 0.95),
+            ("Friday 10:30am", "provide_datetime", "Friday 10:30am", None, 0.95),
+            ("18 Mar at 2pm AEST", "provide_datetime", "18 Mar at 2pm", "AEST", 0.95),
+            ("next Tuesday morning Sydney time", "provide_datetime", "next Tuesday morning", "Sydney time", 0.95),
+            ("after 5pm tomorrow is fine", "provide_datetime", "after 5pm tomorrow", None, 0.95),
+            ("Monday or Tuesday 3pm", "provide_datetime", "Monday or Tuesday 3pm", None, 0.6),
+            ("Friday", "ask_clarify", None, None, 0.95),
+            ("3pm", "ask_clarify", None, None, 0.95),
+            ("anytime", "decline", None, None, 0.9),
+            ("whatever, what's the FBT exemption?", "unclear", None, None, 0.0),
+        ]:
+            with self.subTest(message=message):
+                result = match_callback_datetime(message)
+                self.assertEqual(
+                    (result["intent"], result["preferred_datetime"], result["timezone"], result["confidence"]),
+                    (intent, preferred, timezone, confidence),
+                )
+
+
+class SingleFlightTests(SimpleTestCase):
+    FOLLOWERS = 4
+
+    def setUp(self):
+        self.flight = SingleFlight("test")
+        self.release = threading.Event()
+        self.calls = []
+
+    def wait_for_followers(self):
+        deadline = time.monotonic() + 5
+        while self.flight.get_stats()["coalesced"] < self.FOLLOWERS:
+            self.assertLess(time.monotonic(), deadline, "followers did not join")
+            time.sleep(0.005)
+        self.release.set()
+
+    def run_threads(self, target):
+        """Start the leader, then the followers once the leader's call is in flight."""
+        results, errors = [], []
+
+        def run():
+            try:
+                results.append(target())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run)]
+        threads[0].start()
+        while not self.calls:
+            time.sleep(0.001)
+        threads += [threading.Thread(target=run) for _ in range(self.FOLLOWERS)]
+        for thread in threads[1:]:
+            thread.start()
+        self.wait_for_followers()
+        for thread in threads:
+            thread.join(timeout=5)
+        return results, errors
+
+    def blocking_call(self, value):
+        self.calls.append(value)
+        self.release.wait(timeout=5)
+        return {"value": value}
+
+    async def async_call(self, value):
+        self.calls.append(value)
+        while not self.release.is_set():
+            await asyncio.sleep(0.001)
+        return {"value": value}
+
+    def test_concurrent_threads_share_one_call(self):
+        results, errors = self.run_threads(lambda: self.flight.do("key", self.blocking_call, 1))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(len(results), self.FOLLOWERS + 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.flight.get_stats(), {"calls": 1, "coalesced": self.FOLLOWERS, "errors": 0, "in_flight": 0})
+
+    def test_coroutines_on_separate_event_loops_share_one_call(self):
+        # Every thread runs its own event loop
+        results, errors = self.run_threads(lambda: asyncio.run(self.flight.ado("key", self.async_call, 1)))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(len(results), self.FOLLOWERS + 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.flight.get_stats()["in_flight"], 0)
+
+    def test_leader_error_reaches_followers_and_the_call_is_cleared(self):
+        def failing_call():
+            self.blocking_call(1)
+            raise ValueError("upstream down")
+
+        results, errors = self.run_threads(lambda: self.flight.do("key", failing_call))
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), self.FOLLOWERS + 1)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+        stats = self.flight.get_stats()
+        self.assertEqual((stats["errors"], stats["in_flight"]), (1, 0))
+
+        # Nothing is cached: the next identical call goes upstream again
+        self.assertEqual(self.flight.do("key", self.blocking_call, 2), {"value": 2})
+        self.assertEqual(self.calls, [1, 2])
+
+
+class SummarizeTracesTests(SimpleTestCase):
+    def trace(self, total_ms, *spans):
+        return {"total_ms": total_ms, "nodes": [dict(node=node, wall_ms=wall_ms, **extra) for node, wall_ms, extra in spans]}
+
+    def test_percentiles_per_stage(self):
+        traces = [
+            self.trace(float(total), ("knowledge", float(total) / 10, {}), ("generate", float(total) / 2, {"llm_calls": 1}))
+            for total in range(100, 2100, 100)  # 20 turns
+        ]
+        summary = summarize_traces(traces + [None, {"nodes": []}])
+
+        self.assertEqual(summary["turns"], 20)
+        self.assertEqual(summary["total_ms"], {"p50": 1000.0, "p95": 1900.0})
+        self.assertEqual(
+            {name: (node["count"], node["p50_ms"], node["p95_ms"]) for name, node in summary["nodes"].items()},
+            {"knowledge": (20, 100.0, 190.0), "generate": (20, 500.0, 950.0)},
+        )
+        self.assertEqual(summary["nodes"]["generate"]["avg_llm_calls"], 1.0)
+
+    def test_repeated_stage_counts_as_the_sum_of_its_runs(self):
+        summary = summarize_traces([self.trace(
+            90.0,
+            ("generate", 30.0, {"llm_calls": 1, "cache_hits": 0}),
+            ("validate", 10.0, {"llm_calls": 2, "cache_hits": 1}),
+            ("generate", 40.0, {"llm_calls": 1, "cache_hits": 0}),
+        )])
+
+        self.assertEqual(summary["nodes"]["generate"]["count"], 1)
+        self.assertEqual(summary["nodes"]["generate"]["p50_ms"], 70.0)
+        self.assertEqual(summary["nodes"]["generate"]["avg_llm_calls"], 2.0)
+        self.assertEqual(summary["nodes"]["validate"]["cache_hit_rate"], 0.5)
+
+    def test_no_traces(self):
+        self.assertEqual(summarize_traces([]), {"turns": 0, "total_ms": {"p50": None, "p95": None}, "nodes": {}})
+
+
+class ReasoningGateTests(SimpleTestCase):
+    SIMPLE = "What is FBT?"
+    MEDIUM = "What are the tax benefits of a novated lease?"
+    COMPLEX = "Compare the pros and cons of a novated lease versus a car loan"
+    RAG = [{"content": "...", "score": 0.8}]
+
+    def setUp(self):
+        self.prompts = []
+
+        async def fake_llm_call_json(prompt, **kwargs):
+            self.prompts.append(prompt)
+            return {}
+
+        patcher = mock.patch("agents.langgraph_agent_v2.nodes.reasoning.llm_call_json", fake_llm_call_json)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reason(self, question, question_type="domain_question", budget=None):
+        async def run():
+            token = start_deadline(budget) if budget is not None else None
+            try:
+                state = AgentState(
+                    session_id="test", messages=[{"role": "user", "content": question}],
+                    question_type=question_type, rag_context=list(self.RAG),
+                )
+                state = await reasoning_node(state)
+                skipped = [skip["stage"] for skip in get_current_deadline().skipped] if token else []
+                return state.reasoning_output["path"], len(self.prompts), skipped
+            finally:
+                if token:
+                    end_deadline(token)
+
+        return async_to_sync(run)()
+
+    def test_complexity_paths(self):
+        for question, question_type, rag, path in [
+            (self.SIMPLE, "domain_question", [{"score": 0.92}], "none"),  # one strong hit: simple lookup
+            ("hello there", "greeting", self.RAG, "none"),
+            (self.MEDIUM, "domain_question", [], "none"),  # nothing to organise
+            (self.MEDIUM, "domain_question", self.RAG, "combined"),
+            ("What services do you offer?", "service_discovery", self.RAG, "combined"),
+            (self.COMPLEX, "domain_question", self.RAG, "full"),
+        ]:
+            with self.subTest(question=question, question_type=question_type):
+                self.assertEqual(assess_complexity(question, question_type, rag)[0], path)
+
+    def test_llm_calls_per_path(self):
+        self.assertEqual(self.reason("hello there", "greeting"), ("none", 0, []))
+        self.assertEqual(self.reason(self.MEDIUM), ("combined", 1, []))
+        del self.prompts[:]
+        self.assertEqual(self.reason(self.COMPLEX), ("full", 3, []))
+
+    def test_deadline_downgrades_the_path(self):
+        # Enough time for the combined call but not the fan-out
+        self.assertEqual(self.reason(self.COMPLEX, budget=16), ("combined", 1, ["reasoning_fanout"]))
+        del self.prompts[:]
+        # Not enough for either
+        self.assertEqual(self.reason(self.COMPLEX, budget=10), ("none", 0, ["reasoning_fanout", "reasoning"]))
+        self.assertEqual(self.reason(self.MEDIUM, budget=10), ("none", 0, ["reasoning"]))
+        # A full budget changes nothing
+        self.assertEqual(self.reason(self.COMPLEX, budget=30), ("full", 3, []))
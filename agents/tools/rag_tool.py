@@ -2,14 +2,49 @@
 RAG tool for searching documents using Pinecone.
 Integrates with Django's knowledgebase services.
 """
+from typing import List, Dict, Any
 from agents.state import AgentState
-from knowledgebase.services.embedding_service import embed
-from knowledgebase.services.pinecone_service import get_pinecone_index, query_vectors
+from knowledgebase.services.embedding_service import embed, embed_queries
+from knowledgebase.services.pinecone_service import query_vectors, query_vectors_batch
+from knowledgebase.services.vector_store import get_vector_store
+from knowledgebase.services.lexical_index import lexical_index, hybrid_matches
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def format_match(match) -> Dict[str, Any]:
+    """Vector store match -> RAG result dict (text, url, score, chunk and document fields)."""
+    metadata = match.metadata or {}
+    
+    # Only include primary URL if document type is 'url', not for file-based documents
+    file_type = metadata.get("file_type", "")
+    url_value = ""
+    
+    if file_type == "url":
+        # For URL documents, include the URL
+        url_value = metadata.get("url") or ""
+    
+    return {
+        # Use text directly from Pinecone metadata instead of hitting the database
+        # Limit to 2000 characters to avoid excessively long context
+        "text": metadata.get("text", "")[:2000],
+        "url": url_value,  # Only URLs for URL document type
+        "score": float(match.score) if hasattr(match, 'score') else 0.0,
+        "chunk_index": metadata.get("chunk_index", 0),
+        "document_id": metadata.get("document_id", ""),
+        "document_title": metadata.get("document_title", ""),
+        "file_type": file_type,  # Include file type for reference
+        "chunk_id": getattr(match, "id", None),  # Pinecone vector ID, if available
+        # Optional reference URL (e.g., PDF Q&A chunks with a source page)
+        "reference_url": metadata.get("reference_url") or "",
+        # Hybrid search: fused rank score, and whether `score` is a real cosine similarity
+        "rrf_score": metadata.get("rrf_score"),
+        "lexical_only": bool(metadata.get("lexical_only")),
+    }
+
+
 def rag_tool_node(state, top_k: int = 3) -> AgentState:
     """
     RAG tool node: searches WhipSmart documents using Pinecone vector search.
@@ -46,68 +81,46 @@ def rag_tool_node(state, top_k: int = 3) -> AgentState:
         query_vector = embed(query)
         logger.info(f"[OK] Embedding generated (dimension: {len(query_vector)})")
         
-        # Get Pinecone index (already initialized at startup)
-        index = get_pinecone_index()
+        # Get vector store (VECTOR_STORE_BACKEND; Pinecone is initialized at startup)
+        index = get_vector_store()
         if not index:
-            logger.error("[ERROR] Pinecone index not available")
+            logger.error("[ERROR] Vector store not available")
             state.tool_result = {
                 "action": "rag",
                 "query": query,
                 "results": [],
-                "error": "Pinecone index not available"
+                "error": "Vector store not available"
             }
             logger.info("=" * 80)
             return state.to_dict() if hasattr(state, 'to_dict') else state
         
-        # Query Pinecone (index already initialized at startup)
-        logger.info(f"[SEARCH] Querying Pinecone with top_k={top_k}...")
+        # Query Pinecone (index already initialized at startup); hybrid search fuses a wider candidate set
+        hybrid = lexical_index.enabled()
+        candidates = max(top_k, getattr(settings, 'KB_HYBRID_CANDIDATES', 10)) if hybrid else top_k
+        logger.info(f"[SEARCH] Querying Pinecone with top_k={candidates}...")
         results = query_vectors(
             index=index,
             query_vector=query_vector,
-            top_k=top_k,
+            top_k=candidates,
             include_metadata=True
         )
+        matches = list(getattr(results, 'matches', None) or [])
+        if hybrid:
+            # Exact-term hits (FBT, ECM, amounts, names) from the BM25 index, fused by rank
+            matches = hybrid_matches(query, matches, top_k, query_vector=query_vector)
 
         # Format results and fetch full chunk text from database
         docs = []
-        if results and hasattr(results, 'matches'):
-            logger.info(f"[STATS] Found {len(results.matches)} matches from Pinecone")
+        if matches:
+            logger.info(f"[STATS] Found {len(matches)} matches from Pinecone")
 
             retrieved_chunk_ids = []
 
-            for i, match in enumerate(results.matches, 1):
-                metadata = match.metadata or {}
-                document_id = metadata.get("document_id", "")
-                chunk_index = metadata.get("chunk_index", 0)
-                chunk_id = getattr(match, "id", None)
-                
-                # Use text directly from Pinecone metadata instead of hitting the database
-                # Limit to 2000 characters to avoid excessively long context
-                full_text = metadata.get("text", "")[:2000]
-                
-                # Only include primary URL if document type is 'url', not for file-based documents
-                file_type = metadata.get("file_type", "")
-                url_value = ""
-                
-                if file_type == "url":
-                    # For URL documents, include the URL
-                    url_value = metadata.get("url") or ""
-
-                # Optional reference URL (e.g., PDF Q&A chunks with a source page)
-                reference_url = metadata.get("reference_url") or ""
-                retrieved_chunk_ids.append(chunk_id or f"{document_id}-chunk-{chunk_index}")
-
-                doc = {
-                    "text": full_text,  # Use full text from DB or metadata
-                    "url": url_value,  # Only URLs for URL document type
-                    "score": float(match.score) if hasattr(match, 'score') else 0.0,
-                    "chunk_index": chunk_index,
-                    "document_id": document_id,
-                    "document_title": metadata.get("document_title", ""),
-                    "file_type": file_type,  # Include file type for reference
-                    "chunk_id": chunk_id,  # Pinecone vector ID, if available
-                    "reference_url": reference_url,  # Optional source/reference URL for this chunk
-                }
+            for i, match in enumerate(matches, 1):
+                doc = format_match(match)
+                document_id = doc["document_id"]
+                chunk_index = doc["chunk_index"]
+                retrieved_chunk_ids.append(doc["chunk_id"] or f"{document_id}-chunk-{chunk_index}")
                 docs.append(doc)
                 
                 # Improved logging with more context
@@ -149,3 +162,34 @@ def rag_tool_node(state, top_k: int = 3) -> AgentState:
         }
         return state.to_dict() if hasattr(state, 'to_dict') else state
 
+
+def search_batch(queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+    """
+    Search several queries (e.g. variations of one question) as one batch: one embeddings
+    request and one batched vector store query, then hybrid fusion per query.
+    
+    Returns:
+        One list of result dicts (same format as rag_tool_node) per query
+    """
+    if not queries:
+        return []
+    
+    query_vectors = embed_queries(queries)
+    index = get_vector_store()
+    if not index:
+        logger.error("[ERROR] Vector store not available")
+        return [[] for _ in queries]
+    
+    hybrid = lexical_index.enabled()
+    candidates = max(top_k, getattr(settings, 'KB_HYBRID_CANDIDATES', 10)) if hybrid else top_k
+    responses = query_vectors_batch(index, query_vectors, top_k=candidates, include_metadata=True)
+    
+    batch = []
+    for query, query_vector, response in zip(queries, query_vectors, responses):
+        matches = list(getattr(response, 'matches', None) or [])
+        if hybrid:
+            matches = hybrid_matches(query, matches, top_k, query_vector=query_vector)
+        batch.append([format_match(match) for match in matches[:top_k]])
+    
+    logger.info(f"[RAG] Batch of {len(queries)} queries | Results per query: {[len(docs) for docs in batch]}")
+    return batch
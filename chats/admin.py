@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Session, ChatMessage, Visitor, MessageSuggestion
+from .models import Session, ChatMessage, Visitor, MessageSuggestion, ConversationCheckpoint
 
 
 @admin.register(Visitor)
@@ -58,6 +58,21 @@ class ChatMessageAdmin(admin.ModelAdmin):
     def suggestion_count(self, obj):
         return obj.suggestions.count()
     suggestion_count.short_description = 'Suggestions'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            # Edited history - the agent rebuilds the checkpoint on the next turn
+            ConversationCheckpoint.objects.filter(session_id=obj.session_id).delete()
+
+
+@admin.register(ConversationCheckpoint)
+class ConversationCheckpointAdmin(admin.ModelAdmin):
+    """Admin interface for ConversationCheckpoint model."""
+    list_display = ['session', 'message_count', 'last_message_at', 'updated_at']
+    search_fields = ['session__id']
+    readonly_fields = ['session', 'messages', 'last_message_at', 'last_message_ids', 'message_count', 'updated_at']
+    date_hierarchy = 'updated_at'
 
 
 @admin.register(MessageSuggestion)
@@ -5,6 +5,7 @@ import json
 import logging
 import asyncio
 import random
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
@@ -32,7 +33,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     All messages follow a consistent schema:
     {
-        "type": "chunk" | "complete" | "idle_warning" | "team_connection_offer" | "session_end" | "error" | "connected",
+        "type": "chunk" | "complete" | "suggestions" | "correction" | "idle_warning" | "team_connection_offer" | "session_end" | "error" | "connected",
         "session_id": "uuid",
         "message_id": "uuid" | null,  // User message ID
         "response_id": "uuid" | null,  // Assistant message ID
@@ -57,7 +58,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Format a standardized WebSocket message.
         
         Args:
-            message_type: One of 'chunk', 'complete', 'idle_warning', 'team_connection_offer', 'session_end', 'error', 'connected'
+            message_type: One of 'chunk', 'complete', 'suggestions', 'correction', 'idle_warning', 'team_connection_offer', 'session_end', 'error', 'connected'
             **kwargs: Additional fields to include in the message
         
         Returns:
@@ -308,6 +309,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "visitor_id": "uuid"
         }
         """
+        # The agent's response deadline counts from here
+        received_at = time.monotonic()
+        
         # Update shared idle timer on any message and restart monitoring
         if self.session_id and self.visitor_id:
             connection_key = (self.session_id, self.visitor_id)
@@ -338,7 +342,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message_type = data.get('type')
             
             if message_type == 'chat_message':
-                await self.handle_chat_message(data)
+                await self.handle_chat_message(data, received_at=received_at)
             elif message_type == 'pong' or message_type == 'ping':
                 # Handle ping/pong for keepalive
                 pass
@@ -351,7 +355,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"[WEBSOCKET] Error receiving message: {str(e)}", exc_info=True)
             await self.send_error("An error occurred while processing your request")
     
-    async def handle_chat_message(self, data):
+    async def handle_chat_message(self, data, received_at=None):
         """Handle chat message and stream response."""
         message = data.get('message')
         session_id = data.get('session_id')
@@ -398,7 +402,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             user_message = await self.get_last_user_message(session_id)
             
             # Process message and stream response
-            await self.process_and_stream_response(session, message, user_message_obj=user_message)
+            await self.process_and_stream_response(session, message, user_message_obj=user_message, received_at=received_at)
             
             # Update shared idle timer after processing message and restart monitoring
             if self.session_id and self.visitor_id:
@@ -504,7 +508,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         return await database_sync_to_async(_get_message)()
     
-    async def process_and_stream_response(self, session, user_message_text, user_message_obj):
+    async def process_and_stream_response(self, session, user_message_text, user_message_obj, received_at=None):
         """Process message using LangGraph agent and stream response."""
         try:
             # Determine which agent to use based on settings
@@ -513,13 +517,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             
             logger.info(f"[WEBSOCKET] Agent selection - V2: {use_agent_v2}, LangGraph: {use_langgraph}")
             
+            message_id = str(user_message_obj.id) if user_message_obj else None
+            streamed_text = ""
+            
             if use_agent_v2:
-                # Use new LangGraph Agent V2
+                # Use new LangGraph Agent V2 - tokens are forwarded as the model produces them
                 logger.info("[WEBSOCKET] ===== USING LANGGRAPH AGENT V2 =====")
                 from agents.langgraph_agent_v2.integration import ChatAPIIntegration
-                result = await database_sync_to_async(ChatAPIIntegration.process_message)(
+                result, streamed_text = await self.run_with_token_streaming(
+                    ChatAPIIntegration.aprocess_message,
                     str(session.id),
-                    user_message_text
+                    user_message_text,
+                    message_id=message_id,
+                    defer_validation=True,  # validated after sending; corrections pushed as 'correction'
+                    defer_suggestions=True,  # generated after sending; pushed as 'suggestions'
+                    received_at=received_at
                 )
             elif use_langgraph:
                 # Use LangGraph agent V1
@@ -542,34 +554,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
             followup_type = result.get('followup_type', '')  # 'name_request', 'team_connection', 'explore_more', or ''
             followup_message = result.get('followup_message', '')
             
-            # Stream the response preserving ALL formatting (newlines \n, markdown **, spaces, etc.)
-            # Stream character-by-character in small chunks to preserve exact formatting
-            full_response = ""
-            chunk_buffer = ""
-            chunk_size = 10  # Send chunks of 10 characters for balance between smoothness and efficiency
-            
-            for i, char in enumerate(assistant_message_text):
-                full_response += char
-                chunk_buffer += char
-                
-                # Send chunk when buffer reaches chunk_size or at end of message
-                if len(chunk_buffer) >= chunk_size or i == len(assistant_message_text) - 1:
-                    if chunk_buffer:  # Only send if buffer has content
-                        chunk_message = self.format_message(
-                            'chunk',
-                            message_id=str(user_message_obj.id) if user_message_obj else None,
-                            chunk=chunk_buffer,
-                            done=False
-                        )
-                        await self.send(text_data=json.dumps(chunk_message))
-                        chunk_buffer = ""
-                        # Small delay for streaming effect
-                        await asyncio.sleep(0.02)  # Small delay for character-by-character streaming
+            # Responses that were not generated token-by-token (contact flow, V1, UnifiedAgent)
+            # are sent as chunks right away, preserving ALL formatting (newlines, markdown, spaces)
+            if not streamed_text:
+                await self.send_text_chunks(assistant_message_text, message_id=message_id)
             
             # Send final chunk with done flag
             final_chunk_message = self.format_message(
                 'chunk',
-                message_id=str(user_message_obj.id) if user_message_obj else None,
+                message_id=message_id,
                 chunk='',
                 done=True
             )
@@ -631,8 +624,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                         # Session is still active, keep monitoring even if complete=true
                         logger.info(f"[WEBSOCKET] Session still active - idle monitoring continues (complete={is_complete})")
             
-            # Get suggestions from result
+            # Get suggestions from result (V2 generates them after the answer is sent - see suggestion_job)
             suggestions = result.get('suggestions', [])
+            suggestion_job = result.get('suggestion_job')
             
             # Safety check: Block suggestions ONLY when actively collecting info or asking to connect
             # Don't block just because needs_info is set - only block when we're actually in the process
@@ -650,21 +644,36 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 followup_type in ['request_info', 'ask_to_connect', 'name_request', 'team_connection'] or
                 (needs_info and step in ['name', 'email', 'phone'])):
                 suggestions = []
-            
-            # Send final response with standardized schema
+                suggestion_job = None
+            
+            # Send final response with standardized schema.
+            # `message` is authoritative: post-processing (link stripping, validation retries)
+            # can make it differ from the streamed tokens, which the client should then replace.
+            complete_metadata = dict(result.get('metadata') or {})
+            if not getattr(settings, 'AGENT_V2_TRACE_DEBUG', False):
+                # Timings are saved on the message; only sent to clients when debugging
+                complete_metadata.pop('trace', None)
+            if streamed_text:
+                complete_metadata['streamed'] = True
+                complete_metadata['stream_replaced'] = streamed_text.strip() != assistant_message_text.strip()
             complete_message = self.format_message(
                 'complete',
-                message_id=str(user_message_obj.id) if user_message_obj else None,
+                message_id=message_id,
                 response_id=str(assistant_message.id) if assistant_message else None,
                 message=assistant_message_text.strip(),
                 conversation_data=session.conversation_data,
                 complete=is_complete,
                 needs_info=result.get('needs_info'),
                 suggestions=suggestions,
-                metadata=result.get('metadata', {})
+                metadata=complete_metadata
             )
             await self.send(text_data=json.dumps(complete_message))
             
+            # V2 suggestions are generated now that the answer is out and pushed as 'suggestions'
+            suggestion_task = None
+            if suggestion_job and assistant_message:
+                suggestion_task = self.start_background_suggestions(suggestion_job, str(assistant_message.id), message_id)
+            
             # Handle follow-up message (only ONE type per response)
             if followup_type and followup_message:
                 # Save follow-up message as a separate message
@@ -683,32 +692,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 
                 await database_sync_to_async(update_session_for_followup)()
                 
-                # Stream the follow-up message character-by-character (same as main message)
-                followup_chunk_buffer = ""
-                chunk_size = 10  # Same chunk size as main message
-                
-                for i, char in enumerate(followup_message):
-                    followup_chunk_buffer += char
-                    
-                    # Send chunk when buffer reaches chunk_size or at end of message
-                    if len(followup_chunk_buffer) >= chunk_size or i == len(followup_message) - 1:
-                        if followup_chunk_buffer:  # Only send if buffer has content
-                            followup_chunk_message = self.format_message(
-                                'chunk',
-                                message_id=str(user_message_obj.id) if user_message_obj else None,
-                                chunk=followup_chunk_buffer,
-                                done=False,
-                                metadata={'type': followup_type}
-                            )
-                            await self.send(text_data=json.dumps(followup_chunk_message))
-                            followup_chunk_buffer = ""
-                            # Small delay for streaming effect
-                            await asyncio.sleep(0.02)  # Small delay for character-by-character streaming
+                # Send the follow-up message as chunks (same frame schema as main message)
+                await self.send_text_chunks(
+                    followup_message,
+                    message_id=message_id,
+                    metadata={'type': followup_type}
+                )
                 
                 # Send final chunk with done flag for follow-up message
                 followup_final_chunk_message = self.format_message(
                     'chunk',
-                    message_id=str(user_message_obj.id) if user_message_obj else None,
+                    message_id=message_id,
                     chunk='',
                     done=True,
                     metadata={'type': followup_type}
@@ -718,7 +712,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 # Send complete message for follow-up (no suggestions for followup messages)
                 followup_complete = self.format_message(
                     'complete',
-                    message_id=str(user_message_obj.id) if user_message_obj else None,
+                    message_id=message_id,
                     response_id=str(followup_message_obj.id),
                     message=followup_message,
                     complete=False,
@@ -729,6 +723,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 
                 logger.info(f"[FOLLOWUP] Streamed {followup_type} message as separate message via WebSocket: {followup_message[:50]}...")
             
+            # V2 answers that were sent before validation are checked now, off the critical path
+            validation_job = result.get('validation_job')
+            if validation_job and assistant_message:
+                self.start_background_validation(validation_job, str(assistant_message.id), message_id, after=suggestion_task)
+            
             logger.info("=" * 80)
             logger.info(f"[WEBSOCKET] Response streamed and saved successfully")
             logger.info(f"[WEBSOCKET] Complete: {is_complete}, Needs Info: {result.get('needs_info')}")
@@ -739,6 +738,109 @@ class ChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"[WEBSOCKET] Error processing response: {str(e)}", exc_info=True)
             await self.send_error("An error occurred while generating the response")
     
+    async def run_with_token_streaming(self, aprocess_message, session_id, user_message_text, message_id=None, **kwargs):
+        """
+        Run an async agent call on the event loop and forward generated tokens
+        to the client as 'chunk' messages while the call is still running.
+        
+        Returns:
+            tuple: (agent result dict, text that was streamed to the client)
+        """
+        streamed_parts = []
+        
+        async def on_token(token):
+            streamed_parts.append(token)
+            chunk_message = self.format_message(
+                'chunk',
+                message_id=message_id,
+                chunk=token,
+                done=False
+            )
+            await self.send(text_data=json.dumps(chunk_message))
+        
+        result = await aprocess_message(session_id, user_message_text, on_token=on_token, **kwargs)
+        return result, "".join(streamed_parts)
+    
+    def start_background_suggestions(self, suggestion_job, response_id, message_id=None):
+        """
+        Generate the suggestions of an already-sent answer in the background. They are saved
+        as MessageSuggestion rows and pushed as a 'suggestions' message for `response_id`.
+        
+        Returns:
+            asyncio.Task: the background task
+        """
+        from agents.langgraph_agent_v2.background_suggestions import generate_in_background
+        
+        async def send_suggestions(suggestions):
+            suggestions_message = self.format_message(
+                'suggestions',
+                message_id=message_id,
+                response_id=response_id,
+                suggestions=suggestions
+            )
+            try:
+                await self.send(text_data=json.dumps(suggestions_message))
+                logger.info(f"[WEBSOCKET] Sent {len(suggestions)} suggestions for response {response_id}")
+            except Exception as e:
+                # Client may have disconnected - the suggestions are already saved
+                logger.warning(f"[WEBSOCKET] Could not send suggestions for response {response_id}: {str(e)}")
+        
+        return self._track_background_task(
+            generate_in_background(response_id, suggestion_job, on_suggestions=send_suggestions)
+        )
+    
+    def start_background_validation(self, validation_job, response_id, message_id=None, after=None):
+        """
+        Validate an already-sent answer in the background. The verdict is saved on the
+        ChatMessage; if the answer had to be corrected, a 'correction' message replaces it.
+        Starts once the `after` task (background suggestions, which also update the
+        message metadata) has finished.
+        """
+        from agents.langgraph_agent_v2.background_validation import validate_in_background
+        
+        async def send_correction(corrected_text):
+            correction_message = self.format_message(
+                'correction',
+                message_id=message_id,
+                response_id=response_id,
+                message=corrected_text,
+                metadata={'reason': 'fact_check'}
+            )
+            try:
+                await self.send(text_data=json.dumps(correction_message))
+                logger.info(f"[WEBSOCKET] Sent correction for response {response_id}")
+            except Exception as e:
+                # Client may have disconnected - the corrected text is already saved
+                logger.warning(f"[WEBSOCKET] Could not send correction for response {response_id}: {str(e)}")
+        
+        async def validate():
+            if after:
+                await asyncio.wait([after])
+            await validate_in_background(response_id, validation_job, on_correction=send_correction)
+        
+        return self._track_background_task(validate())
+    
+    def _track_background_task(self, coro):
+        task = asyncio.create_task(coro)
+        # Keep a reference so the task is not garbage collected before it finishes
+        if not hasattr(self, 'background_tasks'):
+            self.background_tasks = set()
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+    
+    async def send_text_chunks(self, text, message_id=None, metadata=None, chunk_size=10):
+        """Send already-complete text as 'chunk' messages (no artificial delay)."""
+        for i in range(0, len(text), chunk_size):
+            chunk_kwargs = {
+                'message_id': message_id,
+                'chunk': text[i:i + chunk_size],
+                'done': False,
+            }
+            if metadata:
+                chunk_kwargs['metadata'] = metadata
+            await self.send(text_data=json.dumps(self.format_message('chunk', **chunk_kwargs)))
+    
     async def get_last_assistant_message(self, session_id):
         """Get last assistant message asynchronously."""
         def _get_message():
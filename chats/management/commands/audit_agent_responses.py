@@ -0,0 +1,74 @@
+"""
+Django management command to audit stored agent answers offline.
+
+Runs the same fact / completeness / tone checks as Agent V2 validation over saved
+assistant messages and prints a summary (optionally saving each verdict on the
+message metadata).
+
+Usage:
+    python manage.py audit_agent_responses --days 7 --limit 200
+    python manage.py audit_agent_responses --session <session_id> --save
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from chats.models import ChatMessage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Audit stored agent answers with the V2 validation checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=str, help='Only audit messages of this session ID')
+        parser.add_argument('--days', type=int, default=7, help='Audit messages from the last N days (default: 7)')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum number of messages to audit (default: 100)')
+        parser.add_argument(
+            '--only-unvalidated',
+            action='store_true',
+            help='Skip messages that already have a validation verdict',
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Save each verdict on the message metadata',
+        )
+
+    def handle(self, *args, **options):
+        from agents.langgraph_agent_v2.background_validation import audit_messages
+
+        messages = ChatMessage.objects.filter(
+            role='assistant',
+            is_deleted=False,
+            timestamp__gte=timezone.now() - timedelta(days=options['days'])
+        ).exclude(
+            metadata__has_key='type'  # follow-up messages (team connection offers etc.)
+        ).order_by('-timestamp')
+
+        if options['session']:
+            messages = messages.filter(session_id=options['session'])
+
+        messages = list(messages[:options['limit']])
+        if options['only_unvalidated']:
+            messages = [
+                m for m in messages
+                if (m.metadata or {}).get('validation', {}).get('status') in (None, 'pending')
+            ]
+
+        self.stdout.write(f'Auditing {len(messages)} assistant messages...')
+
+        report = async_to_sync(audit_messages)(messages, save=options['save'])
+
+        counts = {}
+        for entry in report:
+            status = entry['verdict'].get('status', 'error')
+            counts[status] = counts.get(status, 0) + 1
+            if status != 'passed':
+                issues = entry['verdict'].get('issues') or entry['verdict'].get('error') or []
+                self.stdout.write(self.style.WARNING(f"  {entry['message_id']}: {status} {issues}"))
+
+        summary = ', '.join(f'{status}: {count}' for status, count in sorted(counts.items())) or 'nothing to audit'
+        self.stdout.write(self.style.SUCCESS(f'Audit complete - {summary}'))
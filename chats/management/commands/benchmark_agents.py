@@ -0,0 +1,133 @@
+"""
+Django management command to benchmark the agent pipelines offline.
+
+Replays a corpus of conversations through Agent V2, the V1 LangGraph agent and the
+UnifiedAgent and prints per-turn latency, LLM calls / tokens, embedding and Pinecone
+calls (plus per-node timings for V2). With `--mode record` the LLM, embedding and
+Pinecone calls are made for real and saved to the cassette; with `--mode replay`
+they are answered from the cassette (no network), so runs are reproducible.
+
+Usage:
+    python manage.py benchmark_agents --from-db --days 7 --limit 20 --cassette bench.jsonl --mode record
+    python manage.py benchmark_agents --from-db --days 7 --limit 20 --cassette bench.jsonl --mode replay
+    python manage.py benchmark_agents --corpus corpus.json --cassette bench.jsonl --mode replay --latency 0 --agents v2
+    python manage.py benchmark_agents --from-log logs/agent.log --agents v2,v1 --output report.json
+"""
+import json
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
+from agents.benchmark import AGENTS, load_corpus_file, load_corpus_from_log, load_corpus_from_db, run_benchmark
+from agents.cassettes import use_cassette, MODE_RECORD, MODE_REPLAY
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the agent pipelines over a corpus of conversations (optionally with an LLM cassette)'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--corpus', type=str, help='JSON file: list of conversations (lists of user messages)')
+        source.add_argument('--from-log', type=str, help='Application log to extract user messages from ("[MSG] User Message")')
+        source.add_argument('--from-db', action='store_true', help='Use the user messages of recent sessions')
+        parser.add_argument('--days', type=int, default=7, help='With --from-db: sessions from the last N days (default: 7)')
+        parser.add_argument('--limit', type=int, default=20, help='Maximum number of conversations (default: 20)')
+        parser.add_argument(
+            '--agents',
+            type=str,
+            default=','.join(AGENTS),
+            help=f'Comma-separated agents to run (default: {",".join(AGENTS)})',
+        )
+        parser.add_argument('--cassette', type=str, help='Cassette file (JSON Lines) to record to / replay from')
+        parser.add_argument(
+            '--mode',
+            choices=[MODE_RECORD, MODE_REPLAY],
+            default=MODE_REPLAY,
+            help='Record real calls or replay them from the cassette (default: replay)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=str,
+            default='recorded',
+            help='Replay latency: "recorded" or a fixed number of milliseconds per call (default: recorded)',
+        )
+        parser.add_argument('--output', type=str, help='Also write the full report as JSON to this file')
+        parser.add_argument(
+            '--keep-sessions',
+            action='store_true',
+            help='Keep the benchmark sessions and messages instead of deleting them',
+        )
+
+    def handle(self, *args, **options):
+        agents = [a.strip() for a in options['agents'].split(',') if a.strip()]
+        unknown = [a for a in agents if a not in AGENTS]
+        if unknown:
+            raise CommandError(f'Unknown agents: {", ".join(unknown)} (choose from {", ".join(AGENTS)})')
+
+        if options['corpus']:
+            conversations = load_corpus_file(options['corpus'])
+        elif options['from_log']:
+            conversations = load_corpus_from_log(options['from_log'])
+        else:
+            conversations = load_corpus_from_db(days=options['days'], limit=options['limit'])
+        conversations = conversations[:options['limit']]
+        if not conversations:
+            raise CommandError('The corpus has no conversations')
+
+        latency = options['latency']
+        if latency != 'recorded':
+            try:
+                latency = float(latency)
+            except ValueError:
+                raise CommandError('--latency must be "recorded" or a number of milliseconds')
+
+        if options['cassette']:
+            cassette = use_cassette(options['cassette'], options['mode'], latency)
+            self.stdout.write(f"Cassette: {options['mode']} {options['cassette']}")
+        else:
+            cassette = nullcontext()
+            self.stdout.write(self.style.WARNING('No cassette: calls go to the live services and call counts are not collected'))
+
+        self.stdout.write(
+            f"Running {sum(len(c) for c in conversations)} messages in {len(conversations)} conversations "
+            f"through: {', '.join(agents)}"
+        )
+        with cassette:
+            report = run_benchmark(conversations, agents, keep_sessions=options['keep_sessions'])
+
+        for agent_report in report['agents']:
+            self._write_agent_report(agent_report)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _write_agent_report(self, report):
+        agent = report['agent']
+        if 'turns' not in report:
+            self.stdout.write(self.style.ERROR(f'[{agent}] unavailable: {report["error"]}'))
+            return
+
+        latency = report['latency_ms']
+        per_turn = report['per_turn']
+        self.stdout.write(self.style.SUCCESS(
+            f"[{agent}] {report['turns']} turns, {report['errors']} errors - "
+            f"p50 {latency['p50']}ms, p95 {latency['p95']}ms, mean {latency['mean']}ms"
+        ))
+        self.stdout.write(
+            f"  per turn: {per_turn['llm_calls']} LLM calls, "
+            f"{per_turn['prompt_tokens']} prompt / {per_turn['completion_tokens']} completion tokens, "
+            f"{per_turn['embeddings']} embeddings, {per_turn['vector_queries']} vector queries"
+        )
+        cassette = report['cassette']
+        if cassette['misses'] or cassette['loose_matches']:
+            self.stdout.write(self.style.WARNING(
+                f"  cassette: {cassette['misses']} misses, {cassette['loose_matches']} loose matches"
+            ))
+        for name, node in (report.get('nodes') or {}).items():
+            self.stdout.write(
+                f"  {name:<24} p50 {node['p50_ms']:>8}ms  p95 {node['p95_ms']:>8}ms  "
+                f"llm {node['avg_llm_calls']}  tokens {node['avg_prompt_tokens']}/{node['avg_completion_tokens']}"
+            )
@@ -0,0 +1,91 @@
+"""
+Django management command to compare the vector store backends.
+
+Runs the shared conformance checks and a recall / latency benchmark against each
+backend (knowledgebase/services/vector_store_benchmark.py). The local and SQLite
+backends use a fresh in-memory store and a temporary file, so the default run needs no
+network. Pinecone is only benchmarked when listed; its test vectors ("bench-" IDs) are
+written to the configured index and deleted afterwards.
+
+Usage:
+    python manage.py benchmark_vector_stores
+    python manage.py benchmark_vector_stores --vectors 5000 --dimensions 1536 --queries 500
+    python manage.py benchmark_vector_stores --backends local,sqlite,pinecone --settle 20
+    python manage.py benchmark_vector_stores --from-db --output stores.json
+"""
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from knowledgebase.services.vector_store import BACKENDS, NumpyVectorStore, SQLiteVectorStore, pinecone_vector_store
+from knowledgebase.services.vector_store_benchmark import check_conformance, benchmark_store, make_dataset, dataset_from_chunks
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the conformance checks and a recall / latency benchmark against the vector store backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', type=str, default='local,sqlite', help='Comma-separated backends (default: local,sqlite)')
+        parser.add_argument('--vectors', type=int, default=3000, help='Synthetic dataset size (default: 3000)')
+        parser.add_argument('--dimensions', type=int, default=1536, help='Synthetic vector dimensions (default: 1536)')
+        parser.add_argument('--queries', type=int, default=200, help='Number of queries (default: 200)')
+        parser.add_argument('--top-k', type=int, default=5, help='Results per query (default: 5)')
+        parser.add_argument('--from-db', action='store_true', help='Use the stored chunk embeddings instead of synthetic vectors')
+        parser.add_argument('--settle', type=float, default=15.0, help='Seconds to wait for remote stores to become consistent (default: 15)')
+        parser.add_argument('--output', type=str, help='Also write the full report as JSON to this file')
+
+    def handle(self, *args, **options):
+        backends = [b.strip() for b in options['backends'].split(',') if b.strip()]
+        unknown = [b for b in backends if b not in BACKENDS]
+        if unknown:
+            raise CommandError(f'Unknown backends: {", ".join(unknown)} (choose from {", ".join(BACKENDS)})')
+
+        try:
+            if options['from_db']:
+                dataset = dataset_from_chunks(options['queries'])
+            else:
+                dataset = make_dataset(options['vectors'], options['dimensions'], options['queries'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        report = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for backend in backends:
+                if backend == 'local':
+                    store, settle = NumpyVectorStore(), 0.0
+                elif backend == 'sqlite':
+                    store, settle = SQLiteVectorStore(os.path.join(tmp, 'vectors.sqlite3')), 0.0
+                else:
+                    if not pinecone_vector_store.available():
+                        self.stderr.write(self.style.ERROR("Pinecone index not available - skipped"))
+                        continue
+                    store, settle = pinecone_vector_store, options['settle']
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{backend}"))
+                checks = check_conformance(store, settle=settle)
+                for check in checks:
+                    style = self.style.SUCCESS if check['passed'] else self.style.ERROR
+                    self.stdout.write(f"  {style('PASS' if check['passed'] else 'FAIL')} {check['check']} {check['detail']}")
+
+                result = benchmark_store(store, dataset, top_k=options['top_k'], settle=settle)
+                recall = f"recall@{options['top_k']}"
+                self.stdout.write(
+                    f"  {result['vectors']} x {result['dimensions']}: upsert {result.get('upsert_s')}s, "
+                    f"{recall} {result.get(recall)}, "
+                    f"p50 {result.get('p50_ms')}ms, p95 {result.get('p95_ms')}ms, "
+                    f"filtered p95 {result.get('filtered_p95_ms')}ms"
+                    + (f" ({result['error']})" if result.get('error') else "")
+                )
+                report.append({"backend": backend, "conformance": checks, "benchmark": result})
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        failed = [r['backend'] for r in report if not all(c['passed'] for c in r['conformance'])]
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Conformance failures: {', '.join(failed)}"))
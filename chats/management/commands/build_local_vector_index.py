@@ -0,0 +1,74 @@
+"""
+Django management command to backfill the chunk embeddings of the local vector index.
+
+Documents vectorized before DocumentChunk.embedding existed have no stored vectors, so
+the local replica of the Pinecone index stays incomplete and queries keep going to
+Pinecone. This copies their vectors from Pinecone (or re-embeds the chunk text with
+--reembed) and then loads the replica to report its size.
+
+Usage:
+    python manage.py build_local_vector_index
+    python manage.py build_local_vector_index --document <document_id> --reembed
+"""
+from django.core.management.base import BaseCommand
+from knowledgebase.models import DocumentChunk
+from knowledgebase.services.embedding_service import embed_batch
+from knowledgebase.services.local_vector_index import local_vector_index
+from knowledgebase.services.vector_store import pinecone_vector_store, to_bytes
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = 'Store the embeddings of vectorized chunks for the local vector index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--document', type=str, help='Only this document ID (default: all live documents)')
+        parser.add_argument(
+            '--reembed',
+            action='store_true',
+            help='Embed the chunk text again instead of fetching the vectors from Pinecone',
+        )
+
+    def handle(self, *args, **options):
+        chunks = DocumentChunk.objects.filter(
+            document__state='live', is_vectorized=True, embedding__isnull=True
+        ).order_by('document_id', 'chunk_index')
+        if options['document']:
+            chunks = chunks.filter(document_id=options['document'])
+        chunks = list(chunks)
+
+        if not options['reembed'] and not pinecone_vector_store.available():
+            self.stderr.write(self.style.ERROR("Pinecone index not available (use --reembed)"))
+            return
+
+        stored, missing = 0, 0
+        for i in range(0, len(chunks), BATCH_SIZE):
+            batch = chunks[i:i + BATCH_SIZE]
+            if options['reembed']:
+                values = embed_batch([chunk.text for chunk in batch], batch_size=BATCH_SIZE)
+            else:
+                fetched = pinecone_vector_store.fetch(ids=[chunk.vector_id or chunk.chunk_id for chunk in batch])
+                values = [fetched.get(chunk.vector_id or chunk.chunk_id, {}).get('values') for chunk in batch]
+
+            updated = []
+            for chunk, vector in zip(batch, values):
+                if vector is None:
+                    missing += 1
+                    continue
+                chunk.embedding = to_bytes(vector)
+                updated.append(chunk)
+            DocumentChunk.objects.bulk_update(updated, ['embedding'])
+            stored += len(updated)
+            self.stdout.write(f"{stored}/{len(chunks)} chunk embeddings stored")
+
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} chunks not found in Pinecone (re-vectorize them or use --reembed)"))
+
+        local_vector_index.load()
+        stats = local_vector_index.get_stats()
+        message = f"Local vector index: {stats['vectors']} vectors ({'complete' if stats['complete'] else 'incomplete'})"
+        self.stdout.write(self.style.SUCCESS(message) if stats['complete'] else self.style.WARNING(message))
@@ -0,0 +1,42 @@
+"""
+Django management command to build the suggestion bank of the knowledge base.
+
+Generates the follow-up questions of each chunk of the live documents (normally done in
+the background when a document is vectorized). Use it to backfill documents vectorized
+before the suggestion bank existed, or with --force after a prompt change.
+
+Usage:
+    python manage.py build_suggestion_bank
+    python manage.py build_suggestion_bank --document <document_id> --force
+"""
+from django.core.management.base import BaseCommand
+from knowledgebase.models import Document
+from knowledgebase.services.suggestion_bank import build_suggestion_bank
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Precompute the follow-up questions (suggestion bank) of knowledge base chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--document', type=str, help='Only this document ID (default: all live documents)')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate chunks that already have related questions',
+        )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.filter(state='live').order_by('title')
+        if options['document']:
+            documents = Document.objects.filter(id=options['document'])
+
+        total = 0
+        for document in documents:
+            updated = build_suggestion_bank(document, force=options['force'])
+            total += updated
+            self.stdout.write(f"{document.title}: {updated} chunks updated")
+
+        self.stdout.write(self.style.SUCCESS(f"Suggestion bank: {total} chunks updated"))
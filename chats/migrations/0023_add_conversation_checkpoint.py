@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0022_add_session_questions_asked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationCheckpoint',
+            fields=[
+                ('session', models.OneToOneField(help_text='The session this checkpoint belongs to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='checkpoint', serialize=False, to='chats.session')),
+                ('messages', models.JSONField(blank=True, default=list, help_text='Conversation history [{role, content}] up to the watermark')),
+                ('last_message_at', models.DateTimeField(blank=True, help_text='Timestamp of the newest message included (watermark)', null=True)),
+                ('last_message_ids', models.JSONField(blank=True, default=list, help_text='IDs of the included messages sharing the watermark timestamp')),
+                ('message_count', models.PositiveIntegerField(default=0, help_text='Total number of messages folded into the checkpoint')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Conversation Checkpoint',
+                'verbose_name_plural': 'Conversation Checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0023_add_conversation_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationcheckpoint',
+            name='summary',
+            field=models.TextField(blank=True, default='', help_text="Rolling summary of the messages older than the agent's verbatim history window"),
+        ),
+        migrations.AddField(
+            model_name='conversationcheckpoint',
+            name='summary_message_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of session messages covered by the summary'),
+        ),
+    ]
@@ -230,3 +230,54 @@ class MessageSuggestion(models.Model):
             self.is_clicked = True
             self.clicked_at = timezone.now()
             self.save(update_fields=['is_clicked', 'clicked_at'])
+
+
+class ConversationCheckpoint(models.Model):
+    """
+    Persisted agent conversation state for a session (Agent V2).
+    Holds the message history up to a watermark so a turn only reads the messages
+    saved since the last checkpoint instead of the whole session.
+    """
+    session = models.OneToOneField(
+        Session,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='checkpoint',
+        help_text="The session this checkpoint belongs to"
+    )
+    messages = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Conversation history [{role, content}] up to the watermark"
+    )
+    last_message_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Timestamp of the newest message included (watermark)"
+    )
+    last_message_ids = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="IDs of the included messages sharing the watermark timestamp"
+    )
+    message_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Total number of messages folded into the checkpoint"
+    )
+    summary = models.TextField(
+        blank=True,
+        default='',
+        help_text="Rolling summary of the messages older than the agent's verbatim history window"
+    )
+    summary_message_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of session messages covered by the summary"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Conversation Checkpoint"
+        verbose_name_plural = "Conversation Checkpoints"
+    
+    def __str__(self):
+        return f"Checkpoint for {self.session_id} ({self.message_count} messages)"
@@ -1,3 +1,42 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from chats.models import ChatMessage, Session, Visitor
+
+
+def make_trace(total_ms, **nodes):
+    return {"total_ms": total_ms, "nodes": [{"node": name, "wall_ms": wall_ms} for name, wall_ms in nodes.items()]}
+
+
+class AgentMetricsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        session = Session.objects.create(visitor=Visitor.objects.create())
+        for total_ms, generate_ms in [(100.0, 60.0), (300.0, 200.0)]:
+            ChatMessage.objects.create(
+                session=session, role="assistant", message="answer",
+                metadata={"trace": make_trace(total_ms, generate=generate_ms)}
+            )
+        ChatMessage.objects.create(session=session, role="assistant", message="no trace", metadata={})
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse("agent-metrics"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_summarizes_stored_traces(self):
+        self.client.force_authenticate(get_user_model().objects.create(username="admin"))
+        response = self.client.get(reverse("agent-metrics"), {"hours": 1})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["window_hours"], 1)
+        self.assertEqual(data["turns"], 2)
+        self.assertEqual(data["total_ms"], {"p50": 100.0, "p95": 300.0})
+        self.assertEqual((data["nodes"]["generate"]["p50_ms"], data["nodes"]["generate"]["p95_ms"]), (60.0, 200.0))
+        self.assertIn("llm_limiter", data["process"])
+
+    def test_rejects_non_integer_window(self):
+        self.client.force_authenticate(get_user_model().objects.create(username="admin"))
+        self.assertEqual(self.client.get(reverse("agent-metrics"), {"hours": "day"}).status_code, 400)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from core.router import NoFormatSuffixRouter
-from .views import ChatMessageViewSet, SessionViewSet, VisitorViewSet
+from .views import ChatMessageViewSet, SessionViewSet, VisitorViewSet, AgentMetricsView
 
 router = NoFormatSuffixRouter()
 router.register(r'visitors', VisitorViewSet, basename='visitor')
@@ -8,5 +8,6 @@ router.register(r'sessions', SessionViewSet, basename='session')
 router.register(r'messages', ChatMessageViewSet, basename='message')
 
 urlpatterns = [
+    path('agent-metrics/', AgentMetricsView.as_view(), name='agent-metrics'),
     path('', include(router.urls)),
 ]
@@ -1,18 +1,21 @@
 from rest_framework import viewsets, filters, status, views
 from rest_framework.decorators import action, authentication_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from django.http import StreamingHttpResponse, Http404
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.conf import settings
 from django.db.models import Q
+from datetime import timedelta
 import json
 import logging
+import time
 from .models import ChatMessage, Session, Visitor
 from .serializers import ChatMessageSerializer, SessionSerializer, ChatRequestSerializer, VisitorSerializer
 from agents.graph import get_graph
@@ -580,10 +583,16 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
         serializer.save()
         # Message is automatically saved to database (permanent storage)
     
+    def perform_update(self, serializer):
+        """Edited messages invalidate the session's conversation checkpoint."""
+        instance = serializer.save()
+        session_manager.invalidate_checkpoint(instance.session_id)
+    
     def perform_destroy(self, instance):
         """Soft delete instead of hard delete."""
         instance.is_deleted = True
         instance.save()
+        session_manager.invalidate_checkpoint(instance.session_id)
     
     @extend_schema(
         summary="Non-streaming chat (STEP 3)",
@@ -596,7 +605,8 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                     'response': {'type': 'string', 'description': 'Assistant response'},
                     'session_id': {'type': 'string'},
                     'message_id': {'type': 'string'},
-                    'response_id': {'type': 'string'}
+                    'response_id': {'type': 'string'},
+                    'suggestions_pending': {'type': 'boolean', 'description': 'Suggestions are still being generated; fetch them via GET /api/chats/messages/suggestions?response_id=...'}
                 }
             },
             400: {'description': 'Bad request - message, session_id, or visitor_id missing'},
@@ -616,6 +626,8 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
         visitor_id and session_id are REQUIRED. Session ID must be valid, active, and not expired.
         Visitor ID must match the session's visitor.
         """
+        # The agent's response deadline counts from here
+        received_at = time.monotonic()
         message = request.data.get('message')
         session_id = request.data.get('session_id')
         visitor_id = request.data.get('visitor_id')
@@ -674,7 +686,11 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                 # Use new LangGraph Agent V2
                 logger.info("[REST_API] ===== USING LANGGRAPH AGENT V2 =====")
                 from agents.langgraph_agent_v2.integration import ChatAPIIntegration
-                result = ChatAPIIntegration.process_message(str(session.id), message)
+                # Suggestions are generated after the response; clients fetch them with
+                # GET /api/chats/messages/suggestions?response_id=...
+                result = ChatAPIIntegration.process_message(
+                    str(session.id), message, defer_suggestions=True, received_at=received_at
+                )
             elif use_langgraph:
                 # Use LangGraph agent V1
                 logger.info("[REST_API] Using LangGraph Agent V1")
@@ -716,6 +732,11 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                 is_deleted=False
             ).order_by('-timestamp').first()
             
+            suggestion_job = result.get('suggestion_job')
+            if suggestion_job and assistant_message:
+                from agents.langgraph_agent_v2.background_suggestions import submit_in_background
+                submit_in_background(str(assistant_message.id), suggestion_job)
+            
             # Handle follow-up message (only ONE type per response)
             followup_message_id = None
             followup_message_text = None
@@ -752,6 +773,8 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                 'complete': result.get('complete', False),
                 'needs_info': result.get('needs_info'),
                 'suggestions': result.get('suggestions', []),
+                # True: fetch the suggestions with GET /api/chats/messages/suggestions?response_id=...
+                'suggestions_pending': bool(suggestion_job and assistant_message),
                 # Expose knowledge base results (includes "source" URLs) for frontend UI
                 'knowledge_results': result.get('knowledge_results', []),
                 'message_id': str(user_message.id) if user_message else None,
@@ -962,7 +985,7 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
     
     @extend_schema(
         summary="Get contextual suggestion questions",
-        description="Get contextually relevant suggestion questions based on conversation history. These are quick-reply suggestions that users can click to continue the conversation. Returns empty array if no suggestions available. No authentication required.",
+        description="Get contextually relevant suggestion questions based on conversation history. These are quick-reply suggestions that users can click to continue the conversation. Returns empty array if no suggestions available. With response_id, returns the suggestions saved for that assistant response (generated after a chat response with suggestions_pending=true); poll while status is 'pending'. No authentication required.",
         parameters=[
             OpenApiParameter(
                 name='session_id',
@@ -978,6 +1001,13 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                 required=False,
                 description='Visitor ID for validation (optional)'
             ),
+            OpenApiParameter(
+                name='response_id',
+                type=OpenApiTypes.UUID,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Assistant message ID: return the suggestions saved for this response instead of generating new ones (optional)'
+            ),
         ],
         responses={
             200: {
@@ -993,13 +1023,15 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                                 'description': 'Array of suggestion questions (empty if none available)'
                             },
                             'session_id': {'type': 'string'},
-                            'message_count': {'type': 'integer'}
+                            'message_count': {'type': 'integer'},
+                            'response_id': {'type': 'string', 'description': 'Only with response_id'},
+                            'status': {'type': 'string', 'description': "Only with response_id: 'pending', 'ready', 'error' or 'none'"}
                         }
                     }
                 }
             },
             400: {'description': 'Bad request - session_id missing'},
-            404: {'description': 'Not found - session does not exist'}
+            404: {'description': 'Not found - session or response does not exist'}
         },
         tags=['Messages'],
     )
@@ -1013,9 +1045,11 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
         Query Parameters:
         - session_id (required): Session ID to get suggestions for
         - visitor_id (optional): Visitor ID for validation
+        - response_id (optional): Assistant message ID to fetch the saved suggestions of
         
         Returns:
         - suggestions: Array of suggestion strings (empty array if none available)
+        - status (with response_id): 'pending' while they are still being generated
         """
         session_id = request.query_params.get('session_id')
         
@@ -1046,6 +1080,34 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                     status_code=status.HTTP_400_BAD_REQUEST
                 )
         
+        response_id = request.query_params.get('response_id')
+        if response_id:
+            # Follow-up fetch for a chat response whose suggestions were generated afterwards
+            try:
+                assistant_message = ChatMessage.objects.get(
+                    id=response_id,
+                    session=session,
+                    role='assistant',
+                    is_deleted=False
+                )
+            except (ChatMessage.DoesNotExist, ValueError, ValidationError):
+                return error_response(
+                    f"Response with ID '{response_id}' does not exist in this session",
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+            
+            from agents.langgraph_agent_v2.background_suggestions import get_message_suggestions
+            saved = get_message_suggestions(assistant_message)
+            return success_response(
+                {
+                    'suggestions': saved['suggestions'],
+                    'status': saved['status'],
+                    'session_id': str(session_id),
+                    'response_id': str(assistant_message.id)
+                },
+                message=f"{len(saved['suggestions'])} suggestion(s) ({saved['status']})"
+            )
+        
         try:
             # Get conversation messages for this session
             messages = ChatMessage.objects.filter(
@@ -1281,3 +1343,77 @@ class ChatMessageViewSet(StandardizedResponseMixin, viewsets.ModelViewSet):
                 "Failed to get suggestion analytics",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+@extend_schema(
+    summary="Get agent latency metrics",
+    description=(
+        "Per-node latency of Agent V2 chat turns (p50/p95 wall time, LLM queue wait, "
+        "tokens and cache hit rate) aggregated from the traces saved on assistant messages, "
+        "plus live LLM limiter and cache counters of this worker process."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name='hours',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description='Time window in hours (default: 24, max: 720)'
+        ),
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description='Maximum number of most recent turns to aggregate (default: 5000)'
+        ),
+    ],
+    tags=['Messages'],
+)
+class AgentMetricsView(views.APIView):
+    """
+    Admin view for Agent V2 per-node latency (p50/p95) over a time window.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        from agents.llm_executor import get_llm_limiter_stats
+        from agents.llm_pool import get_llm_pool_stats
+        from agents.single_flight import get_single_flight_stats
+        from knowledgebase.services.embedding_cache import get_embedding_cache_stats
+        from knowledgebase.services.local_vector_index import local_vector_index
+        from knowledgebase.services.lexical_index import lexical_index
+        from agents.langgraph_agent_v2.tracing import summarize_traces
+        from agents.langgraph_agent_v2.tools import get_llm_cache_stats
+        from agents.langgraph_agent_v2.tools.answer_cache import answer_cache
+        
+        try:
+            hours = min(max(int(request.query_params.get('hours', 24)), 1), 720)
+            limit = min(max(int(request.query_params.get('limit', 5000)), 1), 50000)
+        except ValueError:
+            return error_response('hours and limit must be integers', status_code=status.HTTP_400_BAD_REQUEST)
+        
+        traces = ChatMessage.objects.filter(
+            role='assistant',
+            timestamp__gte=timezone.now() - timedelta(hours=hours),
+            metadata__has_key='trace'
+        ).order_by('-timestamp').values_list('metadata__trace', flat=True)[:limit]
+        
+        summary = summarize_traces(traces)
+        return success_response(
+            {
+                'window_hours': hours,
+                **summary,
+                'process': {
+                    'llm_limiter': get_llm_limiter_stats(),
+                    'llm_pool': get_llm_pool_stats(),
+                    'llm_memo': get_llm_cache_stats(),
+                    'answer_cache': answer_cache.stats(),
+                    'single_flight': get_single_flight_stats(),
+                    'embedding_cache': get_embedding_cache_stats(),
+                    'local_vector_index': local_vector_index.get_stats(),
+                    'lexical_index': lexical_index.get_stats(),
+                },
+            },
+            message=f"Latency metrics for {summary['turns']} turns"
+        )
@@ -6,7 +6,7 @@ Follows strict extraction rules: only explicit facts, no inference.
 import json
 import logging
 from typing import Dict, List, Optional
-from openai import AzureOpenAI
+from agents.llm_pool import get_chat_client, PooledChatClient
 from django.conf import settings
 
 from .kg_schema import ALLOWED_NODE_TYPES, ALLOWED_RELATIONSHIP_TYPES
@@ -67,25 +67,12 @@ DOCUMENT TEXT:
 {document_text}"""
 
 
-def _get_openai_client() -> Optional[AzureOpenAI]:
-    """Get Azure OpenAI client from settings."""
-    try:
-        endpoint = settings.AZURE_OPENAI_ENDPOINT
-        api_key = settings.AZURE_OPENAI_API_KEY
-        api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-        
-        if not endpoint or not api_key:
-            logger.warning("Azure OpenAI credentials not configured")
-            return None
-        
-        return AzureOpenAI(
-            azure_endpoint=endpoint,
-            api_key=api_key,
-            api_version=api_version
-        )
-    except Exception as e:
-        logger.error(f"Error creating OpenAI client: {str(e)}")
-        return None
+def _get_openai_client() -> Optional[PooledChatClient]:
+    """Get the shared Azure OpenAI chat client (deployment pool)."""
+    client, _ = get_chat_client()
+    if not client:
+        logger.warning("Azure OpenAI credentials not configured")
+    return client
 
 
 def extract_kg_from_text(document_text: str, model: str = None) -> Dict[str, List]:
@@ -9,7 +9,11 @@ class KnowledgebaseConfig(AppConfig):
     name = 'knowledgebase'
     
     def ready(self):
-        """Initialize Pinecone connection at Django startup"""
+        """Connect signal handlers and initialize Pinecone connection at Django startup"""
+        from knowledgebase import signals  # Lexical index signal handlers
+        from django.conf import settings
+        if getattr(settings, 'VECTOR_STORE_BACKEND', 'pinecone') != 'pinecone':
+            return
         try:
             from knowledgebase.services.pinecone_service import initialize_pinecone
             initialize_pinecone()
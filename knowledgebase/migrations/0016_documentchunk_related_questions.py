@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledgebase', '0015_add_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='related_questions',
+            field=models.JSONField(blank=True, default=list, help_text='Follow-up questions precomputed at vectorization time (suggestion bank)'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledgebase', '0016_documentchunk_related_questions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryEmbedding',
+            fields=[
+                ('key', models.CharField(help_text='SHA-256 of the embedding model and normalized text', max_length=64, primary_key=True, serialize=False)),
+                ('model', models.CharField(db_index=True, help_text='Embedding service and deployment the vector was created with', max_length=255)),
+                ('text', models.TextField(help_text='Normalized query text')),
+                ('dimensions', models.IntegerField(help_text='Length of the embedding vector')),
+                ('vector', models.BinaryField(help_text='Embedding as little-endian float32')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Query Embedding',
+                'verbose_name_plural': 'Query Embeddings',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledgebase', '0017_query_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='embedding',
+            field=models.BinaryField(blank=True, help_text='Embedding uploaded to Pinecone, as little-endian float32 (local vector index replica)', null=True),
+        ),
+    ]
@@ -150,6 +150,11 @@ class DocumentChunk(models.Model):
         null=True,
         help_text="Question label for this chunk (for Q&A format chunks)"
     )
+    related_questions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Follow-up questions precomputed at vectorization time (suggestion bank)"
+    )
     
     # Vectorization status
     is_vectorized = models.BooleanField(default=False, help_text="Whether chunk has been vectorized")
@@ -160,6 +165,11 @@ class DocumentChunk(models.Model):
         help_text="Pinecone vector ID for this chunk"
     )
     vectorized_at = models.DateTimeField(null=True, blank=True, help_text="When chunk was vectorized")
+    embedding = models.BinaryField(
+        null=True,
+        blank=True,
+        help_text="Embedding uploaded to Pinecone, as little-endian float32 (local vector index replica)"
+    )
     
     # Metadata stored in DB (also stored in Pinecone)
     metadata = models.JSONField(
@@ -183,3 +193,31 @@ class DocumentChunk(models.Model):
     
     def __str__(self):
         return f"{self.document.title} - Chunk {self.chunk_index}"
+
+
+class QueryEmbedding(models.Model):
+    """
+    Persistent tier of the query embedding cache (services/embedding_cache.py).
+    One row per (embedding model, normalized query text); shared by all workers.
+    """
+    key = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text="SHA-256 of the embedding model and normalized text"
+    )
+    model = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="Embedding service and deployment the vector was created with"
+    )
+    text = models.TextField(help_text="Normalized query text")
+    dimensions = models.IntegerField(help_text="Length of the embedding vector")
+    vector = models.BinaryField(help_text="Embedding as little-endian float32")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = "Query Embedding"
+        verbose_name_plural = "Query Embeddings"
+    
+    def __str__(self):
+        return f"{self.model}: {self.text[:50]}"
@@ -22,7 +22,7 @@ class DocumentChunkSerializer(serializers.ModelSerializer):
     class Meta:
         model = DocumentChunk
         fields = ['id', 'chunk_id', 'chunk_index', 'text', 'text_length', 
-                  'question', 'is_vectorized', 'vector_id', 'vectorized_at', 'metadata', 
+                  'question', 'related_questions', 'is_vectorized', 'vector_id', 'vectorized_at', 'metadata', 
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -0,0 +1,163 @@
+"""
+Query embedding cache.
+
+Most chat turns embed one of a few hundred common phrasings, so query embeddings are
+cached in two tiers, keyed by (embedding model, normalized text):
+- Tier 1: bounded in-process LRU
+- Tier 2: the QueryEmbedding table (float32 bytes), shared by all workers and kept
+  across restarts
+
+The embedding model (service + deployment) is part of the key, so vectors from a
+previous deployment are never returned; its rows are deleted the first time a
+process uses a new model. Document chunks (embed_batch) are not cached.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 200  # Persistent writes between checks of KB_EMBEDDING_CACHE_MAX_ROWS
+
+
+def normalize_query(text: str) -> str:
+    """Whitespace-normalized text (the cache key and the text that is embedded)."""
+    return " ".join((text or "").split())
+
+
+def make_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _to_bytes(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def _from_bytes(data: bytes) -> List[float]:
+    return np.frombuffer(bytes(data), dtype="<f4").astype(float).tolist()
+
+
+class EmbeddingCache:
+    """Two-tier query embedding cache (see module docstring)."""
+
+    def __init__(self, max_entries: int, persistent: bool = True, max_rows: int = 50000):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._models_checked = set()
+        self._writes = 0
+        self.stats = {"hits": 0, "persistent_hits": 0, "misses": 0, "persistent_errors": 0}
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = make_key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+
+        vector = self._get_persistent(model, key) if self.persistent else None
+        with self._lock:
+            if vector is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["persistent_hits"] += 1
+        self._remember(key, vector)
+        return vector
+
+    def set(self, model: str, text: str, vector: List[float]) -> None:
+        key = make_key(model, text)
+        self._remember(key, vector)
+        if self.persistent:
+            self._set_persistent(model, key, text, vector)
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, model: str, key: str) -> Optional[List[float]]:
+        from knowledgebase.models import QueryEmbedding
+
+        try:
+            self._drop_other_models(model)
+            row = QueryEmbedding.objects.filter(key=key).values_list('vector', flat=True).first()
+        except Exception as e:
+            self.stats["persistent_errors"] += 1
+            logger.warning(f"[EMBEDDING_CACHE] Persistent lookup failed: {str(e)}")
+            return None
+        return _from_bytes(row) if row is not None else None
+
+    def _set_persistent(self, model: str, key: str, text: str, vector: List[float]) -> None:
+        from knowledgebase.models import QueryEmbedding
+
+        try:
+            QueryEmbedding.objects.bulk_create(
+                [QueryEmbedding(key=key, model=model, text=text, dimensions=len(vector), vector=_to_bytes(vector))],
+                ignore_conflicts=True
+            )
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % PRUNE_EVERY == 0
+            if prune:
+                self._prune()
+        except Exception as e:
+            self.stats["persistent_errors"] += 1
+            logger.warning(f"[EMBEDDING_CACHE] Persistent store failed: {str(e)}")
+
+    def _drop_other_models(self, model: str) -> None:
+        """Delete vectors of previous embedding deployments (once per process and model)."""
+        from knowledgebase.models import QueryEmbedding
+
+        if model in self._models_checked:
+            return
+        deleted, _ = QueryEmbedding.objects.exclude(model=model).delete()
+        self._models_checked.add(model)
+        if deleted:
+            logger.info(f"[EMBEDDING_CACHE] Embedding model changed to {model} - dropped {deleted} cached vectors")
+
+    def _prune(self) -> None:
+        """Keep the newest `max_rows` rows."""
+        from knowledgebase.models import QueryEmbedding
+
+        cutoff = list(QueryEmbedding.objects.order_by('-created_at').values_list('created_at', flat=True)[self.max_rows:self.max_rows + 1])
+        if cutoff:
+            deleted, _ = QueryEmbedding.objects.filter(created_at__lte=cutoff[0]).delete()
+            logger.info(f"[EMBEDDING_CACHE] Pruned {deleted} cached vectors")
+
+    def clear(self, persistent: bool = False) -> None:
+        """Drop the in-process tier (and the persistent tier with `persistent=True`)."""
+        from knowledgebase.models import QueryEmbedding
+
+        with self._lock:
+            self._entries.clear()
+        if persistent:
+            QueryEmbedding.objects.all().delete()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["persistent_hits"]) / lookups, 3) if lookups else None
+        return stats
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=getattr(settings, 'KB_EMBEDDING_CACHE_MAX_ENTRIES', 2000),
+    persistent=getattr(settings, 'KB_EMBEDDING_CACHE_PERSISTENT', True),
+    max_rows=getattr(settings, 'KB_EMBEDDING_CACHE_MAX_ROWS', 50000),
+)
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the query embedding cache (this process)."""
+    return embedding_cache.get_stats()
@@ -7,6 +7,9 @@ import os
 from typing import List
 from openai import AzureOpenAI, OpenAI
 from django.conf import settings
+from agents.cassettes import get_cassette, embeddings as cassette_embeddings
+from agents.single_flight import embedding_flight, make_key
+from .embedding_cache import embedding_cache, normalize_query
 import logging
 
 logger = logging.getLogger(__name__)
@@ -63,9 +66,32 @@ def _get_embedding_client():
     return None, None, None
 
 
+def _create_embeddings(texts: List[str]) -> List[List[float]]:
+    """One embeddings request (recorded / replayed when an agent cassette is active)."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return cassette_embeddings(texts, live=None)
+
+    client, deployment, service_type = _get_embedding_client()
+    
+    if not client:
+        raise ValueError("Embedding service not available. Please configure Azure OpenAI or OpenAI API key.")
+    
+    def create():
+        resp = client.embeddings.create(
+            model=deployment,
+            input=texts
+        )
+        return [item.embedding for item in resp.data]
+    
+    if cassette is not None:
+        return cassette_embeddings(texts, create)
+    return create()
+
+
 def embed(text: str) -> List[float]:
     """
-    Generate embedding for a single text.
+    Generate embedding for a single text (query embeddings are cached, see embedding_cache.py).
     Matches reference implementation from app/services/embeddings.py
     
     Args:
@@ -74,17 +100,27 @@ def embed(text: str) -> List[float]:
     Returns:
         List of floats representing the embedding vector
     """
-    client, deployment, service_type = _get_embedding_client()
-    
-    if not client:
-        raise ValueError("Embedding service not available. Please configure Azure OpenAI or OpenAI API key.")
-    
     try:
-        resp = client.embeddings.create(
-            model=deployment,
-            input=[text]
-        )
-        return resp.data[0].embedding
+        text = normalize_query(text)
+        
+        # Query embeddings are cached per embedding model (not while a cassette records/replays)
+        model = None
+        if getattr(settings, 'KB_EMBEDDING_CACHE_ENABLED', True) and get_cassette() is None:
+            client, deployment, service_type = _get_embedding_client()
+            if client:
+                model = f"{service_type}:{deployment}"
+                cached = embedding_cache.get(model, text)
+                if cached is not None:
+                    return cached
+        
+        def create():
+            vector = _create_embeddings([text])[0]
+            if model:
+                embedding_cache.set(model, text, vector)
+            return vector
+        
+        # Identical texts embedded concurrently (e.g. the same opening question) share one request
+        return embedding_flight.do(make_key(text), create)
     
     except Exception as e:
         logger.error(f"Error generating embedding: {str(e)}")
@@ -103,21 +139,12 @@ def embed_batch(texts: List[str], batch_size: int = 100) -> List[List[float]]:
     Returns:
         List of embedding vectors
     """
-    client, deployment, service_type = _get_embedding_client()
-    
-    if not client:
-        raise ValueError("Embedding service not available. Please configure Azure OpenAI or OpenAI API key.")
-    
     all_embeddings = []
     
     try:
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
-            resp = client.embeddings.create(
-                model=deployment,
-                input=batch
-            )
-            all_embeddings.extend([item.embedding for item in resp.data])
+            all_embeddings.extend(_create_embeddings(batch))
             logger.info(f"Generated embeddings for batch {i//batch_size + 1} ({len(batch)} texts)")
         
         return all_embeddings
@@ -125,3 +152,44 @@ def embed_batch(texts: List[str], batch_size: int = 100) -> List[List[float]]:
     except Exception as e:
         logger.error(f"Error generating batch embeddings: {str(e)}")
         raise
+
+
+def embed_queries(texts: List[str]) -> List[List[float]]:
+    """
+    Embed several search queries (e.g. query variations) with at most one request.
+    Cached queries are served from embedding_cache like `embed`; the rest share one embed_batch call.
+    
+    Args:
+        texts: Queries to embed
+        
+    Returns:
+        One embedding vector per query, in order
+    """
+    try:
+        texts = [normalize_query(text) for text in texts]
+        
+        model = None
+        if getattr(settings, 'KB_EMBEDDING_CACHE_ENABLED', True) and get_cassette() is None:
+            client, deployment, service_type = _get_embedding_client()
+            if client:
+                model = f"{service_type}:{deployment}"
+        
+        vectors = {}
+        if model:
+            for text in set(texts):
+                cached = embedding_cache.get(model, text)
+                if cached is not None:
+                    vectors[text] = cached
+        
+        misses = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if misses:
+            for text, vector in zip(misses, embed_batch(misses, batch_size=len(misses))):
+                vectors[text] = vector
+                if model:
+                    embedding_cache.set(model, text, vector)
+        
+        return [vectors[text] for text in texts]
+    
+    except Exception as e:
+        logger.error(f"Error generating query embeddings: {str(e)}")
+        raise
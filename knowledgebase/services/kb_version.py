@@ -0,0 +1,50 @@
+"""
+Knowledge base version tracking.
+Caches derived from the vector DB contents (e.g. agent answer caches) store the
+version they were built against and treat entries from another version as stale.
+"""
+import logging
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+KB_VERSION_CACHE_KEY = 'knowledgebase:kb_version'
+# How long a computed version is reused before re-reading the DB.
+# With a shared cache (Redis) bumps are seen immediately; with the per-process
+# LocMemCache other workers pick up the change within this window.
+KB_VERSION_CACHE_SECONDS = 60
+
+
+def _compute_kb_version() -> str:
+    """Derive the version from live documents (count + latest vectorization time)."""
+    from knowledgebase.models import Document
+
+    stats = Document.objects.filter(state='live').aggregate(
+        count=Count('id'),
+        latest=Max('vectorized_at')
+    )
+    latest = stats['latest'].isoformat() if stats['latest'] else ''
+    return f"{stats['count']}:{latest}"
+
+
+def get_kb_version() -> str:
+    """Get the current knowledge base version."""
+    version = cache.get(KB_VERSION_CACHE_KEY)
+    if version is None:
+        version = _compute_kb_version()
+        cache.set(KB_VERSION_CACHE_KEY, version, KB_VERSION_CACHE_SECONDS)
+    return version
+
+
+def bump_kb_version() -> str:
+    """
+    Recompute the knowledge base version after documents were vectorized or removed.
+
+    Returns:
+        The new version
+    """
+    version = _compute_kb_version()
+    cache.set(KB_VERSION_CACHE_KEY, version, KB_VERSION_CACHE_SECONDS)
+    logger.info(f"Knowledge base version updated: {version}")
+    return version
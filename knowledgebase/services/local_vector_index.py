@@ -0,0 +1,120 @@
+"""
+In-process replica of the Pinecone index.
+
+The knowledge base is a few thousand chunks, so every worker keeps all chunk vectors
+as one contiguous float32 matrix (rows L2-normalized) and answers top-k queries with a
+single matrix-vector product - no network round trip. Vectors come from
+DocumentChunk.embedding (stored when a document is vectorized; backfill older
+documents with `python manage.py build_local_vector_index`).
+
+Sync:
+- vectorize_document / delete_document_vectors update this process's replica directly
+- other workers reload when the knowledge base version changes (kb_version.py)
+
+The replica only answers when it holds every vector of the live documents (and there is at
+least one); otherwise `query_vectors` keeps using Pinecone. With VECTOR_STORE_BACKEND='local'
+the replica is the vector store itself (vector_store.py).
+"""
+import logging
+import threading
+from typing import Optional, List, Dict, Any
+from django.conf import settings
+from .kb_version import get_kb_version
+from .vector_store import NumpyVectorStore, from_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_metadata(chunk) -> Dict[str, Any]:
+    """Same metadata as uploaded to Pinecone by vectorize_document."""
+    metadata = dict(chunk.metadata or {})
+    if chunk.question:
+        metadata['question'] = chunk.question
+    metadata['text'] = chunk.text
+    return metadata
+
+
+class LocalVectorIndex(NumpyVectorStore):
+    """Local replica of the Pinecone index (see module docstring)."""
+
+    def __init__(self):
+        super().__init__()
+        self._kb_version: Optional[str] = None
+        self.complete = False  # Holds every vector of the live documents
+        self._load_lock = threading.Lock()
+        self.stats = {"queries": 0, "loads": 0}
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'KB_LOCAL_VECTOR_INDEX_ENABLED', True)
+
+    def load(self) -> None:
+        """(Re)build the replica from the live documents' chunk embeddings."""
+        from knowledgebase.models import Document, DocumentChunk
+
+        kb_version = get_kb_version()
+        chunks = DocumentChunk.objects.filter(
+            document__state='live', is_vectorized=True, embedding__isnull=False
+        ).order_by('document_id', 'chunk_index')
+
+        ids, rows, metadata = [], [], []
+        for chunk in chunks.iterator():
+            ids.append(chunk.chunk_id)
+            rows.append(from_bytes(chunk.embedding))
+            metadata.append(chunk_metadata(chunk))
+
+        expected = sum(
+            len([vector_id for vector_id in (vector_ids or '').split(',') if vector_id])
+            for vector_ids in Document.objects.filter(state='live').values_list('vector_id', flat=True)
+        )
+        self._replace_all(ids, rows, metadata)
+        self._kb_version = kb_version
+        self.complete = expected > 0 and len(ids) >= expected
+        self.stats["loads"] += 1
+
+        if self.complete:
+            logger.info(f"[LOCAL_INDEX] Loaded {len(ids)} vectors (kb version {kb_version})")
+        else:
+            logger.warning(
+                f"[LOCAL_INDEX] Only {len(ids)} of {expected} live vectors have stored embeddings - "
+                f"queries use Pinecone (run `python manage.py build_local_vector_index`)"
+            )
+
+    def ensure_loaded(self) -> bool:
+        """Load on first use and after knowledge base changes in other workers. Returns `complete`."""
+        if self._kb_version != get_kb_version():
+            # Concurrent first requests build the replica once
+            with self._load_lock:
+                if self._kb_version != get_kb_version():
+                    self.load()
+        return self.complete
+
+    def replace_document(self, document_id: str, vectors: List[Dict[str, Any]], kb_version: Optional[str] = None) -> None:
+        """
+        Replace a document's vectors after it was (re)vectorized.
+
+        Args:
+            document_id: Document UUID as string
+            vectors: Vectors as sent to Pinecone ({"id", "values", "metadata"})
+            kb_version: Knowledge base version after the change (bump_kb_version)
+        """
+        self._rewrite(lambda vector_id, meta: meta.get('document_id') == document_id, vectors)
+        # Our own change: the replica matches the new version unless it was never loaded
+        if kb_version is not None and self._kb_version is not None:
+            self._kb_version = kb_version
+
+    def delete_document(self, document_id: str, kb_version: Optional[str] = None) -> None:
+        """Remove a document's vectors after it was removed from Pinecone."""
+        self.replace_document(document_id, [], kb_version)
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        # Single queries also land here (NumpyVectorStore.query)
+        self.stats["queries"] += len(vectors)
+        return super().query_batch(vectors, top_k, include_metadata, filter)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, vectors=len(self), complete=self.complete, kb_version=self._kb_version)
+
+
+local_vector_index = LocalVectorIndex()
@@ -272,26 +272,15 @@ def _get_llm_client():
     Returns (client, model_name) or (None, None) if not configured.
     """
     try:
-        from openai import AzureOpenAI, OpenAI
+        from openai import OpenAI
+        from agents.llm_pool import get_chat_client
         import os
         
-        # Try Azure OpenAI first
-        azure_key = getattr(settings, 'AZURE_OPENAI_API_KEY', None)
-        azure_endpoint = getattr(settings, 'AZURE_OPENAI_ENDPOINT', None)
-        azure_api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
-        azure_deployment = getattr(settings, 'AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
-        
-        if azure_key and azure_endpoint:
-            try:
-                client = AzureOpenAI(
-                    api_key=azure_key,
-                    azure_endpoint=azure_endpoint,
-                    api_version=azure_api_version
-                )
-                logger.info(f"Using Azure OpenAI for LLM structuring: {azure_deployment}")
-                return client, azure_deployment
-            except Exception as e:
-                logger.warning(f"Failed to initialize Azure OpenAI: {e}")
+        # Try Azure OpenAI first (shared deployment pool)
+        client, azure_deployment = get_chat_client()
+        if client:
+            logger.info(f"Using Azure OpenAI for LLM structuring: {azure_deployment}")
+            return client, azure_deployment
         
         # Fallback to OpenAI
         openai_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
@@ -6,6 +6,9 @@ import os
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone
 from django.conf import settings
+from agents.cassettes import get_cassette, vector_query as cassette_vector_query, REPLAY_INDEX
+from agents.single_flight import vector_query_flight, make_key
+from .local_vector_index import local_vector_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -102,6 +105,11 @@ def get_pinecone_index():
     """
     global _pinecone_index, _pinecone_initialized
     
+    # Replayed cassette: queries are answered from the recording
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return REPLAY_INDEX
+    
     # If already initialized at startup, return cached index
     if _pinecone_initialized and _pinecone_index:
         return _pinecone_index
@@ -230,18 +238,32 @@ def delete_vectors_by_document_id(index, document_id: str, max_chunks: int = 100
         return False
 
 
+def _query_filter(document_id: Optional[str] = None, file_type: Optional[str] = None) -> Dict[str, Any]:
+    filter_dict = {}
+    if document_id:
+        filter_dict["document_id"] = {"$eq": document_id}
+    if file_type:
+        filter_dict["file_type"] = {"$eq": file_type}
+    return filter_dict
+
+
 def query_vectors(index, query_vector: List[float], top_k: int = 5, 
-                  document_id: Optional[str] = None, include_metadata: bool = True):
+                  document_id: Optional[str] = None, include_metadata: bool = True,
+                  file_type: Optional[str] = None):
     """
     Query Pinecone for similar vectors.
     Matches reference implementation from rag_tool.py
     
+    Served from the in-process replica (local_vector_index.py) when it holds the
+    whole knowledge base; Pinecone is queried otherwise or if the replica fails.
+    
     Args:
         index: Pinecone index object
         query_vector: Query embedding vector
         top_k: Number of results to return
         document_id: Optional filter by document_id
         include_metadata: Whether to include metadata in results
+        file_type: Optional filter by file_type
         
     Returns:
         Query results with matches
@@ -251,19 +273,82 @@ def query_vectors(index, query_vector: List[float], top_k: int = 5,
         return None
     
     try:
-        filter_dict = {}
-        if document_id:
-            filter_dict = {"document_id": {"$eq": document_id}}
+        filter_dict = _query_filter(document_id, file_type)
         
-        results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=include_metadata,
-            filter=filter_dict if filter_dict else None
-        )
+        # Local replica of a remote store (recorded/replayed cassettes always go through the index)
+        if get_cassette() is None and getattr(index, 'remote', False) and local_vector_index.enabled():
+            try:
+                if local_vector_index.ensure_loaded():
+                    return local_vector_index.query(query_vector, top_k, include_metadata, filter_dict or None)
+            except Exception as e:
+                logger.warning(f"[LOCAL_INDEX] Query failed, using Pinecone: {str(e)}")
         
-        return results
+        def query():
+            return index.query(
+                vector=query_vector,
+                top_k=top_k,
+                include_metadata=include_metadata,
+                filter=filter_dict if filter_dict else None
+            )
+        
+        def run():
+            cassette = get_cassette()
+            if cassette is not None:
+                return cassette_vector_query(
+                    {"vector": query_vector, "top_k": top_k, "include_metadata": include_metadata, "filter": filter_dict},
+                    query
+                )
+            return query()
+        
+        # Identical concurrent queries share one request (results are read-only)
+        return vector_query_flight.do(make_key(id(index), query_vector, top_k, include_metadata, filter_dict), run)
     
     except Exception as e:
         logger.error(f"Error querying Pinecone: {str(e)}")
         return None
+
+
+def query_vectors_batch(index, query_vectors: List[List[float]], top_k: int = 5,
+                        document_id: Optional[str] = None, include_metadata: bool = True,
+                        file_type: Optional[str] = None) -> List[Any]:
+    """
+    Query several vectors at once (e.g. the variations of one question).
+    
+    The local stores and the replica answer the whole batch with one matrix product;
+    Pinecone gets the queries concurrently. Recorded/replayed cassettes go through
+    query_vectors one query at a time.
+    
+    Args:
+        index: Vector store (see get_vector_store)
+        query_vectors: Query embedding vectors
+        top_k: Number of results per query
+        document_id: Optional filter by document_id
+        include_metadata: Whether to include metadata in results
+        file_type: Optional filter by file_type
+        
+    Returns:
+        One query result per vector (None for a failed query)
+    """
+    if not index:
+        logger.error("Pinecone index not available")
+        return [None] * len(query_vectors)
+    
+    if get_cassette() is not None or not hasattr(index, 'query_batch'):
+        return [
+            query_vectors(index, vector, top_k, document_id=document_id, include_metadata=include_metadata, file_type=file_type)
+            for vector in query_vectors
+        ]
+    
+    filter_dict = _query_filter(document_id, file_type) or None
+    if getattr(index, 'remote', False) and local_vector_index.enabled():
+        try:
+            if local_vector_index.ensure_loaded():
+                return local_vector_index.query_batch(query_vectors, top_k, include_metadata, filter_dict)
+        except Exception as e:
+            logger.warning(f"[LOCAL_INDEX] Batch query failed, using Pinecone: {str(e)}")
+    
+    try:
+        return index.query_batch(query_vectors, top_k=top_k, include_metadata=include_metadata, filter=filter_dict)
+    except Exception as e:
+        logger.error(f"Error querying Pinecone (batch of {len(query_vectors)}): {str(e)}")
+        return [None] * len(query_vectors)
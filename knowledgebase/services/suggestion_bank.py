@@ -0,0 +1,229 @@
+"""
+Suggestion bank: follow-up questions precomputed per knowledge chunk.
+
+When a document is vectorized, each DocumentChunk gets a small set of related
+questions (one LLM call per batch of chunks), stored on DocumentChunk.related_questions.
+At answer time the agents assemble quick-reply suggestions from the chunks they
+retrieved - ranked by retrieval score and deduplicated against the questions the
+user already asked - without an LLM call.
+"""
+import json
+import logging
+import re
+from typing import List, Dict, Any, Iterable, Optional
+from django.conf import settings
+from django.db import close_old_connections
+from agents.llm_pool import get_chat_client, TIER_CLASSIFY
+from agents.llm_executor import llm_slot_sync, get_shared_executor, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 8  # Chunks per LLM call
+CHUNK_TEXT_CHARS = 800  # Chunk text included in the prompt
+MAX_QUESTION_CHARS = 100  # Longer questions do not fit a quick-reply button
+POSITION_DECAY = 0.9  # Rank weight of the n-th question of a chunk: score * DECAY ** n
+ASKED_SIMILARITY_THRESHOLD = 0.6  # Word overlap (Jaccard) at which a suggestion counts as already asked
+
+RELATED_QUESTIONS_PROMPT = """You are building quick-reply suggestions for WhipSmart's chat assistant (EV leasing, novated leases, FBT, tax benefits).
+
+For each knowledge base chunk below, write up to {count} short questions a user who just read this content would naturally ask next.
+
+Rules:
+- Each question is answerable from WhipSmart's knowledge base (related topics, not the chunk's own question)
+- Short: max 10-12 words, written as the user would type it
+- No company-internal wording, no URLs, no numbering
+
+Chunks:
+{chunks}
+
+RESPOND WITH JSON ONLY:
+{{
+    "chunks": [{{"index": 1, "questions": ["question 1", "question 2"]}}]
+}}
+"""
+
+
+def _format_chunk(index: int, chunk) -> str:
+    header = f"[{index}]"
+    if chunk.question:
+        header += f" Q: {chunk.question.strip()}"
+    return f"{header}\n{(chunk.text or '')[:CHUNK_TEXT_CHARS]}"
+
+
+def _clean_questions(questions: Any, count: int) -> List[str]:
+    if not isinstance(questions, list):
+        return []
+    cleaned = []
+    seen = set()
+    for question in questions:
+        if not isinstance(question, str):
+            continue
+        question = question.strip().strip('"').strip()
+        key = _normalize(question)
+        if not question or len(question) > MAX_QUESTION_CHARS or key in seen:
+            continue
+        seen.add(key)
+        cleaned.append(question)
+    return cleaned[:count]
+
+
+def generate_related_questions(chunks: List[Any], count: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Generate related questions for a list of DocumentChunk instances.
+
+    Args:
+        chunks: DocumentChunk instances (batched into BATCH_SIZE chunks per LLM call)
+        count: Questions per chunk (default: KB_SUGGESTION_BANK_QUESTIONS_PER_CHUNK)
+
+    Returns:
+        Dictionary of chunk_id -> list of questions (chunks whose batch failed are missing)
+    """
+    count = count or getattr(settings, 'KB_SUGGESTION_BANK_QUESTIONS_PER_CHUNK', 4)
+    client, model = get_chat_client(TIER_CLASSIFY)
+    if not client or not model:
+        logger.error("[SUGGESTION_BANK] OpenAI client not available")
+        return {}
+
+    related = {}
+    for start in range(0, len(chunks), BATCH_SIZE):
+        batch = chunks[start:start + BATCH_SIZE]
+        prompt = RELATED_QUESTIONS_PROMPT.format(
+            count=count,
+            chunks="\n\n".join(_format_chunk(i, chunk) for i, chunk in enumerate(batch, 1))
+        )
+        try:
+            with llm_slot_sync(PRIORITY_BACKGROUND):
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format={"type": "json_object"},
+                    max_tokens=120 * len(batch),
+                    temperature=0.3
+                )
+            result = json.loads(response.choices[0].message.content.strip())
+        except Exception as e:
+            logger.warning(f"[SUGGESTION_BANK] Batch of {len(batch)} chunks failed: {str(e)}")
+            continue
+
+        for item in result.get("chunks", []) if isinstance(result, dict) else []:
+            try:
+                chunk = batch[int(item.get("index")) - 1]
+            except (TypeError, ValueError, IndexError, AttributeError):
+                continue
+            related[chunk.chunk_id] = _clean_questions(item.get("questions"), count)
+    return related
+
+
+def build_suggestion_bank(document, force: bool = False) -> int:
+    """
+    Precompute the related questions of a document's chunks.
+
+    Args:
+        document: Document model instance
+        force: Regenerate chunks that already have related questions
+
+    Returns:
+        Number of chunks updated
+    """
+    from knowledgebase.models import DocumentChunk
+
+    chunks = DocumentChunk.objects.filter(document=document).order_by('chunk_index')
+    if not force:
+        chunks = chunks.filter(related_questions=[])
+    chunks = list(chunks)
+    if not chunks:
+        return 0
+
+    related = generate_related_questions(chunks)
+    updated = []
+    for chunk in chunks:
+        if related.get(chunk.chunk_id):
+            chunk.related_questions = related[chunk.chunk_id]
+            updated.append(chunk)
+    DocumentChunk.objects.bulk_update(updated, ['related_questions'])
+    logger.info(f"[SUGGESTION_BANK] Stored related questions for {len(updated)}/{len(chunks)} chunks of document {document.id}")
+    return len(updated)
+
+
+def _build_in_background(document) -> None:
+    try:
+        build_suggestion_bank(document)
+    except Exception as e:
+        logger.error(f"[SUGGESTION_BANK] Failed for document {document.id}: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def submit_suggestion_bank(document) -> None:
+    """Build the suggestion bank of a freshly vectorized document on the shared agent executor."""
+    if getattr(settings, 'KB_SUGGESTION_BANK_ENABLED', True):
+        get_shared_executor().submit(_build_in_background, document)
+
+
+# ---- answer time ----
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def _similar(a: str, b: str) -> bool:
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return False
+    return len(words_a & words_b) / len(words_a | words_b) >= ASKED_SIMILARITY_THRESHOLD
+
+
+def _chunk_id(rag_chunk: Dict[str, Any]) -> Optional[str]:
+    """chunk_id of a retrieved chunk (V1 results carry it at the top level, V2 in metadata)."""
+    return rag_chunk.get("chunk_id") or (rag_chunk.get("metadata") or {}).get("chunk_id")
+
+
+def get_bank_suggestions(rag_chunks: List[Dict[str, Any]], asked_questions: Iterable[str], limit: int = 3) -> List[str]:
+    """
+    Assemble suggestions from the suggestion bank of retrieved chunks.
+
+    Args:
+        rag_chunks: Retrieved chunks with a "score" and a chunk_id
+        asked_questions: Questions the user already asked (not suggested again)
+        limit: Maximum number of suggestions
+
+    Returns:
+        Suggestions ranked by chunk score and position (may be fewer than `limit`)
+    """
+    from knowledgebase.models import DocumentChunk
+
+    scores = {}
+    for rag_chunk in rag_chunks or []:
+        chunk_id = _chunk_id(rag_chunk)
+        if chunk_id:
+            scores[chunk_id] = max(scores.get(chunk_id, 0.0), float(rag_chunk.get("score") or 0.0))
+    if not scores:
+        return []
+
+    candidates = []
+    for chunk_id, question, related_questions in DocumentChunk.objects.filter(
+        chunk_id__in=list(scores), is_vectorized=True
+    ).values_list('chunk_id', 'question', 'related_questions'):
+        questions = list(related_questions or [])
+        if question:
+            # The chunk's own question is a follow-up when another chunk answered the user
+            questions.append(question.strip())
+        for position, text in enumerate(questions):
+            candidates.append((scores[chunk_id] * POSITION_DECAY ** position, text))
+
+    asked = [_normalize(q) for q in asked_questions if q]
+    suggestions, seen = [], []
+    for _, text in sorted(candidates, key=lambda c: c[0], reverse=True):
+        key = _normalize(text)
+        if not key or len(text) > MAX_QUESTION_CHARS:
+            continue
+        if any(key == other or _similar(key, other) for other in asked + seen):
+            continue
+        seen.append(key)
+        suggestions.append(text)
+        if len(suggestions) >= limit:
+            break
+    return suggestions
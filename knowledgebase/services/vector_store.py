@@ -0,0 +1,419 @@
+"""
+Vector store backends for the knowledge base.
+
+Every backend has the call shape of a Pinecone index, so the helpers in pinecone_service
+(upsert_vectors, query_vectors, delete_vectors_*) work with any of them:
+- upsert(vectors=[{"id", "values", "metadata"}, ...])
+- query(vector=..., top_k=..., include_metadata=..., filter=...) -> object with `.matches`
+  (each with `.id`, `.score`, `.metadata`), scores are cosine similarity
+- query_batch(vectors=[...], top_k=..., ...) -> one query response per vector
+- delete(ids=[...]) / delete(filter={...})
+- fetch(ids=[...]) -> {id: {"id", "values", "metadata"}}
+
+VECTOR_STORE_BACKEND selects the store returned by `get_vector_store()`:
+- 'pinecone' (default): the Pinecone index (pinecone_service.py); queries are served by the
+  in-process replica when it is complete (local_vector_index.py)
+- 'local': the in-process NumPy store, loaded from DocumentChunk.embedding - no network
+- 'sqlite': a SQLite file (VECTOR_STORE_SQLITE_PATH) shared by the workers on one host
+
+Filters use Pinecone syntax ({"field": value} or $eq/$ne/$in/$nin, implicit AND).
+Compare backends with `python manage.py benchmark_vector_stores`.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Any, Callable
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pinecone', 'local', 'sqlite')
+
+
+def to_bytes(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype="<f4")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict):
+        if "$eq" in condition:
+            return value == condition["$eq"]
+        if "$ne" in condition:
+            return value != condition["$ne"]
+        if "$in" in condition:
+            return value in condition["$in"]
+        if "$nin" in condition:
+            return value not in condition["$nin"]
+        raise ValueError(f"Unsupported filter operator: {condition}")
+    return value == condition
+
+
+def matches_filter(metadata: Dict[str, Any], filter_dict: Optional[Dict[str, Any]]) -> bool:
+    """Pinecone-style metadata filter ({"field": value}, $eq/$ne/$in/$nin, implicit AND)."""
+    for field, condition in (filter_dict or {}).items():
+        if not _matches_condition(metadata.get(field), condition):
+            return False
+    return True
+
+
+class VectorStore:
+    """Interface of a vector store backend (see module docstring)."""
+
+    name = ""
+    remote = False  # Queries cross the network (the local replica can serve them)
+
+    def __bool__(self) -> bool:
+        # Callers check `if not index:`; an empty store is still available
+        return True
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> None:
+        raise NotImplementedError
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None, **kwargs):
+        raise NotImplementedError
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        """One query response per vector (backends override this with a single batched search)."""
+        return [self.query(vector, top_k, include_metadata, filter) for vector in vectors]
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class _Snapshot:
+    """Immutable store contents; writes build a new snapshot (queries never lock)."""
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, metadata: List[Dict[str, Any]]):
+        self.ids = ids
+        self.matrix = matrix  # L2-normalized rows
+        self.metadata = metadata
+        self.positions = {vector_id: i for i, vector_id in enumerate(ids)}
+
+
+EMPTY = _Snapshot([], np.zeros((0, 0), dtype=np.float32), [])
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process store: all vectors in one contiguous float32 matrix, exact cosine top-k
+    with a single matrix-vector product (matrix-matrix for a batch of queries).
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self._snapshot = EMPTY
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
+
+    def _rewrite(self, drop: Callable[[str, Dict[str, Any]], bool], vectors: List[Dict[str, Any]]) -> int:
+        """Remove the vectors `drop` selects and append `vectors`. Returns the number removed."""
+        with self._lock:
+            snapshot = self._snapshot
+            keep = np.array([not drop(i, m) for i, m in zip(snapshot.ids, snapshot.metadata)], dtype=bool)
+            ids = [vector_id for vector_id, kept in zip(snapshot.ids, keep) if kept]
+            metadata = [meta for meta, kept in zip(snapshot.metadata, keep) if kept]
+            matrix = snapshot.matrix[keep] if len(keep) else EMPTY.matrix
+            if vectors:
+                new_rows = _normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+                if ids and matrix.shape[1] != new_rows.shape[1]:
+                    raise ValueError(f"Vector dimension {new_rows.shape[1]} does not match the store ({matrix.shape[1]})")
+                matrix = np.vstack([matrix, new_rows]) if ids else new_rows
+                ids.extend(v["id"] for v in vectors)
+                metadata.extend(dict(v.get("metadata") or {}) for v in vectors)
+            self._snapshot = _Snapshot(ids, matrix, metadata)
+            return int(len(keep) - keep.sum())
+
+    def _replace_all(self, ids: List[str], rows: List[np.ndarray], metadata: List[Dict[str, Any]]) -> None:
+        matrix = _normalize_rows(np.vstack(rows).astype(np.float32)) if rows else EMPTY.matrix
+        with self._lock:
+            self._snapshot = _Snapshot(ids, matrix, metadata)
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> None:
+        vectors = list({v["id"]: v for v in vectors}.values())  # Last write of an ID wins
+        new_ids = {v["id"] for v in vectors}
+        self._rewrite(lambda vector_id, meta: vector_id in new_ids, vectors)
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None,
+               delete_all: bool = False, **kwargs) -> None:
+        if delete_all:
+            self._rewrite(lambda vector_id, meta: True, [])
+        elif ids is not None:
+            ids = set(ids)
+            self._rewrite(lambda vector_id, meta: vector_id in ids, [])
+        elif filter:
+            self._rewrite(lambda vector_id, meta: matches_filter(meta, filter), [])
+
+    def fetch(self, ids: List[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        """Stored vectors by ID (values are L2-normalized)."""
+        snapshot = self._snapshot
+        return {
+            vector_id: {
+                "id": vector_id,
+                "values": snapshot.matrix[snapshot.positions[vector_id]].tolist(),
+                "metadata": dict(snapshot.metadata[snapshot.positions[vector_id]]),
+            }
+            for vector_id in ids if vector_id in snapshot.positions
+        }
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None, **kwargs):
+        """
+        Exact cosine top-k.
+
+        Returns:
+            Object with `.matches` (each with `.id`, `.score`, `.metadata`), like a Pinecone response
+        """
+        return self.query_batch([vector], top_k, include_metadata, filter)[0]
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        """Exact cosine top-k for several query vectors with one pass over the matrix."""
+        snapshot = self._snapshot
+        if not snapshot.ids or top_k <= 0 or not len(vectors):
+            return [SimpleNamespace(matches=[]) for _ in vectors]
+
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        scores = snapshot.matrix @ queries.T  # one column per query
+        if filter:
+            allowed = np.array([matches_filter(meta, filter) for meta in snapshot.metadata], dtype=bool)
+            scores[~allowed] = -np.inf
+
+        k = min(top_k, len(snapshot.ids))
+        results = []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top])]
+            results.append(SimpleNamespace(matches=[
+                SimpleNamespace(
+                    id=snapshot.ids[i],
+                    score=float(column[i]),
+                    metadata=dict(snapshot.metadata[i]) if include_metadata else None
+                )
+                for i in top if np.isfinite(column[i])
+            ]))
+        return results
+
+
+class SQLiteVectorStore(VectorStore):
+    """
+    Vectors in a SQLite file, queried from an in-memory NumPy copy.
+
+    Every write bumps a version row; a query reloads the copy when the version changed,
+    so workers sharing the file see each other's writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._cache = NumpyVectorStore()
+        self._version: Optional[int] = None
+        self._load_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, vector BLOB NOT NULL, metadata TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO store_version (id, version) VALUES (1, 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (use as a context manager to commit)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump(self, conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE store_version SET version = version + 1 WHERE id = 1")
+
+    def _sync(self) -> None:
+        """Reload the in-memory copy if the file changed since the last load."""
+        conn = self._connection()
+        version = conn.execute("SELECT version FROM store_version WHERE id = 1").fetchone()[0]
+        if version == self._version:
+            return
+        with self._load_lock:
+            if version == self._version:
+                return
+            ids, rows, metadata = [], [], []
+            for vector_id, vector, meta in conn.execute("SELECT id, vector, metadata FROM vectors ORDER BY rowid"):
+                ids.append(vector_id)
+                rows.append(from_bytes(vector))
+                metadata.append(json.loads(meta))
+            self._cache._replace_all(ids, rows, metadata)
+            self._version = version
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (id, vector, metadata) VALUES (?, ?, ?)",
+                [(v["id"], to_bytes(v["values"]), json.dumps(v.get("metadata") or {})) for v in vectors]
+            )
+            self._bump(conn)
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None,
+               delete_all: bool = False, **kwargs) -> None:
+        with self._connection() as conn:
+            if delete_all:
+                conn.execute("DELETE FROM vectors")
+            else:
+                if ids is None and filter:
+                    self._sync()
+                    snapshot = self._cache._snapshot
+                    ids = [i for i, meta in zip(snapshot.ids, snapshot.metadata) if matches_filter(meta, filter)]
+                ids = list(ids or [])
+                for i in range(0, len(ids), 500):
+                    batch = ids[i:i + 500]
+                    conn.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch)
+            self._bump(conn)
+
+    def fetch(self, ids: List[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        conn = self._connection()
+        results = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            rows = conn.execute(f"SELECT id, vector, metadata FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch)
+            for vector_id, vector, meta in rows:
+                results[vector_id] = {"id": vector_id, "values": from_bytes(vector).tolist(), "metadata": json.loads(meta)}
+        return results
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None, **kwargs):
+        self._sync()
+        return self._cache.query(vector, top_k, include_metadata, filter)
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        self._sync()
+        return self._cache.query_batch(vectors, top_k, include_metadata, filter)
+
+
+class PineconeVectorStore(VectorStore):
+    """The Pinecone index of pinecone_service (resolved on every call, so it follows re-initialization)."""
+
+    name = "pinecone"
+    remote = True
+
+    def __init__(self):
+        # Pinecone has no multi-vector query; a batch is sent as concurrent requests. A pool
+        # of its own, because callers may already run on the shared agent executor.
+        self._batch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pinecone-batch")
+
+    @property
+    def index(self):
+        from .pinecone_service import get_pinecone_index
+        return get_pinecone_index()
+
+    def available(self) -> bool:
+        return bool(self.index)
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None, **kwargs):
+        return self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        index = self.index
+        if len(vectors) <= 1:
+            return [index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter) for vector in vectors]
+        return list(self._batch_executor.map(
+            lambda vector: index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter),
+            vectors
+        ))
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None,
+               delete_all: bool = False, **kwargs) -> None:
+        if delete_all:
+            self.index.delete(delete_all=True)
+        elif ids is not None:
+            self.index.delete(ids=ids)
+        elif filter:
+            # Pod-based indexes only; serverless indexes delete by ID (delete_vectors_by_document_id)
+            self.index.delete(filter=filter)
+
+    def fetch(self, ids: List[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        response = self.index.fetch(ids=list(ids))
+        vectors = getattr(response, "vectors", None)
+        if vectors is None:
+            vectors = response.get("vectors", {})
+        results = {}
+        for vector_id, vector in vectors.items():
+            values = vector["values"] if isinstance(vector, dict) else vector.values
+            metadata = vector.get("metadata") if isinstance(vector, dict) else getattr(vector, "metadata", None)
+            results[vector_id] = {"id": vector_id, "values": list(values), "metadata": dict(metadata or {})}
+        return results
+
+
+pinecone_vector_store = PineconeVectorStore()
+_sqlite_store: Optional[SQLiteVectorStore] = None
+_sqlite_lock = threading.Lock()
+
+
+def get_backend() -> str:
+    backend = getattr(settings, 'VECTOR_STORE_BACKEND', 'pinecone')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def get_sqlite_store() -> SQLiteVectorStore:
+    global _sqlite_store
+    with _sqlite_lock:
+        if _sqlite_store is None:
+            _sqlite_store = SQLiteVectorStore(settings.VECTOR_STORE_SQLITE_PATH)
+            logger.info(f"[VECTOR_STORE] Using SQLite vector store {_sqlite_store.path}")
+        return _sqlite_store
+
+
+def get_vector_store():
+    """
+    The configured vector store (VECTOR_STORE_BACKEND).
+
+    Returns:
+        The store, the cassette's replay index while a cassette is replayed, or None if
+        Pinecone is selected but not available
+    """
+    from agents.cassettes import get_cassette, REPLAY_INDEX
+
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return REPLAY_INDEX
+
+    backend = get_backend()
+    if backend == 'local':
+        from .local_vector_index import local_vector_index
+        local_vector_index.ensure_loaded()
+        return local_vector_index
+    if backend == 'sqlite':
+        return get_sqlite_store()
+    return pinecone_vector_store if pinecone_vector_store.available() else None
@@ -0,0 +1,195 @@
+"""
+Conformance and latency benchmark for the vector store backends (vector_store.py).
+
+- `check_conformance` runs the same behaviour checks against any store: upsert/fetch,
+  self-match, score order, metadata filters, overwrite, delete by ID and by filter
+- `benchmark_store` loads a dataset, then reports upsert time, recall@k against exact
+  cosine search and query latency (p50/p95), with and without a filter
+
+All test vectors have IDs starting with "bench-" and are deleted afterwards, so a live
+index is left as it was. Remote stores are eventually consistent; checks are retried for
+up to `settle` seconds.
+"""
+import logging
+import time
+import uuid
+from typing import Optional, List, Dict, Any, Callable
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ID_PREFIX = "bench-"
+
+
+def _eventually(check: Callable[[], bool], settle: float) -> bool:
+    """Run `check` until it passes or `settle` seconds have passed."""
+    deadline = time.monotonic() + settle
+    while True:
+        if check():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.5)
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    return round(float(np.percentile(values, percentile)), 3) if values else None
+
+
+def make_dataset(count: int, dimensions: int, queries: int, seed: int = 0) -> Dict[str, Any]:
+    """Clustered random vectors (like chunks of a few documents) and noisy queries near them."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 20), dimensions)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), count)
+    vectors = centers[assignment] + 0.4 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    picks = rng.integers(0, count, queries)
+    query_vectors = vectors[picks] + 0.4 * rng.standard_normal((queries, dimensions)).astype(np.float32)
+    return {"vectors": vectors, "queries": query_vectors, "documents": assignment}
+
+
+def dataset_from_chunks(queries: int, seed: int = 0) -> Dict[str, Any]:
+    """The stored chunk embeddings (DocumentChunk.embedding) with noisy copies as queries."""
+    from knowledgebase.models import DocumentChunk
+    from .vector_store import from_bytes
+
+    rows = list(DocumentChunk.objects.filter(embedding__isnull=False).values_list('embedding', 'document_id'))
+    if not rows:
+        raise ValueError("No chunk embeddings stored (vectorize documents or run build_local_vector_index)")
+    vectors = np.vstack([from_bytes(embedding) for embedding, _ in rows]).astype(np.float32)
+    document_ids = {document_id: i for i, document_id in enumerate(sorted({str(d) for _, d in rows}))}
+    rng = np.random.default_rng(seed)
+    scale = 0.3 * float(np.abs(vectors).mean())
+    picks = rng.integers(0, len(vectors), queries)
+    query_vectors = vectors[picks] + scale * rng.standard_normal((queries, vectors.shape[1])).astype(np.float32)
+    return {"vectors": vectors, "queries": query_vectors, "documents": np.array([document_ids[str(d)] for _, d in rows])}
+
+
+def check_conformance(store, dimensions: int = 64, settle: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Behaviour checks every backend must pass.
+
+    Returns:
+        One {"check", "passed", "detail"} dict per check
+    """
+    run = uuid.uuid4().hex[:8]
+    rng = np.random.default_rng(1)
+    vectors = [
+        {
+            "id": f"{ID_PREFIX}{run}-{i}",
+            "values": rng.standard_normal(dimensions).tolist(),
+            "metadata": {"document_id": f"{ID_PREFIX}{run}-doc-{i % 3}", "file_type": "pdf" if i % 2 else "txt", "text": f"chunk {i}"},
+        }
+        for i in range(12)
+    ]
+    ids = [v["id"] for v in vectors]
+    results = []
+
+    def record(check: str, passed: bool, detail: str = "") -> None:
+        results.append({"check": check, "passed": bool(passed), "detail": detail})
+
+    def query(vector, **kwargs):
+        return store.query(vector=vector, top_k=kwargs.pop("top_k", 5), include_metadata=kwargs.pop("include_metadata", True), **kwargs)
+
+    try:
+        store.upsert(vectors=vectors)
+        record("upsert/fetch", _eventually(lambda: set(store.fetch(ids=ids)) == set(ids), settle),
+               "every upserted ID can be fetched")
+        fetched = store.fetch(ids=ids[:1]).get(ids[0], {})
+        record("fetch metadata", fetched.get("metadata", {}).get("text") == "chunk 0", str(fetched.get("metadata")))
+
+        target = vectors[4]
+        matches = query(target["values"]).matches
+        record("self match", bool(matches) and matches[0].id == target["id"] and abs(matches[0].score - 1.0) < 1e-3,
+               f"top: {matches[0].id if matches else None} {matches[0].score if matches else None}")
+        scores = [m.score for m in matches]
+        record("score order", scores == sorted(scores, reverse=True) and len(matches) == 5, str([round(s, 3) for s in scores]))
+        record("metadata returned", bool(matches) and (matches[0].metadata or {}).get("text") == "chunk 4")
+
+        document_id = f"{ID_PREFIX}{run}-doc-1"
+        matches = query(target["values"], top_k=12, filter={"document_id": {"$eq": document_id}}).matches
+        record("filter $eq", len(matches) == 4 and all(m.metadata["document_id"] == document_id for m in matches), f"{len(matches)} matches")
+        matches = query(target["values"], top_k=12, filter={
+            "document_id": {"$in": [f"{ID_PREFIX}{run}-doc-0", document_id]}, "file_type": "pdf"
+        }).matches
+        record("filter $in + field", len(matches) == 4 and all(m.metadata["file_type"] == "pdf" for m in matches), f"{len(matches)} matches")
+
+        store.upsert(vectors=[dict(target, metadata=dict(target["metadata"], text="updated"))])
+        record("overwrite", _eventually(
+            lambda: store.fetch(ids=[target["id"]]).get(target["id"], {}).get("metadata", {}).get("text") == "updated", settle
+        ))
+
+        store.delete(ids=[target["id"]])
+        record("delete ids", _eventually(
+            lambda: target["id"] not in store.fetch(ids=[target["id"]])
+            and all(m.id != target["id"] for m in query(target["values"], top_k=12).matches), settle
+        ))
+
+        try:
+            store.delete(filter={"document_id": {"$eq": f"{ID_PREFIX}{run}-doc-2"}})
+            record("delete filter", _eventually(
+                lambda: not query(target["values"], top_k=12, filter={"document_id": {"$eq": f"{ID_PREFIX}{run}-doc-2"}}).matches, settle
+            ))
+        except Exception as e:
+            # Pinecone serverless indexes do not delete by metadata (delete_vectors_by_document_id uses IDs)
+            record("delete filter", False, f"unsupported: {str(e)[:120]}")
+    except Exception as e:
+        record("error", False, str(e))
+    finally:
+        store.delete(ids=ids)
+    return results
+
+
+def benchmark_store(store, dataset: Dict[str, Any], top_k: int = 5, settle: float = 0.0,
+                    batch_size: int = 100) -> Dict[str, Any]:
+    """
+    Load `dataset` into the store and measure recall@k and query latency.
+
+    Returns:
+        Report with upsert time, recall, and p50/p95/mean query latency (ms)
+    """
+    vectors, queries, documents = dataset["vectors"], dataset["queries"], dataset["documents"]
+    run = uuid.uuid4().hex[:8]
+    ids = [f"{ID_PREFIX}{run}-{i}" for i in range(len(vectors))]
+    report: Dict[str, Any] = {"backend": store.name, "vectors": len(vectors), "dimensions": int(vectors.shape[1]), "queries": len(queries)}
+
+    # Exact cosine top-k as ground truth
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    truth = [set(np.argsort(-(normalized @ q))[:top_k]) for q in queries]
+
+    try:
+        started = time.perf_counter()
+        for i in range(0, len(vectors), batch_size):
+            store.upsert(vectors=[
+                {"id": ids[j], "values": vectors[j].tolist(), "metadata": {"document_id": f"{ID_PREFIX}{run}-doc-{documents[j]}"}}
+                for j in range(i, min(i + batch_size, len(vectors)))
+            ])
+        report["upsert_s"] = round(time.perf_counter() - started, 3)
+        if not _eventually(lambda: len(store.query(vector=queries[0].tolist(), top_k=top_k).matches) == top_k, settle):
+            report["error"] = "vectors not queryable"
+            return report
+
+        positions = {vector_id: i for i, vector_id in enumerate(ids)}
+        latencies, filtered_latencies, recalls = [], [], []
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            matches = store.query(vector=q.tolist(), top_k=top_k, include_metadata=True).matches
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {positions[m.id] for m in matches if m.id in positions}
+            recalls.append(len(found & expected) / top_k)
+
+            document_id = f"{ID_PREFIX}{run}-doc-{documents[next(iter(expected))]}"
+            started = time.perf_counter()
+            store.query(vector=q.tolist(), top_k=top_k, include_metadata=True, filter={"document_id": {"$eq": document_id}})
+            filtered_latencies.append((time.perf_counter() - started) * 1000)
+
+        report.update({
+            f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "mean_ms": round(float(np.mean(latencies)), 3),
+            "filtered_p95_ms": _percentile(filtered_latencies, 95),
+        })
+        return report
+    finally:
+        for i in range(0, len(ids), batch_size):
+            store.delete(ids=ids[i:i + batch_size])
@@ -6,7 +6,6 @@ import logging
 from typing import List, Dict, Any
 from django.conf import settings
 from .pinecone_service import (
-    get_pinecone_index, 
     upsert_vectors, 
     delete_vectors_by_ids,
     delete_vectors_by_document_id,
@@ -14,6 +13,11 @@ from .pinecone_service import (
 )
 from .embedding_service import embed, embed_batch
 from .document_processor import process_document
+from .kb_version import bump_kb_version
+from .local_vector_index import local_vector_index
+from .lexical_index import lexical_index, hybrid_matches
+from .vector_store import get_vector_store, to_bytes as vector_to_bytes
+from .suggestion_bank import submit_suggestion_bank
 
 logger = logging.getLogger(__name__)
 
@@ -42,12 +46,12 @@ def vectorize_document(document, use_db_chunks: bool = True) -> Dict[str, Any]:
                 'error': 'Document is already live in vector database'
             }
         
-        # Get Pinecone index
-        index = get_pinecone_index()
+        # Get vector store (VECTOR_STORE_BACKEND, Pinecone by default)
+        index = get_vector_store()
         if not index:
             return {
                 'success': False,
-                'error': 'Pinecone index not available. Check configuration.'
+                'error': 'Vector store not available. Check configuration.'
             }
         
         # Update state to processing
@@ -175,7 +179,8 @@ def vectorize_document(document, use_db_chunks: bool = True) -> Dict[str, Any]:
                         chunk.is_vectorized = True
                         chunk.vector_id = chunk_id
                         chunk.vectorized_at = timezone.now()
-                        chunk.save(update_fields=['is_vectorized', 'vector_id', 'vectorized_at'])
+                        chunk.embedding = vector_to_bytes(embeddings[idx])  # Local vector index replica
+                        chunk.save(update_fields=['is_vectorized', 'vector_id', 'vectorized_at', 'embedding'])
                     except DocumentChunk.DoesNotExist:
                         logger.warning(f"Chunk {chunk_id} not found in database")
             
@@ -187,6 +192,14 @@ def vectorize_document(document, use_db_chunks: bool = True) -> Dict[str, Any]:
             document.vector_status = 'completed'
             document.save(update_fields=['vector_id', 'is_vectorized', 'vectorized_at', 'state', 'vector_status'])
             
+            # Invalidate caches built on the previous knowledge base contents
+            kb_version = bump_kb_version()
+            local_vector_index.replace_document(str(document.id), vectors_to_upsert, kb_version)
+            
+            # Precompute follow-up suggestions for the chunks (background, not needed to go live)
+            if use_db_chunks:
+                submit_suggestion_bank(document)
+            
             logger.info(f"Successfully vectorized document {document.id} with {len(vector_ids)} chunks")
             
             return {
@@ -236,10 +249,10 @@ def delete_document_vectors(document) -> bool:
             logger.warning(f"Document {document.id} is not live, cannot remove from vector DB")
             return False
         
-        # Get Pinecone index
-        index = get_pinecone_index()
+        # Get vector store (VECTOR_STORE_BACKEND, Pinecone by default)
+        index = get_vector_store()
         if not index:
-            logger.warning("Pinecone index not available for deletion")
+            logger.warning("Vector store not available for deletion")
             return False
         
         document_id = str(document.id)
@@ -257,7 +270,8 @@ def delete_document_vectors(document) -> bool:
             DocumentChunk.objects.filter(document=document).update(
                 is_vectorized=False,
                 vector_id=None,
-                vectorized_at=None
+                vectorized_at=None,
+                embedding=None
             )
             
             # Update document state
@@ -268,6 +282,10 @@ def delete_document_vectors(document) -> bool:
             document.vector_status = 'not_started'
             document.save(update_fields=['vector_id', 'is_vectorized', 'vectorized_at', 'state', 'vector_status'])
             
+            # Invalidate caches built on the previous knowledge base contents
+            kb_version = bump_kb_version()
+            local_vector_index.delete_document(document_id, kb_version)
+            
             logger.info(f"Deleted vectors for document {document.id}")
             return True
         else:
@@ -296,25 +314,31 @@ def search_documents(query: str, top_k: int = 3, document_id: str = None) -> Dic
         # Generate query embedding
         query_vector = embed(query)
         
-        # Get Pinecone index
-        index = get_pinecone_index()
+        # Get vector store (VECTOR_STORE_BACKEND, Pinecone by default)
+        index = get_vector_store()
         if not index:
             return {
                 'success': False,
-                'error': 'Pinecone index not available',
+                'error': 'Vector store not available',
                 'results': []
             }
         
-        # Query Pinecone
+        # Query Pinecone (a wider candidate set for hybrid search)
+        hybrid = lexical_index.enabled()
         results = query_vectors(
             index=index,
             query_vector=query_vector,
-            top_k=top_k,
+            top_k=max(top_k, getattr(settings, 'KB_HYBRID_CANDIDATES', 10)) if hybrid else top_k,
             document_id=document_id,
             include_metadata=True
         )
         
-        if not results:
+        matches = list(getattr(results, 'matches', None) or [])
+        if hybrid:
+            # Fuse with the BM25 ranking (exact terms dense retrieval misses)
+            matches = hybrid_matches(query, matches, top_k, query_vector=query_vector, document_id=document_id)
+        
+        if not matches:
             return {
                 'success': True,
                 'query': query,
@@ -323,7 +347,7 @@ def search_documents(query: str, top_k: int = 3, document_id: str = None) -> Dic
         
         # Format results (like reference rag_tool.py)
         docs = []
-        for match in results.matches:
+        for match in matches:
             metadata = match.metadata or {}
             doc = {
                 "text": metadata.get("text", "")[:2000],  # Limit text length
@@ -332,7 +356,9 @@ def search_documents(query: str, top_k: int = 3, document_id: str = None) -> Dic
                 "chunk_index": metadata.get("chunk_index", 0),
                 "document_id": metadata.get("document_id", ""),
                 "document_title": metadata.get("document_title", ""),
-                "file_name": metadata.get("file_name", "")
+                "file_name": metadata.get("file_name", ""),
+                "rrf_score": metadata.get("rrf_score"),
+                "lexical_only": bool(metadata.get("lexical_only")),
             }
             docs.append(doc)
         
@@ -0,0 +1,43 @@
+"""
+Signal handlers keeping the in-process lexical index current (services/lexical_index.py).
+Connected in KnowledgebaseConfig.ready().
+"""
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Document, DocumentChunk
+from .services.lexical_index import lexical_index
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=DocumentChunk)
+def index_saved_chunk(sender, instance, update_fields=None, **kwargs):
+    # Embedding-only saves (build_local_vector_index) do not change the indexed text
+    if update_fields is not None and set(update_fields) <= {'embedding'}:
+        return
+    try:
+        lexical_index.index_chunk(instance)
+    except Exception as e:
+        logger.warning(f"[LEXICAL_INDEX] Could not index chunk {instance.chunk_id}: {str(e)}")
+
+
+@receiver(post_delete, sender=DocumentChunk)
+def unindex_deleted_chunk(sender, instance, **kwargs):
+    lexical_index.remove(instance.chunk_id)
+
+
+@receiver(post_save, sender=Document)
+def index_saved_document(sender, instance, update_fields=None, **kwargs):
+    # Only a state change (e.g. going live or leaving the vector DB) changes which chunks are searchable
+    if update_fields is not None and 'state' not in update_fields:
+        return
+    try:
+        lexical_index.index_document(instance)
+    except Exception as e:
+        logger.warning(f"[LEXICAL_INDEX] Could not index document {instance.id}: {str(e)}")
+
+
+@receiver(post_delete, sender=Document)
+def unindex_deleted_document(sender, instance, **kwargs):
+    lexical_index.remove_document(str(instance.id))
@@ -1,3 +1,184 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from knowledgebase.models import Document, DocumentChunk
+from knowledgebase.services.local_vector_index import LocalVectorIndex
+from knowledgebase.services.pinecone_service import query_vectors
+from knowledgebase.services.vectorization_service import delete_document_vectors, vectorize_document
+from knowledgebase.services.lexical_index import hybrid_matches, lexical_index
+from knowledgebase.services.vector_store import NumpyVectorStore, SQLiteVectorStore
+from knowledgebase.services.vector_store_benchmark import check_conformance, benchmark_store, make_dataset
+
+
+class VectorStoreConformanceMixin:
+    """The conformance suite of vector_store_benchmark.py, run against one backend."""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_conformance(self):
+        for check in check_conformance(self.make_store()):
+            with self.subTest(check=check["check"]):
+                self.assertTrue(check["passed"], check["detail"])
+
+    def test_exact_search_has_full_recall(self):
+        report = benchmark_store(self.make_store(), make_dataset(300, 32, 20), top_k=5)
+        self.assertNotIn("error", report)
+        self.assertEqual(report["recall@5"], 1.0)
+
+    def test_test_vectors_are_removed(self):
+        store = self.make_store()
+        check_conformance(store)
+        self.assertEqual(len(store), 0)
+
+
+class NumpyVectorStoreTests(VectorStoreConformanceMixin, SimpleTestCase):
+    def make_store(self):
+        return NumpyVectorStore()
+
+
+class SQLiteVectorStoreTests(VectorStoreConformanceMixin, SimpleTestCase):
+    def make_store(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteVectorStore(os.path.join(directory.name, "vectors.sqlite3"))
+
+    def test_writes_are_seen_by_another_instance(self):
+        first = self.make_store()
+        second = SQLiteVectorStore(first.path)
+        first.upsert(vectors=[{"id": "a", "values": [1.0, 0.0], "metadata": {"text": "a"}}])
+        self.assertEqual([m.id for m in second.query(vector=[1.0, 0.0], top_k=1).matches], ["a"])
+
+        first.delete(ids=["a"])
+        self.assertEqual(second.query(vector=[1.0, 0.0], top_k=1).matches, [])
+
+
+class HybridMatchesTests(SimpleTestCase):
+    def setUp(self):
+        for name, value in (("enabled", True), ("ensure_loaded", None)):
+            patcher = mock.patch.object(lexical_index, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_lexical_only_hits_get_no_invented_cosine(self):
+        dense = [SimpleNamespace(id="dense", score=0.82, metadata={"text": "dense"})]
+        lexical = [("fbt", 7.5, {"text": "FBT exemption"}), ("dense", 1.2, {"text": "dense"})]
+        with mock.patch.object(lexical_index, "search", return_value=lexical):
+            matches = {m.id: m for m in hybrid_matches("FBT", dense, top_k=2, query_vector=[1.0, 0.0])}
+
+        self.assertEqual(matches["dense"].score, 0.82)
+        self.assertNotIn("lexical_only", matches["dense"].metadata)
+        self.assertEqual(matches["fbt"].score, 0.0)
+        self.assertTrue(matches["fbt"].metadata["lexical_only"])
+        self.assertGreater(matches["fbt"].metadata["rrf_score"], 0)
+
+
+class RemoteStore(NumpyVectorStore):
+    """Stands in for Pinecone: a remote store the local replica may answer for."""
+    remote = True
+
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+
+    def query(self, *args, **kwargs):
+        self.queries += 1
+        return super().query(*args, **kwargs)
+
+
+def unit_vector(index, dimensions=8):
+    return [1.0 if i == index else 0.0 for i in range(dimensions)]
+
+
+class LocalVectorIndexTests(TestCase):
+    def setUp(self):
+        self.store = RemoteStore()
+        self.replica = LocalVectorIndex()
+        for target, value in [
+            ("knowledgebase.services.vectorization_service.get_vector_store", lambda: self.store),
+            ("knowledgebase.services.vectorization_service.embed_batch",
+             lambda texts, batch_size=100: [unit_vector(int(t.split()[-1])) for t in texts]),
+            ("knowledgebase.services.vectorization_service.submit_suggestion_bank", lambda document: None),
+            ("knowledgebase.services.vectorization_service.local_vector_index", self.replica),
+            ("knowledgebase.services.pinecone_service.local_vector_index", self.replica),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create(username="kb")
+
+    def document(self, first_chunk, count=2):
+        document = Document.objects.create(
+            title="FAQ", file_url="http://example.com/faq.pdf", file_type="pdf", state="chunked", uploaded_by=self.user
+        )
+        for index in range(count):
+            text = f"chunk {first_chunk + index}"
+            DocumentChunk.objects.create(
+                document=document, chunk_id=f"{document.id}-chunk-{index}", chunk_index=index,
+                text=text, text_length=len(text), metadata={"document_id": str(document.id)},
+            )
+        return document
+
+    def query(self, index):
+        return query_vectors(self.store, unit_vector(index), top_k=1)
+
+    def test_replica_follows_vectorize_and_delete(self):
+        first = self.document(0)
+        self.assertTrue(vectorize_document(first)["success"])
+        second = self.document(2)
+        self.assertTrue(vectorize_document(second)["success"])
+
+        self.assertTrue(self.replica.ensure_loaded())
+        self.assertEqual(len(self.replica), 4)
+        self.assertEqual(self.query(3).matches[0].id, f"{second.id}-chunk-1")
+        self.assertEqual(self.store.queries, 0)  # served by the replica
+
+        second.refresh_from_db()
+        self.assertTrue(delete_document_vectors(second))
+        self.assertEqual(len(self.replica), 2)
+        self.assertTrue(self.replica.ensure_loaded())
+        self.assertEqual(self.query(3).matches[0].id.split("-chunk-")[0], str(first.id))
+        self.assertEqual(self.store.queries, 0)
+
+    def test_missing_vector_falls_back_to_pinecone(self):
+        document = self.document(0)
+        vectorize_document(document)
+        # A live vector without a stored embedding (vectorized before the replica existed)
+        DocumentChunk.objects.filter(chunk_index=1).update(embedding=None)
+        self.replica.load()
+
+        self.assertFalse(self.replica.complete)
+        self.assertEqual(self.query(1).matches[0].id, f"{document.id}-chunk-1")
+        self.assertEqual(self.store.queries, 1)
+
+
+class LocalVectorIndexLoadTests(SimpleTestCase):
+    def test_concurrent_first_requests_load_once(self):
+        replica = LocalVectorIndex()
+        started = threading.Barrier(4)
+        loads = []
+
+        def load(self):
+            loads.append(1)
+            time.sleep(0.05)  # long enough for the other requests to arrive
+            self._kb_version, self.complete = "v1", True
+
+        def first_request(_):
+            started.wait()
+            return replica.ensure_loaded()
+
+        with mock.patch("knowledgebase.services.local_vector_index.get_kb_version", return_value="v1"), \
+                mock.patch.object(LocalVectorIndex, "load", load):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(first_request, range(4)))
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(len(loads), 1)
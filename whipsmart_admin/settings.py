@@ -117,6 +117,16 @@ if DB_ENGINE == 'django.db.backends.mysql':
             'CONN_MAX_AGE': 600,  # Connection pooling
         }
     }
+else:
+    # SQLite (default - no setup needed, see README)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Some migrations run MySQL-specific SQL; the test database is built from the models
+            'TEST': {'MIGRATE': False},
+        }
+    }
 
 # Custom User Model
 AUTH_USER_MODEL = 'core.AdminUser'
@@ -321,6 +331,16 @@ PINECONE_API_KEY = config('PINECONE_API_KEY', default='')
 PINECONE_ENVIRONMENT = config('PINECONE_ENVIRONMENT', default='')
 PINECONE_INDEX_NAME = config('PINECONE_INDEX_NAME', default='whipsmart')
 
+# Vector store backend (knowledgebase/services/vector_store.py): 'pinecone', 'local' (in-process,
+# loaded from DocumentChunk.embedding - no network) or 'sqlite' (file shared by the workers on one host)
+VECTOR_STORE_BACKEND = config('VECTOR_STORE_BACKEND', default='pinecone')
+VECTOR_STORE_SQLITE_PATH = config('VECTOR_STORE_SQLITE_PATH', default=str(BASE_DIR / 'vector_store.sqlite3'))
+
+# Suggestion bank: follow-up questions generated per chunk when a document is vectorized,
+# used by the agents as quick-reply suggestions without an LLM call per answer
+KB_SUGGESTION_BANK_ENABLED = config('KB_SUGGESTION_BANK_ENABLED', default=True, cast=bool)
+KB_SUGGESTION_BANK_QUESTIONS_PER_CHUNK = config('KB_SUGGESTION_BANK_QUESTIONS_PER_CHUNK', default=4, cast=int)
+
 # OpenAI settings (for embeddings if not using Azure)
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
@@ -329,6 +349,50 @@ AZURE_OPENAI_API_KEY = config('AZURE_OPENAI_API_KEY', default='')
 AZURE_OPENAI_ENDPOINT = config('AZURE_OPENAI_ENDPOINT', default='')
 AZURE_OPENAI_DEPLOYMENT_NAME = config('AZURE_OPENAI_DEPLOYMENT_NAME', default='')
 AZURE_OPENAI_API_VERSION = config('AZURE_OPENAI_API_VERSION', default='2024-02-15-preview')
+# Optional extra chat deployments for the shared client pool (agents/llm_pool.py), as a JSON list:
+# [{"endpoint": "https://eastus.openai.azure.com/", "deployment": "gpt-4o", "api_key": "...", "weight": 1}]
+# Missing keys fall back to the settings above; empty = only AZURE_OPENAI_DEPLOYMENT_NAME.
+AZURE_OPENAI_DEPLOYMENTS = config('AZURE_OPENAI_DEPLOYMENTS', default='')
+# Attempts per request across deployments (429 / timeouts / 5xx fail over) and backoff bounds in seconds
+LLM_POOL_MAX_ATTEMPTS = config('LLM_POOL_MAX_ATTEMPTS', default=4, cast=int)
+LLM_POOL_BACKOFF_BASE = config('LLM_POOL_BACKOFF_BASE', default=0.5, cast=float)
+LLM_POOL_BACKOFF_MAX = config('LLM_POOL_BACKOFF_MAX', default=8.0, cast=float)
+LLM_POOL_REQUEST_TIMEOUT = config('LLM_POOL_REQUEST_TIMEOUT', default=60.0, cast=float)
+# Model tiers: each agent LLM call declares a tier. Empty model = AZURE_OPENAI_DEPLOYMENT_NAME.
+# A model that is not in AZURE_OPENAI_DEPLOYMENTS is used as a deployment name on the configured endpoint(s).
+# max_tokens caps what a call site asks for; timeout is per request (seconds).
+LLM_MODEL_TIERS = {
+    # intent / routing / extraction / tone checks / suggestions / history summaries
+    'classify': {
+        'model': config('AZURE_OPENAI_CLASSIFY_DEPLOYMENT', default=''),  # e.g. gpt-4o-mini
+        'max_tokens': config('LLM_CLASSIFY_MAX_TOKENS', default=500, cast=int),
+        'timeout': config('LLM_CLASSIFY_TIMEOUT', default=15.0, cast=float),
+    },
+    # answer planning / fact and completeness checks
+    'reason': {
+        'model': config('AZURE_OPENAI_REASON_DEPLOYMENT', default=''),
+        'max_tokens': config('LLM_REASON_MAX_TOKENS', default=1000, cast=int),
+        'timeout': config('LLM_REASON_TIMEOUT', default=30.0, cast=float),
+    },
+    # the answer shown to the user
+    'generate': {
+        'model': AZURE_OPENAI_DEPLOYMENT_NAME,
+        'max_tokens': config('LLM_GENERATE_MAX_TOKENS', default=2000, cast=int),
+        'timeout': config('LLM_GENERATE_TIMEOUT', default=60.0, cast=float),
+    },
+}
+# Process-wide cap on concurrent LLM requests (size it to the deployment's rate limits)
+LLM_MAX_CONCURRENCY = config('LLM_MAX_CONCURRENCY', default=16, cast=int)
+# Shared worker threads for blocking agent work (sync LLM clients, vector searches)
+AGENT_EXECUTOR_MAX_WORKERS = config('AGENT_EXECUTOR_MAX_WORKERS', default=32, cast=int)
+# Identical embedding / Pinecone / cacheable LLM requests in flight at the same time share one upstream call
+AGENT_SINGLE_FLIGHT_ENABLED = config('AGENT_SINGLE_FLIGHT_ENABLED', default=True, cast=bool)
+# LLM / embedding / Pinecone cassette for offline benchmarks: '' (off), 'record' or 'replay'.
+# Never enable in production; see the benchmark_agents management command.
+AGENT_CASSETTE_MODE = config('AGENT_CASSETTE_MODE', default='')
+AGENT_CASSETTE_PATH = config('AGENT_CASSETTE_PATH', default='')
+# Replay latency: 'recorded' or a fixed number of milliseconds per call
+AGENT_CASSETTE_LATENCY = config('AGENT_CASSETTE_LATENCY', default='recorded')
 
 # Azure OpenAI Embedding settings (separate from chat/completion)
 AZURE_EMBEDDING_API_KEY = config('AZURE_EMBEDDING_API_KEY', default='')
@@ -336,6 +400,24 @@ AZURE_EMBEDDING_API_URI = config('AZURE_EMBEDDING_API_URI', default='')
 AZURE_EMBEDDING_API_VERSION = config('AZURE_EMBEDDING_API_VERSION', default='2024-02-15-preview')
 AZURE_OPENAI_EMBEDDING_DEPLOYMENT = config('AZURE_OPENAI_EMBEDDING_DEPLOYMENT', default='')
 
+# Query embedding cache: in-process LRU + QueryEmbedding table (shared by workers, kept across
+# restarts). Keyed by embedding deployment, so changing AZURE_OPENAI_EMBEDDING_DEPLOYMENT invalidates it.
+KB_EMBEDDING_CACHE_ENABLED = config('KB_EMBEDDING_CACHE_ENABLED', default=True, cast=bool)
+KB_EMBEDDING_CACHE_MAX_ENTRIES = config('KB_EMBEDDING_CACHE_MAX_ENTRIES', default=2000, cast=int)
+KB_EMBEDDING_CACHE_PERSISTENT = config('KB_EMBEDDING_CACHE_PERSISTENT', default=True, cast=bool)
+KB_EMBEDDING_CACHE_MAX_ROWS = config('KB_EMBEDDING_CACHE_MAX_ROWS', default=50000, cast=int)
+
+# Local vector index: every worker keeps the chunk embeddings (DocumentChunk.embedding) in memory and
+# answers knowledge base queries without calling Pinecone. Falls back to Pinecone until all live chunks
+# have stored embeddings (backfill with `python manage.py build_local_vector_index`).
+KB_LOCAL_VECTOR_INDEX_ENABLED = config('KB_LOCAL_VECTOR_INDEX_ENABLED', default=True, cast=bool)
+
+# Hybrid retrieval: BM25 over chunk questions and text (in-process, kept current by signals), fused with the
+# dense matches by reciprocal-rank fusion. KB_HYBRID_CANDIDATES dense and lexical candidates are fused.
+KB_HYBRID_SEARCH_ENABLED = config('KB_HYBRID_SEARCH_ENABLED', default=True, cast=bool)
+KB_HYBRID_CANDIDATES = config('KB_HYBRID_CANDIDATES', default=10, cast=int)
+KB_HYBRID_RRF_K = config('KB_HYBRID_RRF_K', default=60, cast=int)
+
 # OpenAI settings (for embeddings if not using Azure)
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
@@ -352,6 +434,7 @@ HUBSPOT_ACCESS_TOKEN = config('HUBSPOT_ACCESS_TOKEN', default='')
 # Set to True to use the new LangGraph agent instead of UnifiedAgent
 USE_LANGGRAPH_AGENT = config('USE_LANGGRAPH_AGENT', default=True, cast=bool)
 USE_LANGGRAPH_AGENT_V2 = config('USE_LANGGRAPH_AGENT_V2', default=True, cast=bool)  # Enable Agent V2 by default
+AGENT_V2_TRACE_DEBUG = config('AGENT_V2_TRACE_DEBUG', default=False, cast=bool)  # Send per-node timings in WebSocket complete frames
 
 # LangChain settings (optional)
 LANGCHAIN_TRACING_V2 = config('LANGCHAIN_TRACING_V2', default=False, cast=bool)